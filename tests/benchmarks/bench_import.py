@@ -0,0 +1,55 @@
+"""
+Wall clock time to import the package and each ldr* entry point, in fresh
+interpreters
+
+Entry points whose dependencies aren't installed are reported as such.
+
+Run with: python -m tests.benchmarks.bench_import [runs]
+"""
+from os.path import dirname, join
+from re import findall
+from statistics import median
+from subprocess import run, DEVNULL
+from sys import executable, argv
+from time import perf_counter
+
+
+ROOT = dirname(dirname(dirname(__file__)))
+
+
+def entry_points():
+    with open(join(ROOT, "setup.py")) as f:
+        return findall(r"'(ldr\w+) = ([\w.]+):launch'", f.read())
+
+
+def time_import(module, runs):
+    times = []
+    for _ in range(runs):
+        start = perf_counter()
+        r = run([executable, "-c", "import {}".format(module)],
+                cwd=ROOT, stdout=DEVNULL, stderr=DEVNULL)
+        times.append(perf_counter() - start)
+        if r.returncode != 0:
+            return None
+    return median(times) * 1000
+
+
+def main():
+    runs = int(argv[1]) if len(argv) > 1 else 10
+    baseline = time_import("sys", runs)
+    targets = [("(interpreter)", "sys"),
+               ("(package)", "uchicagoldrtoolsuite"),
+               ("(CLIApp)", "uchicagoldrtoolsuite.core.app.abc.cliapp")]
+    targets += entry_points()
+    width = max(len(x[0]) for x in targets)
+    for name, module in targets:
+        ms = baseline if module == "sys" else time_import(module, runs)
+        if ms is None:
+            print("{}  {:>8}".format(name.ljust(width), "unavailable"))
+        else:
+            print("{}  {:>8.1f} ms  (+{:.1f} ms over the interpreter)".format(
+                name.ljust(width), ms, ms - baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Per call overhead of log_aware and of debug logging while DEBUG is disabled
+
+Run with: python -m tests.benchmarks.bench_logging
+"""
+from json import dumps
+from logging import getLogger
+from timeit import Timer
+
+from uchicagoldrtoolsuite import log_aware, activate_stdout_log, \
+    clear_root_log_handlers
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+
+
+log = getLogger("uchicagoldrtoolsuite.benchmarks.lib.logging")
+
+
+class Thing(object):
+    def __init__(self):
+        self._x = 1
+
+    def __repr__(self):
+        return "<Thing {}>".format(dumps({'x': self._x, 'y': [1, 2, 3]},
+                                         sort_keys=True))
+
+    def get_bare(self):
+        return self._x
+
+    @log_aware(log)
+    def get_wrapped(self):
+        return self._x
+
+    @log_aware(log, accessor=True)
+    def get_accessor(self):
+        return self._x
+
+    def eager(self):
+        log.debug("Doing something to {}".format(str(self)))
+
+    def lazy(self):
+        log.debug("Doing something to %s", self)
+
+
+def per_call_ns(stmt, number=200000, repeat=5):
+    t = Timer(stmt)
+    return min(t.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def main():
+    clear_root_log_handlers()
+    # Only WARNING and above go anywhere, as with --stdout_log_verbosity
+    # WARNING --disk_log_verbosity DISABLE
+    activate_stdout_log(verbosity="WARNING")
+    thing = Thing()
+    results = [
+        ("bare accessor", per_call_ns(thing.get_bare)),
+        ("log_aware accessor", per_call_ns(thing.get_wrapped)),
+        ("log_aware(accessor=True)", per_call_ns(thing.get_accessor)),
+        ("eager .format(str(self)) debug", per_call_ns(thing.eager)),
+        ("lazy %-style debug", per_call_ns(thing.lazy)),
+        ("LDRPath()", per_call_ns(lambda: LDRPath("/tmp/x"), number=20000)),
+    ]
+    width = max(len(x[0]) for x in results)
+    for name, ns in results:
+        print("{}  {:>10.1f} ns/call".format(name.ljust(width), ns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+End to end timings of the bit level pipeline, over a synthetic accession
+
+A source tree is generated (reproducibly, from --seed) and taken through:
+
+1. stage - the real ldrstage app, in a subprocess
+2. premis - parsing every staged PREMIS record, and regenerating it with
+   GenericPREMISCreator
+3. techmd - GenericTechnicalMetadataCreator and FITsCreator, against a stub
+   FITS script which writes a minimal record without examining anything
+4. presform - GenericPresformCreator, with a stub converter which claims
+   every mime and "converts" by copying
+5. archive - StageToArchiveTransformer and FileSystemArchiveWriter
+
+Each phase is reported with its wall time, files and bytes per second and
+the summary of the metrics recorded during it (see core.lib.metrics), as
+JSON, so runs can be compared across commits.
+
+Run with: python -m tests.benchmarks.bench_pipeline [options] (see --help)
+"""
+from argparse import ArgumentParser
+from json import dumps, load
+from math import exp
+from os import makedirs, chmod, walk, stat
+from os.path import dirname, join
+from platform import platform, python_version
+from random import Random
+from shutil import copyfile
+from subprocess import run, PIPE, DEVNULL
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter, time
+from uuid import uuid4
+
+from uchicagoldrtoolsuite import clear_root_log_handlers, activate_stdout_log
+from uchicagoldrtoolsuite.core.lib.metrics import get_metrics_registry
+from uchicagoldrtoolsuite.bit_level.lib.converters.abc.converter import \
+    Converter
+from uchicagoldrtoolsuite.bit_level.lib.processors.genericpremiscreator \
+    import GenericPREMISCreator
+from uchicagoldrtoolsuite.bit_level.lib.processors.genericpresformcreator \
+    import GenericPresformCreator
+from uchicagoldrtoolsuite.bit_level.lib.processors.\
+    generictechnicalmetadatacreator import GenericTechnicalMetadataCreator
+from uchicagoldrtoolsuite.bit_level.lib.readers.filesystemstagereader import \
+    FileSystemStageReader
+from uchicagoldrtoolsuite.bit_level.lib.techmdcreators.fitscreator import \
+    FITsCreator
+from uchicagoldrtoolsuite.bit_level.lib.transformers.\
+    stagetoarchivetransformer import StageToArchiveTransformer
+from uchicagoldrtoolsuite.bit_level.lib.writers.filesystemarchivewriter \
+    import FileSystemArchiveWriter
+from uchicagoldrtoolsuite.bit_level.lib.writers.filesystemstagewriter import \
+    FileSystemStageWriter
+from uchicagoldrtoolsuite.bit_level.lib.writers.\
+    filesystemmaterialsuitewriter import FileSystemMaterialSuiteWriter
+
+
+ROOT = dirname(dirname(dirname(__file__)))
+
+STAGE_ID = "bench_stage"
+
+ARCHIVE_ID = "bench_archive"
+
+# Takes the place of fits.sh: handles the -i/-o and -r -i/-o invocations
+# FITsCreator makes, writing a minimal record for every input
+STUB_FITS = """#!/bin/sh
+recursive=0
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -r) recursive=1 ;;
+        -i) shift; in="$1" ;;
+        -o) shift; out="$1" ;;
+    esac
+    shift
+done
+if [ $recursive = 1 ]; then
+    for f in "$in"/*; do
+        printf '<fits/>' > "$out/$(basename "$f").fits.xml"
+    done
+else
+    printf '<fits/>' > "$out"
+fi
+"""
+
+
+class StubConverter(Converter):
+    """
+    Claims everything, and "converts" it by copying it
+    """
+    _claimed_mimes = ["*/*"]
+
+    def __init__(self, input_materialsuite, working_dir, timeout=None,
+                 data_transfer_obj={}):
+        super().__init__(input_materialsuite, working_dir=working_dir,
+                         timeout=timeout)
+        self.converter_name = "benchmark stub converter"
+
+    def run_converter(self, in_path):
+        out_path = join(self.working_dir, uuid4().hex + ".stub")
+        copyfile(in_path, out_path)
+        return {'outpath': out_path, 'cmd_output': "copied"}
+
+
+def size_sampler(spec, rng):
+    """
+    Build a function returning file sizes from a distribution
+
+    __Args__
+
+    1. spec (str): One of fixed:N, uniform:MIN:MAX or lognormal:MU:SIGMA
+        (of the natural log of the size in bytes)
+    2. rng (Random): The source of randomness
+
+    __Returns__
+
+    * (callable): Returns a size in bytes each time it's called
+    """
+    kind, _, params = spec.partition(":")
+    params = [float(x) for x in params.split(":")] if params else []
+    if kind == "fixed" and len(params) == 1:
+        return lambda: int(params[0])
+    if kind == "uniform" and len(params) == 2:
+        return lambda: rng.randint(int(params[0]), int(params[1]))
+    if kind == "lognormal" and len(params) == 2:
+        return lambda: int(exp(rng.gauss(params[0], params[1])))
+    raise ValueError("Unrecognized size distribution: {}".format(spec))
+
+
+def generate_tree(root, files, depth, fanout, sizes, max_size, seed):
+    """
+    Write a synthetic source tree
+
+    Files are spread over every directory of a tree fanout wide and depth
+    deep, and filled with pseudo random bytes, so the same arguments always
+    produce the same tree.
+
+    __Args__
+
+    1. root (str): Where to write the tree
+    2. files (int): How many files to write
+    3. depth (int): How many levels of directories below root
+    4. fanout (int): How many subdirectories each directory has
+    5. sizes (str): The size distribution, see size_sampler()
+    6. max_size (int): The largest a file may be
+    7. seed (int): The seed for the pseudo random number generator
+
+    __Returns__
+
+    * (int): The total size of the files written
+    """
+    rng = Random(seed)
+    sample = size_sampler(sizes, rng)
+    dirs = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [join(d, "d{}".format(str(i)))
+                 for d in level for i in range(fanout)]
+        dirs.extend(level)
+    total = 0
+    for i in range(files):
+        d = dirs[i % len(dirs)]
+        makedirs(d, exist_ok=True)
+        size = max(0, min(sample(), max_size))
+        with open(join(d, "f{}.bin".format(str(i))), 'wb') as f:
+            f.write(rng.getrandbits(size * 8).to_bytes(size, 'little')
+                    if size else b'')
+        total += size
+    return total
+
+
+def tree_size(root, name=None):
+    files = 0
+    size = 0
+    for dirpath, _, filenames in walk(root):
+        for x in filenames:
+            if name is not None and x != name:
+                continue
+            files += 1
+            size += stat(join(dirpath, x)).st_size
+    return files, size
+
+
+def timed(name, results, files, size, fn):
+    registry = get_metrics_registry()
+    registry.reset()
+    start = perf_counter()
+    metrics = fn()
+    elapsed = perf_counter() - start
+    results[name] = {
+        'seconds': elapsed,
+        'files': files,
+        'bytes': size,
+        'files_per_second': files / elapsed,
+        'bytes_per_second': size / elapsed,
+        'metrics': metrics if metrics is not None else registry.summary()
+    }
+
+
+def stage(work, src, args):
+    metrics_path = join(work, "stage_metrics.json")
+    r = run([executable, "-m", "uchicagoldrtoolsuite.bit_level.app.stager",
+             src, STAGE_ID, "--staging_env", join(work, "staging"),
+             "--run_name", "benchmark", "--workers", str(args.workers),
+             "--logdir", join(work, "logs"), "-v", "WARNING",
+             "--metrics_json", metrics_path],
+            cwd=ROOT, stdout=DEVNULL, stderr=PIPE, universal_newlines=True)
+    if r.returncode != 0:
+        raise RuntimeError("Staging failed:\n{}".format(r.stderr))
+    with open(metrics_path) as f:
+        return load(f)
+
+
+def premis(work, args):
+    reader = FileSystemStageReader(join(work, "staging"), STAGE_ID)
+    out = join(work, "premis")
+    makedirs(out, exist_ok=True)
+    for ms in reader.iter_materialsuites():
+        ms.get_premis_record()
+        GenericPREMISCreator.make_record(
+            ms.content.get_fspath()
+        ).write_to_file(join(out, uuid4().hex))
+
+
+def techmd(work, args):
+    fits_path = join(work, "fits.sh")
+    with open(fits_path, 'w') as f:
+        f.write(STUB_FITS)
+    chmod(fits_path, 0o755)
+    reader = FileSystemStageReader(join(work, "staging"), STAGE_ID)
+    pairtree_root = join(work, "staging", STAGE_ID, "pairtree_root")
+
+    def write(ms):
+        FileSystemMaterialSuiteWriter(
+            ms, pairtree_root, encapsulation=reader.encapsulation
+        ).write()
+
+    GenericTechnicalMetadataCreator(reader.struct, [FITsCreator]).process(
+        data_transfer_obj={'fits_path': fits_path},
+        materialsuites=reader.iter_materialsuites(),
+        workers=args.workers, callback=write, batch_size=args.batch_size
+    )
+
+
+def presform(work, args):
+    stage = FileSystemStageReader(join(work, "staging"), STAGE_ID).read()
+    GenericPresformCreator(stage, [StubConverter]).process(
+        workers=args.workers
+    )
+    FileSystemStageWriter(stage, join(work, "staging")).write()
+
+
+def archive(work, args):
+    stage = FileSystemStageReader(join(work, "staging"), STAGE_ID).read()
+    lts = join(work, "lts")
+    makedirs(lts, exist_ok=True)
+    ark = StageToArchiveTransformer(stage).transform(
+        archive_identifier=ARCHIVE_ID
+    )
+    FileSystemArchiveWriter(ark, lts).write()
+
+
+def git_commit():
+    r = run(["git", "rev-parse", "HEAD"], cwd=ROOT, stdout=PIPE,
+            stderr=DEVNULL, universal_newlines=True)
+    return r.stdout.strip() if r.returncode == 0 else None
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=200,
+                        help="How many files to generate. Default: 200")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="How deep the source tree is. Default: 3")
+    parser.add_argument("--fanout", type=int, default=3,
+                        help="How many subdirectories each directory of " +
+                        "the source tree has. Default: 3")
+    parser.add_argument("--sizes", default="lognormal:10:2",
+                        help="The distribution of file sizes: fixed:N, " +
+                        "uniform:MIN:MAX or lognormal:MU:SIGMA. Default: " +
+                        "lognormal:10:2 (a median of ~22KB)")
+    parser.add_argument("--max_size", type=int, default=64*1024*1024,
+                        help="The largest file to generate. Default: 64MB")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="The seed for generating the tree. Default: 0")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="The --workers passed to each phase. Default: 1")
+    parser.add_argument("--batch_size", type=int, default=1,
+                        help="The techmd batch size. Default: 1")
+    parser.add_argument("--workdir", default=None,
+                        help="Where to build the tree, stage and archive. " +
+                        "Default: a tmp dir, which is removed afterwards")
+    parser.add_argument("--output", default=None,
+                        help="Where to write the results. Default: stdout")
+    args = parser.parse_args()
+
+    clear_root_log_handlers()
+    activate_stdout_log(verbosity="WARNING")
+
+    tmp = None
+    work = args.workdir
+    if work is None:
+        tmp = TemporaryDirectory()
+        work = tmp.name
+    try:
+        src = join(work, "source")
+        generate_tree(src, args.files, args.depth, args.fanout, args.sizes,
+                      args.max_size, args.seed)
+        files, size = tree_size(src)
+        results = {}
+        timed("stage", results, files, size, lambda: stage(work, src, args))
+        for name, fn in [("premis", premis), ("techmd", techmd),
+                         ("presform", presform)]:
+            timed(name, results, files, size, lambda: fn(work, args))
+        # Presforms are staged alongside the originals
+        files, size = tree_size(join(work, "staging", STAGE_ID,
+                                     "pairtree_root"), name="content.file")
+        timed("archive", results, files, size, lambda: archive(work, args))
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time(),
+        'python': python_version(),
+        'platform': platform(),
+        'parameters': vars(args),
+        'phases': results
+    }
+    out = dumps(report, indent=4, sort_keys=True)
+    if args.output is None:
+        print(out)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(out + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import gc
+import socket
+import struct
+import sys
+import unittest
+import warnings
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from os import remove, listdir
+from tempfile import NamedTemporaryFile
+from threading import Thread
+
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.bit_level.lib.techmdcreators import apifitscreator
+from uchicagoldrtoolsuite.bit_level.lib.techmdcreators.apifitscreator import \
+    post_to_fits_api, get_fits_api_session
+
+
+FITS_XML = "<fits><identification/></fits>"
+
+
+class CountingLDRPath(LDRPath):
+    """
+    Counts how many times it's been opened and closed
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opens = 0
+        self.closes = 0
+
+    def open(self, *args, **kwargs):
+        self.opens += 1
+        return super().open(*args, **kwargs)
+
+    def close(self):
+        self.closes += 1
+        return super().close()
+
+
+def _open_fds():
+    return len(listdir("/proc/self/fd"))
+
+
+class FakeFITSHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so connection reuse is visible in the client ports seen
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _drop(self):
+        # Read a little of the body then reset the connection, so the
+        # client fails partway through its upload
+        self.rfile.read(1024)
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                                   struct.pack('ii', 1, 0))
+        self.close_connection = True
+
+    def do_POST(self):
+        server = self.server
+        if server.responses and server.responses[0] == 'drop':
+            server.responses.pop(0)
+            server.requests.append({'dropped': True})
+            self._drop()
+            return
+        body = self._read_body()
+        server.requests.append({
+            'path': self.path,
+            'client_port': self.client_address[1],
+            'content_type': self.headers.get('Content-Type'),
+            'body': body
+        })
+        response = server.responses.pop(0) if server.responses else 200
+        if response == 'reset':
+            # Hang up without answering
+            self.close_connection = True
+            return
+        text = FITS_XML if response == 200 else \
+            "<error>Something went wrong</error>"
+        if response == 'error':
+            response = 200
+        data = text.encode("utf-8")
+        self.send_response(response)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestPostToFITsAPI(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                          FakeFITSHandler)
+        self.server.requests = []
+        self.server.responses = []
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}/fits/examine".format(
+            str(self.server.server_address[1]))
+        # Large enough that the upload can't all be buffered before the
+        # server has a chance to hang up on it
+        self.content = bytes(range(256)) * 5000 * 16
+        with NamedTemporaryFile(delete=False) as f:
+            f.write(self.content)
+            self.path = f.name
+        self.item = CountingLDRPath(self.path)
+        apifitscreator._session = None
+
+    def tearDown(self):
+        if apifitscreator._session is not None:
+            apifitscreator._session.close()
+        apifitscreator._session = None
+        self.server.shutdown()
+        self.server.server_close()
+        remove(self.path)
+
+    def post(self, **kwargs):
+        kwargs.setdefault('backoff', 0)
+        return post_to_fits_api(self.url, self.item, "some file.pdf",
+                                **kwargs)
+
+    def expected_body(self, request):
+        content_type, _, boundary = request['content_type'].partition(
+            "; boundary=")
+        self.assertEqual(content_type, "multipart/form-data")
+        return (
+            "--{}\r\n".format(boundary) +
+            'Content-Disposition: form-data; name="datafile"; ' +
+            'filename="some file.pdf"\r\n' +
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8") + self.content + \
+            "\r\n--{}--\r\n".format(boundary).encode("utf-8")
+
+    def test_streams_multipart_body(self):
+        self.assertEqual(self.post(), FITS_XML)
+        self.assertEqual(len(self.server.requests), 1)
+        request = self.server.requests[0]
+        self.assertEqual(request['path'], "/fits/examine")
+        self.assertEqual(request['body'], self.expected_body(request))
+
+    def test_retries_503(self):
+        self.server.responses = [503, 503]
+        self.assertEqual(self.post(retries=2), FITS_XML)
+        self.assertEqual(len(self.server.requests), 3)
+        # The item is re-read from the start for every attempt
+        for request in self.server.requests:
+            self.assertEqual(request['body'], self.expected_body(request))
+
+    def test_gives_up_after_retries(self):
+        from requests.exceptions import HTTPError
+        self.server.responses = [503, 503, 503]
+        with self.assertRaises(HTTPError):
+            self.post(retries=1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_retries_connection_reset(self):
+        from requests.exceptions import ConnectionError
+        self.server.responses = ['reset']
+        self.assertEqual(self.post(retries=1), FITS_XML)
+        self.assertEqual(len(self.server.requests), 2)
+        self.server.responses = ['reset']
+        with self.assertRaises(ConnectionError):
+            self.post(retries=0)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"),
+                         "Counts open fds in /proc")
+    def test_drop_mid_body(self):
+        from requests.exceptions import ConnectionError
+        unraisable = []
+        old_hook = sys.unraisablehook
+        sys.unraisablehook = unraisable.append
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                # Warm up the session, so its connection isn't counted
+                self.assertEqual(self.post(), FITS_XML)
+                gc.collect()
+                fds = _open_fds()
+                self.server.responses = ['drop']
+                self.assertEqual(self.post(retries=1), FITS_XML)
+                self.server.responses = ['drop']
+                with self.assertRaises(ConnectionError):
+                    self.post(retries=0)
+                gc.collect()
+                after = _open_fds()
+        finally:
+            sys.unraisablehook = old_hook
+        self.assertEqual([x.get('dropped') for x in self.server.requests],
+                         [None, True, None, True])
+        request = self.server.requests[2]
+        self.assertEqual(request['body'], self.expected_body(request))
+        # Every attempt's handle was closed, by the attempt itself
+        self.assertEqual(self.item.opens, 4)
+        self.assertEqual(self.item.closes, 4)
+        self.assertIsNone(self.item.pipe)
+        self.assertLessEqual(after, fds)
+        self.assertEqual([x for x in caught
+                          if issubclass(x.category, ResourceWarning)], [])
+        self.assertEqual(unraisable, [])
+
+    def test_error_document(self):
+        self.server.responses = ['error']
+        with self.assertRaises(ValueError):
+            self.post()
+        # 4xx responses aren't retried
+        self.server.responses = [404]
+        with self.assertRaises(ValueError):
+            self.post()
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_reuses_session(self):
+        session = get_fits_api_session()
+        self.assertIs(get_fits_api_session(), session)
+        self.server.responses = [503]
+        for _ in range(3):
+            self.assertEqual(self.post(), FITS_XML)
+        self.assertEqual(len(self.server.requests), 4)
+        # Every request, retried or not, went over the same kept alive
+        # connection of the shared Session
+        self.assertEqual(
+            len(set(x['client_port'] for x in self.server.requests)), 1)
+        self.assertIs(apifitscreator._session, session)
+
+
+if __name__ == "__main__":
+    unittest.main()
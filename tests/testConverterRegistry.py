@@ -0,0 +1,123 @@
+import unittest
+
+from uchicagoldrtoolsuite.bit_level.lib.converters.converterregistry import \
+    ConverterRegistry
+
+
+def fake_converter(name, mimes, priority=0):
+    class FakeConverter(object):
+        _claimed_mimes = list(mimes)
+        claims = 0
+
+        @classmethod
+        def claim_mimes_from_extensions(cls):
+            cls.claims += 1
+
+    FakeConverter.priority = priority
+    FakeConverter.__name__ = name
+    return FakeConverter
+
+
+class TestConverterRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tiff = fake_converter("tiff", ["image/tiff"])
+        self.images = fake_converter("images", ["image/*"])
+        self.anything = fake_converter("anything", ["*/*"])
+        self.docs = fake_converter("docs", ["application/pdf", "text/plain"])
+
+    def test_exact(self):
+        r = ConverterRegistry([self.tiff, self.docs])
+        self.assertEqual(r.converters_for(["image/tiff"]), [self.tiff])
+        self.assertEqual(r.converters_for(["text/plain"]), [self.docs])
+        self.assertEqual(r.converters_for(["image/png"]), [])
+        self.assertEqual(r.converters_for([]), [])
+        # Claiming mimes from extensions happens as they're registered
+        self.assertEqual(self.tiff.claims, 1)
+
+    def test_families(self):
+        r = ConverterRegistry([self.images, self.tiff])
+        self.assertEqual(r.converters_for(["image/png"]), [self.images])
+        self.assertEqual(r.converters_for(["image/tiff"]),
+                         [self.images, self.tiff])
+        self.assertEqual(r.converters_for(["imagery/png"]), [])
+        self.assertEqual(r.converters_for(["text/plain"]), [])
+
+    def test_everything(self):
+        r = ConverterRegistry([self.anything, self.tiff])
+        self.assertEqual(r.converters_for(["image/tiff"]),
+                         [self.anything, self.tiff])
+        self.assertEqual(r.converters_for(["text/plain"]), [self.anything])
+        self.assertEqual(r.converters_for(["x-odd"]), [self.anything])
+        # Missing mimes don't match anything, not even */*
+        self.assertEqual(r.converters_for([None]), [])
+
+    def test_several_mimes(self):
+        r = ConverterRegistry([self.docs, self.tiff, self.images])
+        # Each converter only appears once, however many mimes it handles
+        self.assertEqual(
+            r.converters_for(["text/plain", "image/tiff", None,
+                              "application/pdf"]),
+            [self.docs, self.tiff, self.images])
+
+    def test_priority(self):
+        low = fake_converter("low", ["image/tiff"], priority=-1)
+        high = fake_converter("high", ["image/*"], priority=5)
+        r = ConverterRegistry([low, self.tiff, self.anything, high])
+        self.assertEqual(r.converters_for(["image/tiff"]),
+                         [high, self.tiff, self.anything, low])
+
+    def test_priority_ties(self):
+        # Ties keep the order the converters were registered in
+        for order in ([self.tiff, self.images, self.anything],
+                      [self.anything, self.tiff, self.images],
+                      [self.images, self.anything, self.tiff]):
+            r = ConverterRegistry(order)
+            self.assertEqual(r.converters_for(["image/tiff"]), order)
+
+    def test_priority_override(self):
+        r = ConverterRegistry()
+        r.register(self.tiff)
+        r.register(self.images, priority=1)
+        r.register(self.anything, priority=-1)
+        self.assertEqual(r.converters_for(["image/tiff"]),
+                         [self.images, self.tiff, self.anything])
+
+    def test_duplicate_registration(self):
+        r = ConverterRegistry([self.tiff, self.images])
+        r.register(self.tiff, priority=10)
+        r.register(self.images)
+        self.assertEqual(len(r), 2)
+        self.assertEqual(list(r), [self.tiff, self.images])
+        # The first registration, and its priority, stand
+        self.assertEqual(r.converters_for(["image/tiff"]),
+                         [self.tiff, self.images])
+
+    def test_cache_invalidated_by_register(self):
+        r = ConverterRegistry([self.tiff])
+        first = r.converters_for(["image/tiff"])
+        self.assertIs(r.converters_for(["image/tiff"]), first)
+        self.assertEqual(r.converters_for(["text/plain"]), [])
+        r.register(self.anything, priority=1)
+        self.assertEqual(r.converters_for(["image/tiff"]),
+                         [self.anything, self.tiff])
+        self.assertEqual(r.converters_for(["text/plain"]), [self.anything])
+        # What was handed out before isn't changed underneath its holder
+        self.assertEqual(first, [self.tiff])
+
+    def test_for_converters(self):
+        converters = [self.tiff, self.images]
+        r = ConverterRegistry.for_converters(converters)
+        self.assertEqual(list(r), converters)
+        self.assertIs(ConverterRegistry.for_converters(list(converters)), r)
+        self.assertIs(ConverterRegistry.for_converters(tuple(converters)), r)
+        self.assertIs(ConverterRegistry.for_converters(r), r)
+        # Order matters, it's what breaks priority ties
+        other = ConverterRegistry.for_converters([self.images, self.tiff])
+        self.assertIsNot(other, r)
+        self.assertEqual(other.converters_for(["image/tiff"]),
+                         [self.images, self.tiff])
+        self.assertIsNot(ConverterRegistry.for_converters([self.tiff]), r)
+
+
+if __name__ == "__main__":
+    unittest.main()
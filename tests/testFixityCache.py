@@ -0,0 +1,124 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5, sha256
+from multiprocessing import get_context
+from os import stat, utime
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from uchicagoldrtoolsuite.core.lib.fixitycache import FixityCache, \
+    activate_fixity_cache, deactivate_fixity_cache, get_fixity_cache
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldritemoperations import \
+    hash_ldritem_multi
+
+
+def _lookup_in_child(path, algos):
+    return get_fixity_cache().lookup(stat(path), algos)
+
+
+class TestFixityCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.cache_path = join(self.tmp.name, "fixity.sqlite")
+        self.file_path = join(self.tmp.name, "file")
+        self.write(b"some content")
+
+    def tearDown(self):
+        deactivate_fixity_cache()
+        self.tmp.cleanup()
+
+    def write(self, data, mtime_ns=None):
+        with open(self.file_path, 'wb') as f:
+            f.write(data)
+        if mtime_ns is not None:
+            utime(self.file_path, ns=(mtime_ns, mtime_ns))
+
+    def test_lookup(self):
+        cache = FixityCache(self.cache_path)
+        st = stat(self.file_path)
+        self.assertEqual(cache.lookup(st, ['md5']), {})
+        cache.store(st, {'md5': 'abc', 'sha256': 'def'})
+        self.assertEqual(cache.lookup(st, ['md5', 'sha256', 'crc32']),
+                         {'md5': 'abc', 'sha256': 'def'})
+        # Entries persist
+        self.assertEqual(FixityCache(self.cache_path).lookup(st, ['md5']),
+                         {'md5': 'abc'})
+
+    def test_stale_entries_dropped(self):
+        cache = FixityCache(self.cache_path)
+        st = stat(self.file_path)
+        cache.store(st, {'md5': 'abc'})
+        self.write(b"some other content", mtime_ns=st.st_mtime_ns + 10**9)
+        self.assertEqual(cache.lookup(stat(self.file_path), ['md5']), {})
+        # The stale entry is gone, not just ignored
+        self.assertEqual(cache.lookup(st, ['md5']), {})
+
+    def test_same_size_new_mtime(self):
+        cache = FixityCache(self.cache_path)
+        st = stat(self.file_path)
+        cache.store(st, {'md5': 'abc'})
+        self.write(b"some CONTENT", mtime_ns=st.st_mtime_ns + 10**9)
+        self.assertEqual(cache.lookup(stat(self.file_path), ['md5']), {})
+
+    def test_clear(self):
+        cache = FixityCache(self.cache_path)
+        st = stat(self.file_path)
+        cache.store(st, {'md5': 'abc'})
+        cache.clear()
+        self.assertEqual(cache.lookup(st, ['md5']), {})
+
+    def test_threads(self):
+        cache = FixityCache(self.cache_path)
+        st = stat(self.file_path)
+        cache.store(st, {'md5': 'abc'})
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: cache.lookup(st, ['md5']),
+                                    range(8)))
+        self.assertEqual(results, [{'md5': 'abc'}] * 8)
+
+    def test_forked_workers(self):
+        activate_fixity_cache(self.cache_path).store(
+            stat(self.file_path), {'md5': 'abc'})
+        with get_context('fork').Pool(2) as pool:
+            results = pool.starmap(_lookup_in_child,
+                                   [(self.file_path, ['md5'])] * 4)
+        self.assertEqual(results, [{'md5': 'abc'}] * 4)
+
+    def test_activation(self):
+        self.assertIsNone(get_fixity_cache())
+        cache = activate_fixity_cache(self.cache_path)
+        self.assertIs(get_fixity_cache(), cache)
+        deactivate_fixity_cache()
+        self.assertIsNone(get_fixity_cache())
+
+    def test_hash_ldritem_multi(self):
+        item = LDRPath(self.file_path)
+        expected = {'md5': md5(b"some content").hexdigest(),
+                    'sha256': sha256(b"some content").hexdigest()}
+        # Nothing is cached until a cache is activated
+        self.assertEqual(dict(hash_ldritem_multi(item, ['md5', 'sha256'])),
+                         expected)
+        cache = activate_fixity_cache(self.cache_path)
+        self.assertEqual(cache.lookup(stat(self.file_path), ['md5']), {})
+        self.assertEqual(dict(hash_ldritem_multi(item, ['md5'])),
+                         {'md5': expected['md5']})
+        # Rewrite the file without changing its size or mtime, so only a
+        # cache hit returns the old digest
+        st = stat(self.file_path)
+        self.write(b"SOME CONTENT", mtime_ns=st.st_mtime_ns)
+        self.assertEqual(hash_ldritem_multi(item, ['md5'])['md5'],
+                         expected['md5'])
+        # Missing algos are computed (and cached) alongside the hits
+        digests = hash_ldritem_multi(item, ['sha256', 'md5'])
+        self.assertEqual(list(digests.keys()), ['sha256', 'md5'])
+        self.assertEqual(digests['md5'], expected['md5'])
+        self.assertEqual(digests['sha256'],
+                         sha256(b"SOME CONTENT").hexdigest())
+        self.assertEqual(
+            hash_ldritem_multi(item, ['md5'], use_cache=False)['md5'],
+            md5(b"SOME CONTENT").hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()
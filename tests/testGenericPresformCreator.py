@@ -0,0 +1,259 @@
+import unittest
+from os import remove
+from random import Random
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import sleep
+
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.bit_level.lib.processors.genericpresformcreator \
+    import GenericPresformCreator, _ConversionScheduler
+
+
+class FakeRelationship(object):
+    def get_relationshipType(self):
+        return 'derivation'
+
+    def get_relationshipSubType(self):
+        return 'has Source'
+
+
+class FakeObject(object):
+    def __init__(self, is_presform):
+        self.is_presform = is_presform
+
+    def get_relationship(self):
+        if self.is_presform:
+            return [FakeRelationship()]
+        raise KeyError()
+
+
+class FakePremisRecord(object):
+    def __init__(self, is_presform):
+        self.obj = FakeObject(is_presform)
+
+    def get_object_list(self):
+        return [self.obj]
+
+
+class FakeMaterialSuite(object):
+    def __init__(self, identifier, premis_path, is_presform=False):
+        self.identifier = identifier
+        self.premis_path = premis_path
+        self.premis_record = FakePremisRecord(is_presform)
+
+    def get_premis(self):
+        return LDRPath(self.premis_path)
+
+
+class FakeStage(object):
+    def __init__(self):
+        self.materialsuite_list = []
+
+    def add_materialsuite(self, x):
+        self.materialsuite_list.append(x)
+
+
+class Tracker(object):
+    """
+    Records how many conversions of each group run at once, and the order
+    conversions are applied in
+    """
+    def __init__(self, seed=0):
+        self.lock = Lock()
+        self.active = {}
+        self.peak = {}
+        self.ran = []
+        self.applied = []
+        self.rng = Random(seed)
+
+    def converter(self, name, group=None, limit=None, fail=False):
+        tracker = self
+
+        class FakeConverter(object):
+            concurrency_group = group
+            max_concurrency = limit
+            shared_original = None
+
+            def __init__(self, materialsuite):
+                self.materialsuite = materialsuite
+
+            def run(self):
+                key = group or name
+                with tracker.lock:
+                    tracker.active[key] = tracker.active.get(key, 0) + 1
+                    tracker.peak[key] = max(tracker.peak.get(key, 0),
+                                            tracker.active[key])
+                    delay = tracker.rng.random() * .02
+                    tracker.ran.append((self.materialsuite.identifier, name))
+                try:
+                    sleep(delay)
+                    if fail:
+                        raise RuntimeError("conversion failed")
+                finally:
+                    with tracker.lock:
+                        tracker.active[key] -= 1
+                return (self.materialsuite.identifier, name)
+
+            def apply(self, result):
+                tracker.applied.append(result)
+                return "{}-{}".format(*result)
+
+        FakeConverter.__name__ = name
+        return FakeConverter
+
+
+class FakeConverterPresformCreator(GenericPresformCreator):
+    @staticmethod
+    def instantiate_converters(ms, working_dir_path, converters,
+                               data_transfer_obj={}):
+        return [c(ms) for c in converters]
+
+
+class TestConcurrentPresformCreation(unittest.TestCase):
+    def setUp(self):
+        with NamedTemporaryFile(delete=False) as f:
+            self.premis_path = f.name
+        self.tracker = Tracker()
+        t = self.tracker
+        self.lo_a = t.converter('lo_a', group='libreoffice', limit=1)
+        self.lo_b = t.converter('lo_b', group='libreoffice', limit=1)
+        self.video = t.converter('video', limit=2)
+        self.image = t.converter('image')
+        self.converters = [self.lo_a, self.lo_b, self.video, self.image]
+        self.names = ['lo_a', 'lo_b', 'video', 'image']
+
+    def tearDown(self):
+        remove(self.premis_path)
+
+    def materialsuites(self, n, presform_every=None):
+        for i in range(n):
+            is_presform = presform_every is not None and \
+                i % presform_every == 0
+            yield FakeMaterialSuite(str(i), self.premis_path,
+                                    is_presform=is_presform)
+
+    def process(self, materialsuites, **kwargs):
+        stage = FakeStage()
+        callbacks = []
+        FakeConverterPresformCreator(stage, self.converters).process(
+            materialsuites=materialsuites,
+            callback=lambda ms, presforms: callbacks.append(
+                (ms.identifier, presforms)),
+            **kwargs
+        )
+        return stage, callbacks
+
+    def test_group_limits(self):
+        self.process(self.materialsuites(30), workers=6)
+        self.assertEqual(len(self.tracker.ran), 30 * 4)
+        self.assertEqual(self.tracker.peak['libreoffice'], 1)
+        self.assertLessEqual(self.tracker.peak['video'], 2)
+
+    def test_concurrency_limit_overrides(self):
+        self.process(self.materialsuites(30), workers=6,
+                     concurrency_limits={'libreoffice': 2, self.video: 1})
+        self.assertLessEqual(self.tracker.peak['libreoffice'], 2)
+        self.assertEqual(self.tracker.peak['video'], 1)
+
+    def test_applied_in_input_order(self):
+        stage, callbacks = self.process(self.materialsuites(30), workers=6)
+        expected = [(str(i), x) for i in range(30) for x in self.names]
+        self.assertEqual(self.tracker.applied, expected)
+        self.assertEqual(stage.materialsuite_list,
+                         ["{}-{}".format(*x) for x in expected])
+        self.assertEqual(callbacks, [
+            (str(i), ["{}-{}".format(str(i), x) for x in self.names])
+            for i in range(30)
+        ])
+
+    def test_matches_serial_order(self):
+        _, parallel = self.process(self.materialsuites(10), workers=4)
+        # With one worker the converters are run and applied by
+        # instantiate_and_make_presforms, which this stands in for
+        serial = []
+
+        class SerialPresformCreator(FakeConverterPresformCreator):
+            @staticmethod
+            def instantiate_and_make_presforms(ms, working_dir_path,
+                                               converters,
+                                               data_transfer_obj={}):
+                presforms = []
+                for c in converters:
+                    converter = c(ms)
+                    presforms.append(converter.apply(converter.run()))
+                return presforms
+
+        SerialPresformCreator(FakeStage(), self.converters).process(
+            materialsuites=self.materialsuites(10), workers=1,
+            callback=lambda ms, presforms: serial.append(
+                (ms.identifier, presforms))
+        )
+        self.assertEqual(parallel, serial)
+
+    def test_skipped_materialsuites_go_through_callback_in_order(self):
+        _, callbacks = self.process(self.materialsuites(30, presform_every=3),
+                                    workers=6)
+        self.assertEqual([x[0] for x in callbacks],
+                         [str(i) for i in range(30)])
+        for identifier, presforms in callbacks:
+            if int(identifier) % 3 == 0:
+                self.assertEqual(presforms, [])
+            else:
+                self.assertEqual(len(presforms), 4)
+        self.assertEqual(
+            set(x[0] for x in self.tracker.ran),
+            set(str(i) for i in range(30) if i % 3 != 0)
+        )
+
+    def test_presform_presforms(self):
+        _, callbacks = self.process(self.materialsuites(9, presform_every=3),
+                                    workers=3, presform_presforms=True)
+        self.assertEqual([len(x[1]) for x in callbacks], [4] * 9)
+
+    def test_worker_exception_propagates(self):
+        self.converters.append(self.tracker.converter('broken', fail=True))
+        with self.assertRaises(RuntimeError):
+            self.process(self.materialsuites(5), workers=3)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            self.process(self.materialsuites(1), workers=0)
+        with self.assertRaises(ValueError):
+            self.process(self.materialsuites(1), workers=2,
+                         concurrency_limits={'libreoffice': 0})
+
+
+class TestConversionScheduler(unittest.TestCase):
+    def test_results_and_limits(self):
+        tracker = Tracker()
+        limited = tracker.converter('limited', limit=1)
+        unlimited = tracker.converter('unlimited')
+        ms = [FakeMaterialSuite(str(i), None) for i in range(20)]
+        scheduler = _ConversionScheduler(4)
+        try:
+            jobs = [scheduler.submit(c(x)) for x in ms
+                    for c in (limited, unlimited)]
+            results = [scheduler.result(job) for job in jobs]
+        finally:
+            scheduler.shutdown()
+        self.assertEqual(results, [(x.identifier, name) for x in ms
+                                   for name in ('limited', 'unlimited')])
+        self.assertEqual(tracker.peak['limited'], 1)
+
+    def test_results_in_any_order(self):
+        tracker = Tracker()
+        c = tracker.converter('c', limit=2)
+        ms = [FakeMaterialSuite(str(i), None) for i in range(10)]
+        scheduler = _ConversionScheduler(3)
+        try:
+            jobs = [scheduler.submit(c(x)) for x in ms]
+            results = [scheduler.result(job) for job in reversed(jobs)]
+        finally:
+            scheduler.shutdown()
+        self.assertEqual(results, [(x.identifier, 'c') for x in reversed(ms)])
+        self.assertLessEqual(tracker.peak['c'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
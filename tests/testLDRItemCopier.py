@@ -0,0 +1,204 @@
+import os
+import unittest
+from errno import EXDEV, ENOSYS, EIO
+from hashlib import md5, sha256
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldritemcopier import \
+    LDRItemCopier
+
+
+CONTENT = bytes(range(256)) * 1000
+
+
+class CountingLDRPath(LDRPath):
+    """
+    Counts how many times it's opened for reading
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def open(self, mode='rb', *args, **kwargs):
+        if 'r' in mode:
+            self.reads += 1
+        return super().open(mode, *args, **kwargs)
+
+
+class BufferedLDRPath(LDRPath):
+    _kernel_copyable = False
+
+
+class CorruptingCopier(LDRItemCopier):
+    def _copy_bytes(self, hash_algos=None):
+        digests = super()._copy_bytes(hash_algos=hash_algos)
+        with open(self.dst.path, 'r+b') as f:
+            f.write(b"corrupted")
+        return digests
+
+
+def _unsupported(errno):
+    def f(*args, **kwargs):
+        raise OSError(errno, os.strerror(errno))
+    return f
+
+
+class CopierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.src_path = join(self.tmp.name, "src")
+        self.dst_path = join(self.tmp.name, "dst")
+        with open(self.src_path, 'wb') as f:
+            f.write(CONTENT)
+        self.src = CountingLDRPath(self.src_path)
+        self.dst = LDRPath(self.dst_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def dst_content(self):
+        with open(self.dst_path, 'rb') as f:
+            return f.read()
+
+    def copier(self, cls=LDRItemCopier, **kwargs):
+        kwargs.setdefault('buffering', 4096)
+        return cls(self.src, self.dst, **kwargs)
+
+
+class TestLDRItemCopier(CopierTestCase):
+    def test_verify_bytes(self):
+        r = self.copier().copy()
+        self.assertTrue(r['copied'])
+        self.assertTrue(r['src_eqs_dst'])
+        self.assertEqual(self.dst_content(), CONTENT)
+        # Once to copy, once to compare
+        self.assertEqual(self.src.reads, 2)
+
+    def test_verify_digest(self):
+        for algo in ("md5", "sha256"):
+            if os.path.exists(self.dst_path):
+                os.remove(self.dst_path)
+            self.src.reads = 0
+            copier = self.copier(verify=algo)
+            r = copier.copy()
+            self.assertTrue(r['copied'])
+            self.assertEqual(self.dst_content(), CONTENT)
+            # The src is only read once, on its way to the dst
+            self.assertEqual(self.src.reads, 1)
+            self.assertEqual(list(copier.src_digests), [algo])
+
+    def test_invalid_verify(self):
+        with self.assertRaises(ValueError):
+            self.copier(verify="size")
+
+    def test_verify_catches_bad_copies(self):
+        for verify in ("bytes", "sha256"):
+            copier = self.copier(cls=CorruptingCopier, verify=verify,
+                                 clobber=True, max_retries=2)
+            with self.assertRaises(OSError):
+                copier.copy()
+            r = copier.copy(eat_exceptions=True)
+            self.assertFalse(r['copied'])
+
+    def test_digest_algos(self):
+        copier = self.copier(verify="sha256", digest_algos=["md5"])
+        copier.copy()
+        self.assertEqual(copier.src_digests, {
+            'md5': md5(CONTENT).hexdigest(),
+            'sha256': sha256(CONTENT).hexdigest()
+        })
+        self.assertEqual(self.src.reads, 1)
+
+    def test_no_digests(self):
+        copier = self.copier()
+        self.assertIsNone(copier.src_digests)
+        copier.copy()
+        self.assertIsNone(copier.src_digests)
+
+    def test_clobber(self):
+        with open(self.dst_path, 'wb') as f:
+            f.write(b"something else")
+        r = self.copier().copy()
+        self.assertFalse(r['copied'])
+        self.assertFalse(r['clobbered_dst'])
+        self.assertEqual(self.dst_content(), b"something else")
+        r = self.copier(clobber=True).copy()
+        self.assertTrue(r['copied'])
+        self.assertTrue(r['clobbered_dst'])
+        self.assertEqual(self.dst_content(), CONTENT)
+        # Already the same, so nothing to do
+        r = self.copier(clobber=True).copy()
+        self.assertFalse(r['copied'])
+        self.assertTrue(r['src_eqs_dst'])
+
+
+@unittest.skipUnless(hasattr(os, 'copy_file_range') or
+                     hasattr(os, 'sendfile'), "No zero-copy support")
+class TestKernelCopy(CopierTestCase):
+    def test_kernel_copy(self):
+        calls = []
+        real = os.copy_file_range if hasattr(os, 'copy_file_range') else \
+            os.sendfile
+
+        def counting(*args):
+            calls.append(args)
+            return real(*args)
+
+        with mock.patch.object(os, real.__name__, counting):
+            copier = self.copier()
+            r = copier.copy()
+        self.assertTrue(r['copied'])
+        self.assertEqual(self.dst_content(), CONTENT)
+        self.assertTrue(calls)
+        self.assertEqual(copier._bytes_copied, len(CONTENT))
+
+    def test_hashing_skips_kernel_copy(self):
+        with mock.patch.object(os, 'copy_file_range', _unsupported(EIO),
+                               create=True), \
+                mock.patch.object(os, 'sendfile', _unsupported(EIO),
+                                  create=True):
+            copier = self.copier(verify="sha256")
+            self.assertTrue(copier.copy()['copied'])
+        self.assertEqual(self.dst_content(), CONTENT)
+
+    def test_non_kernel_copyable_items(self):
+        self.dst = BufferedLDRPath(self.dst_path)
+        with mock.patch.object(os, 'copy_file_range', _unsupported(EIO),
+                               create=True), \
+                mock.patch.object(os, 'sendfile', _unsupported(EIO),
+                                  create=True):
+            self.assertTrue(self.copier().copy()['copied'])
+        self.assertEqual(self.dst_content(), CONTENT)
+
+    def test_falls_back_to_sendfile(self):
+        if not hasattr(os, 'sendfile'):
+            self.skipTest("No sendfile")
+        with mock.patch.object(os, 'copy_file_range', _unsupported(EXDEV),
+                               create=True):
+            copier = self.copier()
+            self.assertTrue(copier.copy()['copied'])
+        self.assertEqual(self.dst_content(), CONTENT)
+        self.assertEqual(copier._bytes_copied, len(CONTENT))
+
+    def test_falls_back_to_buffered_copy(self):
+        with mock.patch.object(os, 'copy_file_range', _unsupported(ENOSYS),
+                               create=True), \
+                mock.patch.object(os, 'sendfile', _unsupported(EXDEV),
+                                  create=True):
+            copier = self.copier()
+            self.assertTrue(copier.copy()['copied'])
+        self.assertEqual(self.dst_content(), CONTENT)
+        self.assertEqual(copier._bytes_copied, len(CONTENT))
+
+    def test_real_errors_raise(self):
+        with mock.patch.object(os, 'copy_file_range', _unsupported(EIO),
+                               create=True):
+            with self.assertRaises(OSError):
+                self.copier(max_retries=1).copy()
+
+
+if __name__ == "__main__":
+    unittest.main()
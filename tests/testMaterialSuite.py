@@ -0,0 +1,190 @@
+import unittest
+from os.path import join, exists
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.bit_level.lib.structures import materialsuite
+from uchicagoldrtoolsuite.bit_level.lib.structures.materialsuite import \
+    MaterialSuite
+
+
+class FakePremisRecord(object):
+    """
+    Stands in for a PremisRecord, "serializing" to whatever it was parsed
+    from plus any events added since
+    """
+    def __init__(self, source):
+        self.source = source
+        self.events = []
+        self.writes = 0
+
+    def add_event(self, event):
+        self.events.append(event)
+
+    def serialize(self):
+        return "\n".join([self.source] + self.events).encode("utf-8")
+
+    def write_to_file(self, path):
+        self.writes += 1
+        with open(path, 'wb') as f:
+            f.write(self.serialize())
+
+
+class Parser(object):
+    def __init__(self):
+        self.parsed = []
+
+    def __call__(self, item):
+        self.parsed.append(item)
+        with item.open('rb') as f:
+            return FakePremisRecord(f.read().decode("utf-8"))
+
+
+class TestMaterialSuitePremis(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.parser = Parser()
+        self.patcher = mock.patch.object(
+            materialsuite, 'ldritem_to_premisrecord', self.parser)
+        self.patcher.start()
+        self.ms = MaterialSuite("abcd")
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def premis_item(self, name, text):
+        path = join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return LDRPath(path)
+
+    def read(self, item):
+        with item.open('rb') as f:
+            return f.read().decode("utf-8")
+
+    def test_no_premis(self):
+        self.assertIsNone(self.ms.premis)
+        self.assertIsNone(self.ms.premis_record)
+        self.assertFalse(self.ms.premis_record_dirty)
+        self.assertEqual(self.parser.parsed, [])
+        with self.assertRaises(ValueError):
+            self.ms.flush_premis_record()
+
+    def test_parsed_once(self):
+        item = self.premis_item("premis.xml", "original")
+        self.ms.premis = item
+        # Nothing is parsed until the record is asked for
+        self.assertEqual(self.parser.parsed, [])
+        record = self.ms.premis_record
+        self.assertEqual(record.source, "original")
+        self.assertIs(self.ms.premis_record, record)
+        self.assertIs(self.ms.get_premis_record(), record)
+        self.assertEqual(self.parser.parsed, [item])
+        # Reading it doesn't make it dirty, so the bytes are left alone
+        self.assertFalse(self.ms.premis_record_dirty)
+        self.assertIs(self.ms.premis, item)
+        self.assertEqual(record.writes, 0)
+
+    def test_set_record_marks_dirty(self):
+        self.ms.premis = self.premis_item("premis.xml", "original")
+        record = self.ms.premis_record
+        record.add_event("an event")
+        # Edits in place aren't noticed until the record is set again
+        self.assertFalse(self.ms.premis_record_dirty)
+        self.ms.premis_record = record
+        self.assertTrue(self.ms.premis_record_dirty)
+        self.assertIs(self.ms.premis_record, record)
+        self.assertEqual(len(self.parser.parsed), 1)
+
+    def test_set_new_record_without_premis(self):
+        record = FakePremisRecord("new")
+        self.ms.premis_record = record
+        self.assertTrue(self.ms.premis_record_dirty)
+        self.assertIs(self.ms.premis_record, record)
+        self.assertEqual(self.read(self.ms.premis), "new")
+        self.assertEqual(self.parser.parsed, [])
+
+    def test_set_premis_clears_record(self):
+        self.ms.premis = self.premis_item("a.xml", "a")
+        record = self.ms.premis_record
+        record.add_event("an event")
+        self.ms.premis_record = record
+        b = self.premis_item("b.xml", "b")
+        self.ms.premis = b
+        # The unflushed edit to the old record went with it
+        self.assertFalse(self.ms.premis_record_dirty)
+        self.assertIs(self.ms.premis, b)
+        self.assertEqual(record.writes, 0)
+        self.assertEqual(self.ms.premis_record.source, "b")
+        self.assertIsNot(self.ms.premis_record, record)
+        self.assertEqual(len(self.parser.parsed), 2)
+
+    def test_del_premis(self):
+        self.ms.premis = self.premis_item("premis.xml", "original")
+        self.ms.premis_record = self.ms.premis_record
+        del self.ms.premis
+        self.assertIsNone(self.ms.premis)
+        self.assertIsNone(self.ms.premis_record)
+        self.assertFalse(self.ms.premis_record_dirty)
+
+    def test_del_premis_record(self):
+        item = self.premis_item("premis.xml", "original")
+        self.ms.premis = item
+        record = self.ms.premis_record
+        record.add_event("an event")
+        self.ms.premis_record = record
+        del self.ms.premis_record
+        self.assertFalse(self.ms.premis_record_dirty)
+        self.assertIs(self.ms.premis, item)
+        self.assertEqual(self.read(item), "original")
+        # The record is parsed again from the unchanged bytes
+        self.assertEqual(self.ms.premis_record.events, [])
+
+    def test_get_premis_flushes(self):
+        item = self.premis_item("premis.xml", "original")
+        self.ms.premis = item
+        record = self.ms.premis_record
+        record.add_event("an event")
+        self.ms.premis_record = record
+        # Looking at the MaterialSuite doesn't flush it
+        repr(self.ms)
+        self.assertEqual(record.writes, 0)
+        flushed = self.ms.premis
+        self.assertIsNot(flushed, item)
+        self.assertTrue(exists(flushed.path))
+        self.assertNotEqual(str(flushed.path), str(item.path))
+        self.assertEqual(self.read(flushed), "original\nan event")
+        self.assertFalse(self.ms.premis_record_dirty)
+        # The original bytes are left alone
+        self.assertEqual(self.read(item), "original")
+        # Once flushed the bytes are reused, and the record stays cached
+        self.assertIs(self.ms.premis, flushed)
+        self.assertIs(self.ms.get_premis(), flushed)
+        self.assertEqual(record.writes, 1)
+        self.assertIs(self.ms.premis_record, record)
+        self.assertEqual(len(self.parser.parsed), 1)
+
+    def test_flush_to_path(self):
+        self.ms.premis = self.premis_item("premis.xml", "original")
+        record = self.ms.premis_record
+        record.add_event("an event")
+        self.ms.premis_record = record
+        path = join(self.tmp.name, "flushed.xml")
+        flushed = self.ms.flush_premis_record(path)
+        self.assertEqual(str(flushed.path), path)
+        self.assertIs(self.ms.premis, flushed)
+        self.assertFalse(self.ms.premis_record_dirty)
+        self.assertEqual(self.read(flushed), "original\nan event")
+
+    def test_flushed_tmp_file_lives_with_materialsuite(self):
+        self.ms.premis_record = FakePremisRecord("new")
+        path = str(self.ms.premis.path)
+        self.assertTrue(exists(path))
+        del self.ms
+        self.assertFalse(exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from os import makedirs, stat, utime, remove
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from uchicagoldrtoolsuite.bit_level.lib.misc.materialsuiteindex import \
+    MaterialSuiteIndex, index_path_for_pairtree_root, INDEX_NAME
+
+
+class TestMaterialSuiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.pairtree_root = join(self.tmp.name, "pairtree_root")
+        makedirs(self.pairtree_root)
+        self.index = MaterialSuiteIndex(
+            index_path_for_pairtree_root(self.pairtree_root))
+        self.index.create()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_materialsuite(self, identifier, content=b"content"):
+        ms_root = join(identifier[:2], identifier[2:], "arf")
+        premis = join(ms_root, "premis.xml")
+        content_path = join(ms_root, "content.file")
+        makedirs(join(self.pairtree_root, ms_root), exist_ok=True)
+        with open(join(self.pairtree_root, premis), 'wb') as f:
+            f.write(b"<premis/>")
+        with open(join(self.pairtree_root, content_path), 'wb') as f:
+            f.write(content)
+        self.index.begin(identifier)
+        self.index.append(identifier, premis, len(b"<premis/>"),
+                          content=content_path, content_size=len(content),
+                          fixity={'sha256': 'abc'})
+        return content_path
+
+    def test_index_path(self):
+        self.assertEqual(self.index.path, join(self.tmp.name, INDEX_NAME))
+        self.assertEqual(
+            index_path_for_pairtree_root(self.pairtree_root + "/"),
+            self.index.path)
+
+    def test_create(self):
+        self.assertTrue(self.index.exists())
+        self.assertEqual(self.index.records(), {})
+        self.write_materialsuite("abcd")
+        # Creating an index which already exists leaves it be
+        self.index.create()
+        self.assertEqual(list(self.index.records()), ["abcd"])
+
+    def test_no_index(self):
+        index = MaterialSuiteIndex(join(self.tmp.name, "nothing.jsonl"))
+        self.assertFalse(index.exists())
+        self.assertEqual(index.records(), {})
+        self.assertIsNone(index.current_identifiers(self.pairtree_root))
+
+    def test_empty_index(self):
+        # Nothing to tell the readers, they'll have to look for themselves
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+
+    def test_records(self):
+        self.write_materialsuite("abcd")
+        self.write_materialsuite("efgh")
+        self.write_materialsuite("abcd", content=b"new content")
+        records = self.index.records()
+        self.assertEqual(list(records), ["abcd", "efgh"])
+        self.assertEqual(records["abcd"]["content_size"],
+                         len(b"new content"))
+        self.assertEqual(records["abcd"]["fixity"], {'sha256': 'abc'})
+        self.assertEqual(self.index.current_identifiers(self.pairtree_root),
+                         ["abcd", "efgh"])
+
+    def test_without_content(self):
+        makedirs(join(self.pairtree_root, "ab", "cd", "arf"))
+        with open(join(self.pairtree_root, "ab/cd/arf/premis.xml"), 'w') as f:
+            f.write("x")
+        self.index.append("abcd", "ab/cd/arf/premis.xml", 1)
+        self.assertEqual(self.index.records()["abcd"]["content"], None)
+        self.assertEqual(self.index.current_identifiers(self.pairtree_root),
+                         ["abcd"])
+
+    def test_malformed_line(self):
+        self.write_materialsuite("abcd")
+        with open(self.index.path, 'a') as f:
+            f.write('{"identifier": "ef')
+        with self.assertRaises(ValueError):
+            self.index.records()
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+
+    def test_record_without_identifier(self):
+        self.write_materialsuite("abcd")
+        with open(self.index.path, 'a') as f:
+            f.write('{"premis": "ef/gh/arf/premis.xml"}\n')
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+
+    def test_unfinished_write(self):
+        self.write_materialsuite("abcd")
+        self.index.begin("efgh")
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+        self.write_materialsuite("efgh")
+        self.assertEqual(self.index.current_identifiers(self.pairtree_root),
+                         ["abcd", "efgh"])
+
+    def test_pairtree_modified_since(self):
+        self.write_materialsuite("abcd")
+        # Something other than a writer added a MaterialSuite
+        makedirs(join(self.pairtree_root, "ef", "gh", "arf"))
+        st = stat(self.index.path)
+        later = st.st_mtime_ns + 10**9
+        utime(self.pairtree_root, ns=(later, later))
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+
+    def test_changed_size(self):
+        content_path = self.write_materialsuite("abcd")
+        with open(join(self.pairtree_root, content_path), 'ab') as f:
+            f.write(b"more")
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+
+    def test_missing_file(self):
+        content_path = self.write_materialsuite("abcd")
+        remove(join(self.pairtree_root, content_path))
+        self.assertIsNone(self.index.current_identifiers(self.pairtree_root))
+
+    def test_missing_pairtree_root(self):
+        self.write_materialsuite("abcd")
+        self.assertIsNone(self.index.current_identifiers(
+            join(self.tmp.name, "elsewhere")))
+
+
+if __name__ == "__main__":
+    unittest.main()
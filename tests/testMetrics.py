@@ -0,0 +1,141 @@
+import unittest
+from json import load
+from multiprocessing import get_context
+from os.path import join
+from pickle import dumps, loads
+from tempfile import TemporaryDirectory
+
+from uchicagoldrtoolsuite.core.lib.metrics import MetricsRegistry, \
+    get_metrics_registry, inc, observe, timer
+
+
+def _record_in_child(n):
+    inc("child_total", n)
+    return get_metrics_registry().drain()
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(buckets=(1, 10))
+
+    def test_counters(self):
+        self.registry.inc("files_total")
+        self.registry.inc("files_total", 2)
+        self.registry.inc("bytes_total", 5, algo="md5")
+        self.registry.inc("bytes_total", 7, algo="sha256")
+        counters = dict(((x['name'], tuple(x['labels'].items())), x['value'])
+                        for x in self.registry.summary()['counters'])
+        self.assertEqual(counters, {
+            ("files_total", ()): 3,
+            ("bytes_total", (("algo", "md5"),)): 5,
+            ("bytes_total", (("algo", "sha256"),)): 7
+        })
+
+    def test_histograms(self):
+        for x in (0.5, 1, 5, 20):
+            self.registry.observe("seconds", x)
+        h = self.registry.summary()['histograms'][0]
+        self.assertEqual((h['count'], h['sum'], h['min'], h['max']),
+                         (4, 26.5, 0.5, 20))
+        self.assertEqual(h['mean'], 26.5 / 4)
+        self.assertEqual(self.registry.snapshot()['histograms'][
+            ("seconds", ())][4], [2, 1, 1])
+
+    def test_timer(self):
+        with self.registry.timer("seconds", stage="a"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with self.registry.timer("seconds", stage="a"):
+                raise RuntimeError()
+        h = self.registry.summary()['histograms'][0]
+        self.assertEqual(h['labels'], {'stage': 'a'})
+        self.assertEqual(h['count'], 2)
+
+    def test_throughputs(self):
+        self.registry.inc("ldr_copy_bytes_total", 100, dst="disk")
+        self.registry.observe("ldr_copy_seconds", 4, dst="disk")
+        self.assertEqual(self.registry.summary()['throughputs'], [
+            {'name': "copy_bytes_per_second", 'labels': {'dst': "disk"},
+             'value': 25}
+        ])
+
+    def test_drain_and_merge(self):
+        other = MetricsRegistry(buckets=(1, 10))
+        self.registry.inc("files_total", 2)
+        self.registry.observe("seconds", 5)
+        other.inc("files_total", 3)
+        other.observe("seconds", 0.5)
+        # Snapshots have to survive being shipped between processes
+        other.merge(loads(dumps(self.registry.drain())))
+        self.assertEqual(self.registry.summary()['counters'], [])
+        s = other.snapshot()
+        self.assertEqual(s['counters'][("files_total", ())], 5)
+        self.assertEqual(s['histograms'][("seconds", ())],
+                         [2, 5.5, 0.5, 5, [1, 1, 0]])
+
+    def test_merge_mismatched_buckets(self):
+        with self.assertRaises(ValueError):
+            self.registry.merge(MetricsRegistry(buckets=(1, 2)).snapshot())
+
+    def test_reset(self):
+        self.registry.inc("files_total")
+        self.registry.reset()
+        self.assertEqual(self.registry.summary()['counters'], [])
+
+    def test_prometheus_text(self):
+        self.registry.inc("files_total", 3, dst='a "b"')
+        self.registry.observe("seconds", 5)
+        self.assertEqual(self.registry.prometheus_text().splitlines(), [
+            '# TYPE files_total counter',
+            'files_total{dst="a \\"b\\""} 3',
+            '# TYPE seconds histogram',
+            'seconds_bucket{le="1"} 0',
+            'seconds_bucket{le="10"} 1',
+            'seconds_bucket{le="+Inf"} 1',
+            'seconds_sum 5',
+            'seconds_count 1'
+        ])
+
+    def test_write(self):
+        self.registry.inc("files_total")
+        with TemporaryDirectory() as tmp:
+            json_path = join(tmp, "sub", "metrics.json")
+            prom_path = join(tmp, "metrics.prom")
+            self.registry.write_json(json_path)
+            self.registry.write_prometheus_textfile(prom_path)
+            with open(json_path) as f:
+                self.assertEqual(load(f)['counters'][0]['value'], 1)
+            with open(prom_path) as f:
+                self.assertEqual(f.read(), self.registry.prometheus_text())
+
+
+class TestProcessRegistry(unittest.TestCase):
+    def setUp(self):
+        get_metrics_registry().reset()
+
+    def tearDown(self):
+        get_metrics_registry().reset()
+
+    def test_module_functions(self):
+        inc("files_total")
+        observe("seconds", 1)
+        with timer("seconds"):
+            pass
+        s = get_metrics_registry().snapshot()
+        self.assertEqual(s['counters'][("files_total", ())], 1)
+        self.assertEqual(s['histograms'][("seconds", ())][0], 2)
+
+    def test_forked_workers_start_empty(self):
+        inc("child_total", 100)
+        with get_context('fork').Pool(2) as pool:
+            drained = pool.map(_record_in_child, [1, 2, 3])
+        registry = get_metrics_registry()
+        for x in drained:
+            registry.merge(x)
+        # Only what the workers recorded came back, not a copy of ours
+        self.assertEqual(registry.snapshot()['counters'][
+            ("child_total", ())], 106)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from re import compile as re_compile, IGNORECASE
+
+from uchicagoldrtoolsuite.core.lib.patternset import PatternSet
+
+
+class TestPatternSet(unittest.TestCase):
+    def test_empty(self):
+        p = PatternSet()
+        self.assertFalse(p)
+        self.assertEqual(len(p), 0)
+        self.assertIsNone(p.match("anything"))
+        self.assertIsNone(p.matches_subtree("anything"))
+
+    def test_match(self):
+        p = PatternSet([r".*\.tmp", r"\.DS_Store", r"thumbs\.db"])
+        self.assertTrue(p)
+        self.assertEqual(len(p), 3)
+        self.assertEqual(p.match("a/b/c.tmp"), r".*\.tmp")
+        self.assertEqual(p.match(".DS_Store"), r"\.DS_Store")
+        self.assertIsNone(p.match("a/b/c.txt"))
+
+    def test_fullmatch(self):
+        p = PatternSet([r"\.DS_Store"])
+        self.assertIsNone(p.match("a/.DS_Store"))
+        self.assertIsNone(p.match(".DS_Store.bak"))
+
+    def test_first_pattern_wins(self):
+        p = PatternSet([r"a/.*", r".*\.tmp", re_compile(r"A/.*", IGNORECASE)])
+        self.assertEqual(p.match("a/x.tmp"), r"a/.*")
+        self.assertEqual(p.match("b/x.tmp"), r".*\.tmp")
+        p = PatternSet([re_compile(r"A/.*", IGNORECASE), r"a/.*"])
+        self.assertEqual(p.match("a/x.tmp"), r"A/.*")
+
+    def test_flags(self):
+        p = PatternSet([re_compile(r".*\.TMP", IGNORECASE), r"x"])
+        self.assertEqual(p.match("a.tmp"), r".*\.TMP")
+        self.assertEqual(p.match("x"), "x")
+        self.assertIsNone(p.match("X"))
+
+    def test_backreferences(self):
+        # Group numbers would shift in a combined pattern
+        p = PatternSet([r"(b)c", r"(a)\1", r"(?P<x>d)(?P=x)"])
+        self.assertEqual(p.match("aa"), r"(a)\1")
+        self.assertEqual(p.match("dd"), r"(?P<x>d)(?P=x)")
+        self.assertIsNone(p.match("ab"))
+        self.assertEqual(p.match("bc"), r"(b)c")
+
+    def test_uncombinable_patterns(self):
+        # Group names can't be repeated in one pattern
+        p = PatternSet([r"(?P<x>a)", r"(?P<x>b)"])
+        self.assertEqual(p.match("a"), r"(?P<x>a)")
+        self.assertEqual(p.match("b"), r"(?P<x>b)")
+        self.assertIsNone(p.match("c"))
+
+    def test_matches_subtree(self):
+        p = PatternSet([r"tmp/.*", r"cache.*", r"src/.*\.o"])
+        self.assertEqual(p.matches_subtree("tmp"), r"tmp/.*")
+        self.assertEqual(p.matches_subtree("cache"), r"cache.*")
+        self.assertIsNone(p.matches_subtree("tm"))
+        self.assertIsNone(p.matches_subtree("a/tmp"))
+        self.assertIsNone(p.matches_subtree("src"))
+        # Anything pruned would have been filtered anyway
+        self.assertEqual(p.match("tmp/a/b/c"), r"tmp/.*")
+        self.assertEqual(p.match("cache/x"), r"cache.*")
+
+    def test_subtree_only_for_simple_prefixes(self):
+        p = PatternSet([r"a|b/.*", r"c\.*"])
+        self.assertIsNone(p.matches_subtree("b"))
+        self.assertIsNone(p.matches_subtree("c"))
+
+    def test_subtree_only_for_literal_prefixes(self):
+        # Pruning docs/ here would skip docs/keep/, which isn't filtered
+        patterns = [r"docs/(?!keep).*", r"tmp$.*", r"^cache/.*", r"a\b.*",
+                    r"(b)/.*", r"[cd]/.*", r"e\Z.*", r"f?/.*"]
+        p = PatternSet(patterns)
+        for x in ("docs", "docs/", "tmp", "cache", "a", "b", "c", "e", "f"):
+            self.assertIsNone(p.matches_subtree(x))
+        self.assertIsNone(p.match("docs/keep/a.txt"))
+        self.assertEqual(p.match("docs/other/a.txt"), r"docs/(?!keep).*")
+        # Escaped literals are still fine
+        p = PatternSet([r"a\.b/.*", r"c\-d/.*"])
+        self.assertEqual(p.matches_subtree("a.b"), r"a\.b/.*")
+        self.assertEqual(p.matches_subtree("c-d"), r"c\-d/.*")
+        self.assertIsNone(p.matches_subtree("axb"))
+
+
+if __name__ == "__main__":
+    unittest.main()
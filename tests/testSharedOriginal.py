@@ -0,0 +1,134 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from errno import EXDEV
+from os import makedirs, listdir, stat, strerror
+from os.path import join, exists
+from tempfile import TemporaryDirectory
+from threading import Barrier, Lock
+from time import sleep
+from unittest import mock
+
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.bit_level.lib.ldritems.ldritemcopier import \
+    LDRItemCopier
+from uchicagoldrtoolsuite.bit_level.lib.converters import sharedoriginal
+from uchicagoldrtoolsuite.bit_level.lib.converters.sharedoriginal import \
+    SharedOriginal
+
+
+CONTENT = bytes(range(256)) * 1000
+
+
+class CountingCopier(LDRItemCopier):
+    """
+    Counts the copies made, and dawdles over them so that racing callers
+    have every chance to start copies of their own
+    """
+    copies = 0
+    lock = Lock()
+
+    def copy(self, *args, **kwargs):
+        with CountingCopier.lock:
+            CountingCopier.copies += 1
+        sleep(0.05)
+        return super().copy(*args, **kwargs)
+
+
+class TestSharedOriginal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        src = join(self.tmp.name, "src")
+        with open(src, 'wb') as f:
+            f.write(CONTENT)
+        self.shared_dir = join(self.tmp.name, "shared")
+        self.shared = SharedOriginal(LDRPath(src), self.shared_dir)
+        CountingCopier.copies = 0
+        self.patcher = mock.patch.object(sharedoriginal, 'LDRItemCopier',
+                                         CountingCopier)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def target_dir(self, name):
+        d = join(self.tmp.name, name)
+        makedirs(d)
+        return d
+
+    def content(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_link_into(self):
+        path = self.shared.link_into(self.target_dir("a"), ext=".tif")
+        self.assertTrue(path.endswith(".tif"))
+        self.assertEqual(self.content(path), CONTENT)
+        shared_copy = join(self.shared_dir, listdir(self.shared_dir)[0])
+        # A hardlink to the shared copy, not another copy
+        self.assertEqual(stat(path).st_ino, stat(shared_copy).st_ino)
+
+    def test_concurrent_link_into_copies_once(self):
+        n = 8
+        barrier = Barrier(n)
+
+        def link(i):
+            barrier.wait()
+            return self.shared.link_into(self.target_dir(str(i)), ext=".tif")
+
+        with ThreadPoolExecutor(n) as pool:
+            paths = list(pool.map(link, range(n)))
+        self.assertEqual(CountingCopier.copies, 1)
+        self.assertEqual(len(listdir(self.shared_dir)), 1)
+        self.assertEqual(len(set(paths)), n)
+        for x in paths:
+            self.assertEqual(self.content(x), CONTENT)
+        self.assertEqual(len(set(stat(x).st_ino for x in paths)), 1)
+
+    def test_copies_per_extension(self):
+        a = self.shared.link_into(self.target_dir("a"), ext=".tif")
+        b = self.shared.link_into(self.target_dir("b"), ext=".tiff")
+        c = self.shared.link_into(self.target_dir("c"), ext=".tif")
+        self.assertEqual(CountingCopier.copies, 2)
+        self.assertTrue(b.endswith(".tiff"))
+        self.assertEqual(stat(a).st_ino, stat(c).st_ino)
+        self.assertNotEqual(stat(a).st_ino, stat(b).st_ino)
+
+    def test_falls_back_to_copyfile(self):
+        def cross_device(src, dst):
+            raise OSError(EXDEV, strerror(EXDEV))
+
+        with mock.patch.object(sharedoriginal, 'link', cross_device), \
+                mock.patch.object(sharedoriginal, 'copyfile',
+                                  wraps=sharedoriginal.copyfile) as copyfile:
+            paths = [self.shared.link_into(self.target_dir(x))
+                     for x in ("a", "b")]
+        self.assertEqual(copyfile.call_count, 2)
+        # The content was still only instantiated once
+        self.assertEqual(CountingCopier.copies, 1)
+        shared_copy = join(self.shared_dir, listdir(self.shared_dir)[0])
+        for x in paths:
+            self.assertEqual(self.content(x), CONTENT)
+            self.assertNotEqual(stat(x).st_ino, stat(shared_copy).st_ino)
+
+    def test_cleanup(self):
+        linked = self.shared.link_into(self.target_dir("a"))
+        with mock.patch.object(sharedoriginal, 'link',
+                               side_effect=OSError(EXDEV, strerror(EXDEV))):
+            copied = self.shared.link_into(self.target_dir("b"))
+        self.shared.cleanup()
+        self.assertFalse(exists(self.shared_dir))
+        # What was handed out is untouched
+        self.assertEqual(self.content(linked), CONTENT)
+        self.assertEqual(self.content(copied), CONTENT)
+        # Cleaning up twice is fine
+        self.shared.cleanup()
+        # And the content can still be asked for afterwards
+        again = self.shared.link_into(self.target_dir("c"))
+        self.assertEqual(self.content(again), CONTENT)
+        self.assertEqual(CountingCopier.copies, 2)
+        self.assertEqual(self.content(linked), CONTENT)
+
+
+if __name__ == "__main__":
+    unittest.main()
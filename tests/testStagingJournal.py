@@ -0,0 +1,73 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from uchicagoldrtoolsuite.bit_level.lib.misc.stagingjournal import \
+    StagingJournal, get_staging_journal
+
+
+def _record_in_child(path, i):
+    journal = get_staging_journal(path)
+    journal.record("run", "file{}".format(str(i)), str(i))
+    return id(journal)
+
+
+class TestStagingJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.path = join(self.tmp.name, "journal.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_record(self):
+        journal = StagingJournal(self.path)
+        self.assertFalse(journal.has_run("run"))
+        self.assertFalse(journal.is_staged("run", "a/b.txt"))
+        journal.record("run", "a/b.txt", "abc")
+        self.assertTrue(journal.has_run("run"))
+        self.assertTrue(journal.is_staged("run", "a/b.txt"))
+        self.assertFalse(journal.is_staged("run", "a/c.txt"))
+        self.assertFalse(journal.is_staged("other run", "a/b.txt"))
+        self.assertFalse(journal.has_run("other run"))
+
+    def test_record_twice(self):
+        journal = StagingJournal(self.path)
+        journal.record("run", "a/b.txt", "abc")
+        journal.record("run", "a/b.txt", "def")
+        self.assertTrue(journal.is_staged("run", "a/b.txt"))
+
+    def test_persistent(self):
+        StagingJournal(self.path).record("run", "a/b.txt")
+        self.assertTrue(StagingJournal(self.path).is_staged("run", "a/b.txt"))
+
+    def test_threads(self):
+        journal = StagingJournal(self.path)
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda i: journal.record("run", str(i)),
+                          range(20)))
+        self.assertTrue(all(journal.is_staged("run", str(i))
+                            for i in range(20)))
+
+    def test_get_staging_journal(self):
+        journal = get_staging_journal(self.path)
+        self.assertIs(get_staging_journal(self.path), journal)
+        self.assertIsNot(get_staging_journal(self.path + "2"), journal)
+
+    def test_forked_workers(self):
+        parent = get_staging_journal(self.path)
+        parent.record("run", "parent")
+        with get_context('fork').Pool(2) as pool:
+            ids = pool.starmap(_record_in_child,
+                               [(self.path, i) for i in range(20)])
+        # Each worker reuses the journal it inherited from the parent
+        self.assertEqual(set(ids), set([id(parent)]))
+        self.assertTrue(all(parent.is_staged("run", "file{}".format(str(i)))
+                            for i in range(20)))
+        self.assertTrue(parent.is_staged("run", "parent"))
+
+
+if __name__ == "__main__":
+    unittest.main()
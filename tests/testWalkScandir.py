@@ -0,0 +1,112 @@
+import unittest
+from os import makedirs, symlink
+from os.path import join, relpath, dirname
+from tempfile import TemporaryDirectory
+
+from uchicagoldrtoolsuite.core.lib.convenience import walk_scandir, \
+    recursive_scandir, iter_pairtree_encapsulations
+
+
+FILES = [
+    "top.txt",
+    "a/a1.txt",
+    "a/b/b1.txt",
+    "a/b/b2.txt",
+    "a/b/c/c1.txt",
+    "d/d1.txt",
+    "e/empty/.keep"
+]
+
+
+class TestWalkScandir(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        for x in FILES:
+            makedirs(join(self.root, dirname(x)), exist_ok=True)
+            with open(join(self.root, x), 'w') as f:
+                f.write(x)
+        self.dirs = set(["a", "a/b", "a/b/c", "d", "e", "e/empty"])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def walk(self, **kwargs):
+        return [relpath(x.path, self.root)
+                for x in walk_scandir(self.root, **kwargs)]
+
+    def test_walk(self):
+        for workers in (1, 4):
+            paths = self.walk(workers=workers)
+            self.assertEqual(len(paths), len(set(paths)))
+            self.assertEqual(set(paths), set(FILES) | self.dirs)
+
+    def test_dirs_before_their_contents(self):
+        for workers in (1, 4):
+            paths = self.walk(workers=workers)
+            for x in paths:
+                if dirname(x):
+                    self.assertLess(paths.index(dirname(x)), paths.index(x))
+
+    def test_descend(self):
+        for workers in (1, 4):
+            paths = self.walk(descend=lambda x: x.name != "b",
+                              workers=workers)
+            # Pruned directories are still yielded
+            self.assertIn("a/b", paths)
+            self.assertNotIn("a/b/b1.txt", paths)
+            self.assertNotIn("a/b/c", paths)
+            self.assertIn("d/d1.txt", paths)
+
+    def test_symlinks(self):
+        symlink(join(self.root, "d"), join(self.root, "a", "link_to_d"))
+        symlink(join(self.root, "top.txt"), join(self.root, "e", "link.txt"))
+        for workers in (1, 4):
+            paths = self.walk(workers=workers)
+            self.assertIn("a/link_to_d", paths)
+            self.assertIn("e/link.txt", paths)
+            self.assertNotIn("a/link_to_d/d1.txt", paths)
+            paths = self.walk(follow_symlinks=True, workers=workers)
+            # d is only walked once, through whichever path reaches it first
+            self.assertEqual(
+                len([x for x in paths if x.endswith("d1.txt")]), 1)
+
+    def test_symlink_loops(self):
+        symlink(self.root, join(self.root, "a", "b", "loop"))
+        symlink(join(self.root, "a"), join(self.root, "d", "loop"))
+        for workers in (1, 4):
+            paths = self.walk(follow_symlinks=True, workers=workers)
+            self.assertEqual(set(x for x in paths if "loop" not in x),
+                             set(FILES) | self.dirs)
+            self.assertEqual(set(x for x in paths if "loop" in x),
+                             set(["a/b/loop", "d/loop"]))
+
+    def test_recursive_scandir(self):
+        # Follows symlinks, but terminates loops
+        symlink(self.root, join(self.root, "a", "loop"))
+        paths = [relpath(x.path, self.root)
+                 for x in recursive_scandir(self.root)]
+        self.assertEqual(set(paths), set(FILES) | self.dirs | set(["a/loop"]))
+
+    def test_stop_early(self):
+        for workers in (1, 4):
+            walk = walk_scandir(self.root, workers=workers)
+            next(walk)
+            walk.close()
+
+    def test_pairtree_encapsulations(self):
+        encapsulated = ["pairtree_root/ab/cd/arf", "pairtree_root/ef/arf"]
+        for x in encapsulated:
+            makedirs(join(self.root, x, "nested", "arf"))
+            with open(join(self.root, x, "content.file"), 'w') as f:
+                f.write(x)
+        for workers in (1, 4):
+            found = [relpath(x, self.root) for x in
+                     iter_pairtree_encapsulations(
+                         join(self.root, "pairtree_root"), "arf",
+                         workers=workers)]
+            self.assertEqual(sorted(found), sorted(encapsulated))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,15 @@
-from sys import exc_info
-from os import makedirs
-from os.path import join, expanduser, exists, dirname, isdir
+from sys import exc_info, stderr
+from os import makedirs, environ, getpid, replace, register_at_fork
+from os.path import join, expanduser, exists, dirname, isdir, getsize
 from logging import getLogger, StreamHandler, Formatter, FileHandler
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler
+from queue import Queue, Empty
+from threading import Thread, Lock
 from tempfile import gettempdir
 from functools import wraps
 from uuid import uuid4
 from logging import INFO
 
-from pkg_resources import Requirement, resource_filename, resource_stream, \
-    resource_string
-from fasteners import interprocess_locked
 
 # Initializes some key tools for working with the package structure, as well as
 # configuring the global logger and the global config.
@@ -18,7 +17,12 @@ from fasteners import interprocess_locked
 
 def retrieve_resource_filepath(resource_path, pkg_name=None):
     """
-    retrieves the filepath of some package resource, extracting it if need be
+    retrieves the filepath of some package resource
+
+    Resources (configs/, controlledvocabs/, etc) live alongside the package,
+    rather than in it, so they're looked for next to the package first (a
+    source checkout or develop install) and then relative to the installed
+    distribution.
 
     __Args__
 
@@ -34,7 +38,17 @@ def retrieve_resource_filepath(resource_path, pkg_name=None):
     """
     if pkg_name is None:
         pkg_name = __name__.split('.')[0]
-    return resource_filename(Requirement.parse(pkg_name), resource_path)
+    # Imported here, rather than at the top, to keep startup fast - every
+    # ldr* command imports this module
+    from importlib.resources import files
+    beside_pkg = join(dirname(str(files(pkg_name))), resource_path)
+    if exists(beside_pkg):
+        return beside_pkg
+    from importlib.metadata import distribution, PackageNotFoundError
+    try:
+        return str(distribution(pkg_name).locate_file(resource_path))
+    except PackageNotFoundError:
+        return beside_pkg
 
 
 def retrieve_resource_string(resource_path, pkg_name=None):
@@ -53,9 +67,8 @@ def retrieve_resource_string(resource_path, pkg_name=None):
 
     * (str): the resource contents
     """
-    if pkg_name is None:
-        pkg_name = __name__.split('.')[0]
-    return resource_string(Requirement.parse(pkg_name), resource_path)
+    with retrieve_resource_stream(resource_path, pkg_name) as f:
+        return f.read()
 
 
 def retrieve_resource_stream(resource_path, pkg_name=None):
@@ -74,15 +87,21 @@ def retrieve_resource_stream(resource_path, pkg_name=None):
 
     * (io): an io stream
     """
-    if pkg_name is None:
-        pkg_name = __name__.split('.')[0]
-    return resource_stream(Requirement.parse(pkg_name), resource_path)
+    return open(retrieve_resource_filepath(resource_path, pkg_name), 'rb')
 
 
 # The default root logger
 root_log = getLogger(__name__)
 root_log.setLevel("DEBUG")
 
+
+def _sync_root_log_level():
+    # Records below the level of every handler would only be thrown away,
+    # so have the loggers skip creating (and formatting) them at all.
+    levels = [h.level for h in root_log.handlers]
+    root_log.setLevel(min(levels) if levels else "DEBUG")
+
+
 def liblog_filter(record, override_level=20):
     if record.levelno > override_level:
         return 1
@@ -95,15 +114,135 @@ _f = Formatter("[%(levelname)8s] [%(asctime)s] [%(name)s] = %(message)s",
                datefmt="%Y-%m-%dT%H:%M:%S")
 
 
-class MultiprocessRotatingFileHandler(RotatingFileHandler):
+_master_log_lock_path = join(gettempdir(), '{}_rootlog.lock'.format(__name__))
+
+_STOP = object()
+
+
+class MasterLogWriter(object):
+    """
+    Writes lines to a rotating log file which many processes share
+
+    Lines are queued, and a thread of this writer's own drains the queue,
+    appending whatever has accumulated in one go. The interprocess lock
+    which keeps concurrent ldr* processes from clobbering each other's
+    lines and rotations is taken once per batch, not once per line.
+
+    Forked children (eg ProcessPoolExecutor workers) start a thread of
+    their own the first time they log, and drain it on exit.
+    """
+    def __init__(self, path, max_bytes=0, backup_count=0, batch_size=1000):
+        """
+        __Args__
+
+        1. path (str): The log file
+
+        __KWArgs__
+
+        * max_bytes (int): Rotate the file before it would exceed this
+            size. Never rotate if 0.
+        * backup_count (int): How many rotated files to keep. Never rotate
+            if 0.
+        * batch_size (int): The most lines to write in one go
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self._reset()
+        register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Nothing from another process (including its queue and locks,
+        # which may have been held mid-fork) is any use to us
+        self.queue = Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = Lock()
+
+    def put(self, line):
+        if self._thread is None or self._pid != getpid():
+            self._start()
+        self.queue.put(line)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None and self._pid == getpid():
+                return
+            self._pid = getpid()
+            from fasteners import InterProcessLock
+            self._file_lock = InterProcessLock(_master_log_lock_path)
+            self._thread = Thread(target=self._run, daemon=True,
+                                  name="MasterLogWriter")
+            self._thread.start()
+            # multiprocessing children leave via os._exit(), skipping
+            # atexit, but they do run multiprocessing's finalizers
+            from multiprocessing.util import Finalize
+            Finalize(self, self.stop, exitpriority=0)
+
+    def stop(self):
+        """
+        Write out everything queued so far and stop the writing thread
+        """
+        with self._start_lock:
+            if self._thread is None or self._pid != getpid():
+                return
+            self.queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            lines = [x for x in batch if x is not _STOP]
+            if lines:
+                try:
+                    self._write(lines)
+                except Exception as e:
+                    stderr.write("Failed writing to {}: {}\n".format(
+                        self.path, str(e)))
+            if len(lines) != len(batch):
+                return
+
+    def _write(self, lines):
+        data = "".join(x + "\n" for x in lines).encode("utf-8")
+        with self._file_lock:
+            if self.max_bytes > 0 and self.backup_count > 0 and \
+                    exists(self.path) and \
+                    getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'ab') as f:
+                f.write(data)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = "{}.{}".format(self.path, str(i))
+            if exists(src):
+                replace(src, "{}.{}".format(self.path, str(i + 1)))
+        replace(self.path, self.path + ".1")
+
+
+class MasterLogHandler(QueueHandler):
     """
-    Mix some fasteners in with stdlib logging, to avoid disasters in
-    multipleprocesses writing to the same file via the root log
+    Hands records to a MasterLogWriter, so the logging thread only pays
+    for formatting the record and queueing the line
     """
-    @interprocess_locked(join(gettempdir(), '{}_rootlog.lock'.format(__name__)))
-    def emit(self, record):
-        super().emit(record)
-        self.close()
+    def __init__(self, writer):
+        super().__init__(None)
+        self.writer = writer
+
+    def enqueue(self, record):
+        # prepare() has already formatted the whole record into .msg
+        self.writer.put(record.msg)
+
+    def close(self):
+        self.writer.stop()
+        super().close()
 
 
 def get_log_dir():
@@ -121,8 +260,8 @@ def get_log_dir():
 def activate_master_log_file(logdir=None, max_log_size=1000000000,
                              num_backups=4, verbosity="DEBUG"):
     """
-    User our fancy subclass of RotatingFileHandler to write to a master
-    log file safely from multiple processes
+    Write to a master log file, which any number of processes may share,
+    via a MasterLogWriter
     """
     if logdir is None:
         logdir = get_log_dir()
@@ -131,13 +270,13 @@ def activate_master_log_file(logdir=None, max_log_size=1000000000,
         if exists(dirname(mlog_filepath)):
             raise ValueError('Logging dir would clobber something!')
         makedirs(dirname(mlog_filepath), exist_ok=True)
-    h1 = MultiprocessRotatingFileHandler(mlog_filepath,
-                                         maxBytes=int(max_log_size/5),
-                                         backupCount=num_backups,
-                                         encoding="UTF-8")
+    h1 = MasterLogHandler(MasterLogWriter(mlog_filepath,
+                                          max_bytes=int(max_log_size/5),
+                                          backup_count=num_backups))
     h1.setLevel(verbosity)
     h1.setFormatter(_f)
     root_log.addHandler(h1)
+    _sync_root_log_level()
     root_log.info("Now logging to master log file: " +
                   "{} @ {}".format(mlog_filepath, verbosity))
 
@@ -149,6 +288,7 @@ def activate_stdout_log(verbosity="INFO", filter_lib=True):
     if filter_lib:
         h.addFilter(liblog_filter)
     root_log.addHandler(h)
+    _sync_root_log_level()
     root_log.info("Now logging to stdout @ {}".format(verbosity))
 
 
@@ -171,12 +311,14 @@ def activate_job_log_file(job_logdir=None, verbosity="DEBUG"):
     h2.setLevel(verbosity)
     h2.setFormatter(_f)
     root_log.addHandler(h2)
+    _sync_root_log_level()
     root_log.info("Now logging to job log file: "
                   "{} @ {}".format(jlog_filepath, verbosity))
 
 
 def clear_root_log_handlers():
     root_log.handlers = []
+    _sync_root_log_level()
 
 # Uncaught exception handling / Decorator
 
@@ -196,8 +338,26 @@ def handler(e, exc_info=None, log=None,
         raise(e)
 
 
-def log_aware(log=None, raise_e=True):
+# Set UCLDR_LOG_ACCESSORS in the environment to have exceptions in accessors
+# logged like everywhere else, at the cost of a wrapper around every call
+LOG_AWARE_ACCESSORS = bool(environ.get("UCLDR_LOG_ACCESSORS"))
+
+
+def log_aware(log=None, raise_e=True, accessor=False):
+    """
+    Decorate a function so that any exception it raises is logged
+
+    __KWArgs__
+
+    * log (Logger): The logger to log exceptions to, defaults to the root log
+    * raise_e (bool): Whether to re-raise exceptions after logging them
+    * accessor (bool): Marks trivial getters/setters, which are called far
+        too often to be worth wrapping. Unless LOG_AWARE_ACCESSORS is set
+        they're returned undecorated.
+    """
     def _log_aware(function):
+        if accessor and not LOG_AWARE_ACCESSORS:
+            return function
         @wraps(function)
         def wrapper(*args, **kwargs):
             try:
@@ -1,12 +1,9 @@
 from logging import getLogger
 from os.path import join
-from tempfile import TemporaryDirectory
 from configparser import NoOptionError
 
 from pypairtree.utils import identifier_to_path
 
-from pypremis.lib import PremisRecord
-
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.app.abc.cliapp import CLIApp
 from ..lib.ldritems.ldrpath import LDRPath
@@ -125,6 +122,22 @@ class PresformCreator(CLIApp):
                                  action='store',
                                  default=None)
 
+        self.parser.add_argument("--libre_office_instances",
+                                 help="Convert office documents with a " +
+                                 "pool of this many persistent " +
+                                 "LibreOffice instances, rather than " +
+                                 "starting LibreOffice for every " +
+                                 "conversion. Requires the LibreOffice " +
+                                 "python bindings.",
+                                 type=int, action='store',
+                                 default=0)
+        self.parser.add_argument("--workers", help="The number of " +
+                                 "conversions to run at once. Converters " +
+                                 "which can't run concurrently with " +
+                                 "themselves are still run one at a time.",
+                                 type=int, action='store',
+                                 default=1)
+
         # Parse arguments into args namespace
         args = self.parser.parse_args()
         self.process_universal_args(args)
@@ -146,6 +159,12 @@ class PresformCreator(CLIApp):
             dto['ffmpeg_path'] = args.ffmpeg_path
         if args.libre_office_path is not None:
             dto['libre_office_path'] = args.libre_office_path
+        if args.libre_office_instances > 0:
+            from ..lib.misc.libreofficepool import LibreOfficePool
+            dto['libre_office_pool'] = LibreOfficePool(
+                dto.get('libre_office_path', 'soffice'),
+                size=args.libre_office_instances
+            )
 
         if args.staging_env:
             staging_env = args.staging_env
@@ -198,43 +217,42 @@ class PresformCreator(CLIApp):
             from ..lib.converters.audioconverter import AudioConverter
             converters.append(AudioConverter)
 
-        working_dir = TemporaryDirectory()
-        for ms in src_archive.materialsuite_list:
-            src_ms_id = ms.identifier
-            src_livepremis_path = join(args.live_premis_root,
-                                       str(identifier_to_path(args.target_archive_identifier)),
-                                       "arf",
-                                       "pairtree_root",
-                                       str(identifier_to_path(src_ms_id)),
-                                       "arf", "premis.xml")
-            ms.premis = LDRPath(src_livepremis_path)
-            premis = PremisRecord(frompath=src_livepremis_path)
-            try:
-                for relation in premis.get_object_list()[0].get_relationship():
-                    if relation.get_relationshipType() == 'derivation' \
-                            and relation.get_relationshipSubType() == 'is Source of':
-                        has_presforms = True
-                        break
-            except KeyError:
-                pass
-            presforms = GenericPresformCreator.instantiate_and_make_presforms(
-                ms,
-                working_dir.name,
-                converters,
-                dto
-            )
-            for x in presforms:
-                dst_stage.materialsuite_list.append(x)
-            copier = LDRItemCopier(ms.premis, LDRPath(src_livepremis_path), clobber=True)
-            copier.copy()
+        def livepremis_path(ms):
+            return join(args.live_premis_root,
+                        str(identifier_to_path(args.target_archive_identifier)),
+                        "arf",
+                        "pairtree_root",
+                        str(identifier_to_path(ms.identifier)),
+                        "arf", "premis.xml")
 
+        def with_live_premis(materialsuites):
+            for ms in materialsuites:
+                ms.premis = LDRPath(livepremis_path(ms))
+                yield ms
 
+        def write_live_premis(ms, presforms):
+            copier = LDRItemCopier(ms.premis, LDRPath(livepremis_path(ms)),
+                                   clobber=True)
+            copier.copy()
+
+        presform_creator = GenericPresformCreator(dst_stage, converters)
+        try:
+            presform_creator.process(
+                presform_presforms=True,
+                data_transfer_obj=dto,
+                materialsuites=with_live_premis(
+                    src_archive.materialsuite_list),
+                workers=args.workers,
+                callback=write_live_premis
+            )
+        finally:
+            if 'libre_office_pool' in dto:
+                dto['libre_office_pool'].shutdown()
 
         log.info("Writing...")
         writer = FileSystemStageWriter(dst_stage, staging_env,
                                        eq_detect=args.eq_detect)
         writer.write()
-        del working_dir
         log.info("Complete")
 
 
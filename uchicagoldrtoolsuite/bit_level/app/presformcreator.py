@@ -103,6 +103,22 @@ class PresformCreator(CLIApp):
                                  action='store',
                                  default=None)
 
+        self.parser.add_argument("--libre_office_instances",
+                                 help="Convert office documents with a " +
+                                 "pool of this many persistent " +
+                                 "LibreOffice instances, rather than " +
+                                 "starting LibreOffice for every " +
+                                 "conversion. Requires the LibreOffice " +
+                                 "python bindings.",
+                                 type=int, action='store',
+                                 default=0)
+        self.parser.add_argument("--workers", help="The number of " +
+                                 "conversions to run at once. Converters " +
+                                 "which can't run concurrently with " +
+                                 "themselves are still run one at a time.",
+                                 type=int, action='store',
+                                 default=1)
+
         # Parse arguments into args namespace
         args = self.parser.parse_args()
         self.process_universal_args(args)
@@ -124,6 +140,12 @@ class PresformCreator(CLIApp):
             dto['ffmpeg_path'] = args.ffmpeg_path
         if args.libre_office_path is not None:
             dto['libre_office_path'] = args.libre_office_path
+        if args.libre_office_instances > 0:
+            from ..lib.misc.libreofficepool import LibreOfficePool
+            dto['libre_office_pool'] = LibreOfficePool(
+                dto.get('libre_office_path', 'soffice'),
+                size=args.libre_office_instances
+            )
 
         if args.staging_env:
             staging_env = args.staging_env
@@ -162,8 +184,13 @@ class PresformCreator(CLIApp):
             converters.append(AudioConverter)
 
         presform_creator = GenericPresformCreator(stage, converters)
-        presform_creator.process(skip_existing=args.skip_existing,
-                                 data_transfer_obj=dto)
+        try:
+            presform_creator.process(skip_existing=args.skip_existing,
+                                     data_transfer_obj=dto,
+                                     workers=args.workers)
+        finally:
+            if 'libre_office_pool' in dto:
+                dto['libre_office_pool'].shutdown()
 
         log.info("Writing...")
         writer = FileSystemStageWriter(stage, staging_env,
@@ -1,10 +1,10 @@
 from logging import getLogger
 from os.path import join
-from re import compile as re_compile
 from json import dumps
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.app.abc.cliapp import CLIApp
+from uchicagoldrtoolsuite.core.lib.patternset import PatternSet
 from ..lib.readers.filesystemstagereader import FileSystemStageReader
 from ..lib.processors.genericpruner import GenericPruner
 from ..lib.writers.filesystemstagewriter import FileSystemStageWriter
@@ -100,8 +100,8 @@ class Pruner(CLIApp):
             log.info("Pruning... (final={})".format(str(args.final_decision)))
             p = GenericPruner(
                 staging_structure,
-                callback_args=[[re_compile(x) for x in args.selection_patterns]],
-                callback_kwargs={'exclude_patterns': [re_compile(x) for x in args.exclusion_pattern]},
+                callback_args=[PatternSet(args.selection_patterns)],
+                callback_kwargs={'exclude_patterns': PatternSet(args.exclusion_pattern)},
                 final=args.final_decision, in_place_delete=True
             )
             r = p.prune()
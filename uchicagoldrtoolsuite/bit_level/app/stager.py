@@ -1,19 +1,23 @@
 from os.path import join, dirname, relpath
+from shutil import rmtree
+from pathlib import Path
+from uuid import uuid4
 from logging import getLogger
-from re import compile as re_compile
-
-from pypremis.lib import PremisRecord
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.app.abc.cliapp import CLIApp
-from uchicagoldrtoolsuite.core.lib.convenience import recursive_scandir, \
-    TemporaryFilePath
+from uchicagoldrtoolsuite.core.lib.convenience import walk_scandir
+from uchicagoldrtoolsuite.core.lib.patternset import PatternSet
+from uchicagoldrtoolsuite.core.lib.metrics import get_metrics_registry
 from ..lib.readers.filesystemstagereader import FileSystemStageReader
 from ..lib.externalreaders.externalfilesystemmaterialsuitereader import \
     ExternalFileSystemMaterialSuiteReader
 from ..lib.writers.filesystemstagewriter import FileSystemMaterialSuiteWriter
 from ..lib.writers.filesystemstagewriter import FileSystemStageWriter
 from ..lib.structures.stage import Stage
+from ..lib.processors.genericpremiscreator import GenericPREMISCreator
+from ..lib.misc.stagingjournal import get_staging_journal, JOURNAL_NAME
 
 
 __author__ = "Brian Balsamo, Tyler Danstrom"
@@ -42,6 +46,87 @@ def launch():
     app.main()
 
 
+def stage_file(path, root, run_name, segment_path, encapsulation,
+               eq_detect="bytes", verify="bytes", direct_ingest=False,
+               journal_path=None, fixity_algos=None, threaded_hashing=False):
+    """
+    Read a single external file as a MaterialSuite and write it into a stage
+
+    This is module level (rather than a method) so that it can be shipped
+    off to worker processes.
+
+    __Args__
+
+    1. path (str): The path to the external file
+    2. root (str): The root to compute the file's canonical name relative to
+    3. run_name (str): The run name to record in the ingestion event
+    4. segment_path (str): The path to the stage's pairtree root
+    5. encapsulation (str): The pairtree encapsulation of the stage
+
+    __KWArgs__
+
+    * eq_detect (str): The equality metric to use on writing
+    * verify (str): How to audit copies as they are made
+    * direct_ingest (bool): Copy the file straight to its final location
+        in the stage, rather than via a tmp copy
+    * journal_path (str): The StagingJournal to record the file in once it
+        has been staged. Files are only recorded if there is a run_name.
+    * fixity_algos ([str]): The fixity algos to record in the PREMIS,
+        defaults to GenericPREMISCreator.fixity_algos
+    * threaded_hashing (bool): Whether or not to compute fixity values with
+        the hashers in a thread pool
+
+    __Returns__
+
+    * path (str): The path that was staged
+    """
+    target_identifier = uuid4().hex
+    materialsuite_root = FileSystemMaterialSuiteWriter.\
+        compute_materialsuite_root(target_identifier, segment_path,
+                                   encapsulation)
+    content_destination = None
+    if direct_ingest:
+        content_destination = str(Path(materialsuite_root, 'content.file'))
+    p = ExternalFileSystemMaterialSuiteReader(
+        path, root=root, run_name=run_name, verify=verify,
+        target_identifier=target_identifier,
+        content_destination=content_destination,
+        fixity_algos=fixity_algos, threaded_hashing=threaded_hashing
+    )
+    try:
+        ms = p.read()
+        w = FileSystemMaterialSuiteWriter(
+            ms, segment_path, eq_detect=eq_detect,
+            encapsulation=encapsulation, verify=verify
+        )
+        w.write()
+    except Exception:
+        # Direct ingest (or a writer which died part way through) can leave
+        # a content.file without a premis.xml in the stage. The identifier
+        # is brand new, so anything at its MaterialSuite root is ours.
+        log.warn("Staging {} failed, removing {}".format(
+            path, str(materialsuite_root)))
+        rmtree(str(materialsuite_root), ignore_errors=True)
+        raise
+    finally:
+        # Free the tmp copy now, rather than whenever the reader gets
+        # collected, so tmp space only ever holds the files currently
+        # being staged.
+        p.working_dir.cleanup()
+    if journal_path is not None and run_name is not None:
+        get_staging_journal(journal_path).record(
+            run_name, relpath(path, root), target_identifier
+        )
+    return path
+
+
+def _stage_file_in_worker(*args, **kwargs):
+    # Metrics recorded in a worker process would otherwise never make it
+    # into the parent's summary, so they're sent back with each result
+    path = stage_file(*args, **kwargs)
+    return path, get_metrics_registry().drain()
+
+
 class Stager(CLIApp):
     """
     takes an external location and formats it's contents into the
@@ -88,11 +173,52 @@ class Stager(CLIApp):
                                  "LDRItemCopier for supported schemes.",
                                  type=str, action='store',
                                  default="bytes")
+        self.parser.add_argument("--verify", help="How to audit copies " +
+                                 "as they are made. 'bytes' re-reads the " +
+                                 "source and destination, a hash algo " +
+                                 "digests the source while copying and " +
+                                 "reads back only the destination, check " +
+                                 "LDRItemCopier for supported schemes.",
+                                 type=str, action='store',
+                                 default="bytes")
+        self.parser.add_argument("--direct_ingest", help="Copy each " +
+                                 "file straight to its final location in " +
+                                 "the stage, computing its fixity values " +
+                                 "along the way, rather than copying it " +
+                                 "into tmp space first.",
+                                 action='store_true')
+        self.parser.add_argument("--fixity_algo", help="A fixity algo to " +
+                                 "record in each file's PREMIS. May be " +
+                                 "given more than once. Defaults to md5, " +
+                                 "sha256, crc32 and adler32.",
+                                 action='append', default=[])
+        self.parser.add_argument("--threaded_hashing", help="Compute each " +
+                                 "file's fixity values with one thread per " +
+                                 "algo, which can be faster for large files.",
+                                 action='store_true')
         self.parser.add_argument("--run_name", help="An optional name " +
                                  "for this run to be recorded in PREMIS " +
                                  "ingestion events for later querying.",
                                  type=str, action='store',
                                  default=None)
+        self.parser.add_argument("--workers", help="The number of " +
+                                 "processes to stage files with. At most " +
+                                 "this many files are in flight (and " +
+                                 "occupying tmp space) at once.",
+                                 type=int, action='store',
+                                 default=1)
+        self.parser.add_argument("--walk_workers", help="The number of " +
+                                 "directories in the source to list at " +
+                                 "once. Raising this can speed up " +
+                                 "enumerating sources on network file " +
+                                 "systems considerably.",
+                                 type=int, action='store',
+                                 default=1)
+        self.parser.add_argument("--skip_symlinks", help="Skip symlinks " +
+                                 "in the source, rather than staging their " +
+                                 "targets and walking into symlinked " +
+                                 "directories. Skipped symlinks are logged.",
+                                 action='store_true')
 
         # Parse arguments into args namespace
         args = self.parser.parse_args()
@@ -102,8 +228,19 @@ class Stager(CLIApp):
         if args.resume and not args.run_name:
             raise RuntimeError("In order to resume a run you must specify " +
                                "a run name")
+        if args.workers < 1:
+            raise ValueError("--workers must be at least 1")
+        if args.walk_workers < 1:
+            raise ValueError("--walk_workers must be at least 1")
+        fixity_algos = args.fixity_algo or None
+        if fixity_algos is not None:
+            for x in fixity_algos:
+                if x not in GenericPREMISCreator.computable_fixity_algos([x]):
+                    raise ValueError(
+                        "Can't compute {} fixity values".format(x)
+                    )
 
-        filter_patterns = [re_compile(x) for x in args.filter_pattern]
+        filter_patterns = PatternSet(args.filter_pattern)
 
         if args.staging_env:
             destination_root = args.staging_env
@@ -123,31 +260,45 @@ class Stager(CLIApp):
         log.info("Source: " + args.directory)
         log.info("Source Root: " + root)
 
-        log.info("Reading Stage...")
-        stage = FileSystemStageReader(destination_root, args.staging_id).read()
-
         log.info("Stage: " + join(destination_root, args.staging_id))
 
-        _exists = []
-        if args.resume:
-            for ms in stage.materialsuite_list:
+        # We need a stage writer here just for the stage skeleton, we're going
+        # to manually handle dealing with the nested writers so we can stage
+        # things file by file rather than having to load the whole incoming
+        # directory into the tmp dir
+        stage_writer = FileSystemStageWriter(
+            Stage(args.staging_id), destination_root
+        )
+        stage_writer._build_skeleton()
+        computed_segment_path = join(
+            destination_root, args.staging_id, 'pairtree_root'
+        )
+        journal_path = join(
+            destination_root, args.staging_id, 'admin', JOURNAL_NAME
+        )
+        journal = get_staging_journal(journal_path)
+
+        if args.resume and not journal.has_run(args.run_name):
+            # The run predates the journal (or never staged anything), fall
+            # back to digging the run out of the PREMIS, and journal what we
+            # find so this only ever has to happen once.
+            log.info("Run not in the journal, reading the Stage's PREMIS...")
+            reader = FileSystemStageReader(destination_root, args.staging_id)
+            for ms in reader.iter_materialsuites():
                 try:
-                    with TemporaryFilePath() as tmp_path:
-                        with ms.premis.open() as src:
-                            with open(tmp_path, 'wb') as dst:
-                                dst.write(src.read())
-                        premis = PremisRecord(frompath=tmp_path)
-                        obj = premis.get_object_list()[0]
-                        originalName = obj.get_originalName()
-                        run_id = None
-                        for event in premis.get_event_list():
-                            for eventDetailInformation in \
-                                    event.get_eventDetailInformation():
-                                eventDetail = eventDetailInformation.get_eventDetail()
-                                if eventDetail.startswith("Run Identifier"):
-                                    run_id = eventDetail.split(": ")[1]
-                        if run_id == args.run_name:
-                            _exists.append(originalName)
+                    premis = ms.premis_record
+                    obj = premis.get_object_list()[0]
+                    originalName = obj.get_originalName()
+                    run_id = None
+                    for event in premis.get_event_list():
+                        for eventDetailInformation in \
+                                event.get_eventDetailInformation():
+                            eventDetail = eventDetailInformation.get_eventDetail()
+                            if eventDetail.startswith("Run Identifier"):
+                                run_id = eventDetail.split(": ")[1]
+                    if run_id == args.run_name:
+                        journal.record(args.run_name, originalName,
+                                       ms.identifier)
                 except Exception as e:
                     log.warn(
                         "An exception occured in resumption duplicate " +
@@ -157,66 +308,104 @@ class Stager(CLIApp):
                         "The Exception was: {}".format(str(e))
                     )
                     raise e
-            _exists = set(_exists)
 
         log.info("Processing & Writing...")
 
-        # We need a stage writer here just for the stage skeleton, we're going
-        # to manually handle dealing with the nested writers so we can stage
-        # things file by file rather than having to load the whole incoming
-        # directory into the tmp dir
-        stage_writer = FileSystemStageWriter(
-            Stage(args.staging_id), destination_root
-        )
-        stage_writer._build_skeleton()
-        computed_segment_path = join(
-            destination_root, args.staging_id, 'pairtree_root'
-        )
+        if args.workers > 1:
+            log.info("Staging with {} workers".format(str(args.workers)))
+            pool = ProcessPoolExecutor(max_workers=args.workers)
+        else:
+            pool = None
+        in_flight = set()
 
-        for x in recursive_scandir(args.directory):
-            if not x.is_file():
-                continue
-            _filter = False
-            for f_patt in filter_patterns:
-                if f_patt.fullmatch(relpath(x.path, root)):
-                    log.debug(
-                        "A filter pattern matched a file path, skipping. " +
-                        "Pattern: {}, Path: {}".format(
-                            f_patt.pattern,
-                            relpath(x.path, root)
-                        )
+        def finished(f):
+            path, metrics = f.result()
+            get_metrics_registry().merge(metrics)
+            log.debug("Staged {}".format(path))
+
+        def descend(d):
+            # Don't walk directories whose every file would be filtered
+            f_patt = filter_patterns.matches_subtree(relpath(d.path, root))
+            if f_patt is not None:
+                log.debug(
+                    "A filter pattern matched a directory, skipping it. " +
+                    "Pattern: {}, Path: {}".format(
+                        f_patt, relpath(d.path, root)
                     )
-                    _filter = True
-                    break
-            if _filter:
-                continue
-            if args.resume:
-                log.debug("Determining if the run name and relpath " +
-                          "already exist in the stage")
-                if relpath(x.path, root) in _exists:
+                )
+                return False
+            return True
+
+        follow_symlinks = not args.skip_symlinks
+        # finished() re-raises anything a worker raised, so make sure the
+        # pool is shut down whether or not we get to the end of the walk
+        try:
+            for x in walk_scandir(args.directory, descend=descend,
+                                  follow_symlinks=follow_symlinks,
+                                  workers=args.walk_workers):
+                if not x.is_file(follow_symlinks=follow_symlinks):
+                    if x.is_symlink() and not follow_symlinks:
+                        log.warn("Skipping symlink {}".format(x.path))
+                    continue
+                x_relpath = relpath(x.path, root)
+                f_patt = filter_patterns.match(x_relpath)
+                if f_patt is not None:
                     log.debug(
-                        "{} appears in the existing stage, skipping".format(
-                             relpath(x.path, root)
-                        )
+                        "A filter pattern matched a file path, skipping. " +
+                        "Pattern: {}, Path: {}".format(f_patt, x_relpath)
                     )
                     continue
-                else:
-                    log.debug(
-                        "{} does not appear in the existing stage, processing".format(
-                            relpath(x.path, root)
+                if args.resume:
+                    log.debug("Determining if the run name and relpath " +
+                              "already exist in the stage")
+                    if journal.is_staged(args.run_name, x_relpath):
+                        log.debug(
+                            "{} appears in the existing stage, skipping".format(
+                                 x_relpath
+                            )
                         )
-                    )
+                        continue
+                    else:
+                        log.debug(
+                            "{} does not appear in the existing stage, processing".format(
+                                x_relpath
+                            )
+                        )
+
+                stage_file_args = (
+                    x.path, root, args.run_name, computed_segment_path,
+                    stage_writer.encapsulation
+                )
+                stage_file_kwargs = {
+                    'eq_detect': args.eq_detect,
+                    'verify': args.verify,
+                    'direct_ingest': args.direct_ingest,
+                    'journal_path': journal_path,
+                    'fixity_algos': fixity_algos,
+                    'threaded_hashing': args.threaded_hashing
+                }
+                if pool is None:
+                    stage_file(*stage_file_args, **stage_file_kwargs)
+                    continue
+                # Backpressure - don't walk any further into the source until
+                # a worker frees up, so we never queue (or copy into tmp) more
+                # than --workers files at a time.
+                if len(in_flight) >= args.workers:
+                    done, in_flight = wait(in_flight,
+                                           return_when=FIRST_COMPLETED)
+                    for f in done:
+                        finished(f)
+                in_flight.add(
+                    pool.submit(_stage_file_in_worker, *stage_file_args,
+                                **stage_file_kwargs)
+                )
 
-            p = ExternalFileSystemMaterialSuiteReader(
-                x.path, root=root, run_name=args.run_name
-            )
-            ms = p.read()
-            w = FileSystemMaterialSuiteWriter(
-                ms, computed_segment_path, eq_detect=args.eq_detect,
-                encapsulation=stage_writer.encapsulation
-            )
-            w.write()
-            del p
+            if pool is not None:
+                for f in in_flight:
+                    finished(f)
+        finally:
+            if pool is not None:
+                pool.shutdown()
 
         log.info("Complete")
 
@@ -4,7 +4,7 @@ from configparser import NoOptionError
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.app.abc.cliapp import CLIApp
-from ..lib.writers.filesystemstagewriter import FileSystemStageWriter
+from ..lib.writers.filesystemstagewriter import FileSystemMaterialSuiteWriter
 from ..lib.readers.filesystemstagereader import FileSystemStageReader
 from ..lib.processors.generictechnicalmetadatacreator import \
     GenericTechnicalMetadataCreator
@@ -83,6 +83,21 @@ class TechnicalMetadataCreator(CLIApp):
                                  "instead of a local FITS install.",
                                  action="store_true",
                                  default=False)
+        self.parser.add_argument("--workers", help="How many FITS " +
+                                 "processes to run at once.",
+                                 type=int, action='store',
+                                 default=1)
+        self.parser.add_argument("--timeout", help="How many seconds to " +
+                                 "let FITS run against a single file " +
+                                 "before giving up on it.",
+                                 type=int, action='store',
+                                 default=None)
+        self.parser.add_argument("--batch_size", help="How many files to " +
+                                 "hand to each invocation of a local FITS " +
+                                 "install. Larger batches amortize FITS' " +
+                                 "start up time over more files.",
+                                 type=int, action='store',
+                                 default=1)
 
         # Parse arguments into args namespace
         args = self.parser.parse_args()
@@ -110,27 +125,36 @@ class TechnicalMetadataCreator(CLIApp):
             dto['fits_api_url'] = args.fits_api_url
         if args.fits_path is not None:
             dto['fits_path'] = args.fits_path
+        # Keep a connection to the servlet open for every worker
+        dto['fits_api_pool_size'] = max(10, args.workers)
 
         reader = FileSystemStageReader(staging_env, args.stage_id)
-        stage = reader.read()
         log.info("Stage: " + join(staging_env, args.stage_id))
-
-        log.info("Processing...")
+        pairtree_root = join(staging_env, args.stage_id, 'pairtree_root')
 
         if args.use_api:
             techmd_processors = [APIFITsCreator]
         else:
             techmd_processors = [FITsCreator]
 
-        techmd_creator = GenericTechnicalMetadataCreator(stage,
+        techmd_creator = GenericTechnicalMetadataCreator(reader.struct,
                                                          techmd_processors)
-        techmd_creator.process(skip_existing=args.skip_existing,
-                               data_transfer_obj=dto)
 
-        log.info("Writing...")
-        writer = FileSystemStageWriter(stage, staging_env,
-                                       eq_detect=args.eq_detect)
-        writer.write()
+        def write(ms):
+            FileSystemMaterialSuiteWriter(
+                ms, pairtree_root, eq_detect=args.eq_detect,
+                encapsulation=reader.encapsulation
+            ).write()
+
+        # Stream the stage - each MaterialSuite is written back as soon as
+        # it has been processed, so we never have to hold the whole stage
+        # in memory.
+        log.info("Processing & Writing...")
+        techmd_creator.process(skip_existing=args.skip_existing,
+                               data_transfer_obj=dto,
+                               materialsuites=reader.iter_materialsuites(),
+                               workers=args.workers, timeout=args.timeout,
+                               callback=write, batch_size=args.batch_size)
         log.info("Complete")
 
 
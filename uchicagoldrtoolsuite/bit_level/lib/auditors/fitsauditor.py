@@ -1,8 +1,8 @@
 
-from tempfile import TemporaryFile
-
 from xml.etree import ElementTree
 
+from uchicagoldrtoolsuite.core.lib.convenience import ldritem_parser_source
+
 from .abc.auditor import Auditor
 from .errorpackager import ErrorPackager
 
@@ -65,17 +65,8 @@ class FitsAuditor(Auditor):
         1. value (LDRPath): an LDR file-like object pointing to to a
         FITS metadata record
         """
-        with TemporaryFile() as tempfile:
-            with value.open('rb') as read_file:
-                while True:
-                    buf = read_file.read(1024 * 1000 * 100)
-                    if buf:
-                        tempfile.write(buf)
-                    else:
-                        break
-                tempfile.seek(0)
-                xmldata_string = tempfile.read().decode('utf-8')
-                self._subject = ElementTree.fromstring(xmldata_string)
+        with ldritem_parser_source(value) as src:
+            self._subject = ElementTree.parse(src).getroot()
 
     def get_errorpackager(self):
         """returns the errorpackager delegate for the auditor
@@ -1,7 +1,7 @@
-from tempfile import TemporaryFile
-
 from pypremis.lib import PremisRecord
 
+from uchicagoldrtoolsuite.core.lib.convenience import ldritem_parser_source
+
 from .abc.auditor import Auditor
 from .errorpackager import ErrorPackager
 
@@ -65,26 +65,15 @@ class PremisAuditor(Auditor):
     def set_subject(self, value):
         """sets the subject data attribute of the PremisAuditor
 
-        This function opens a temporary file and the value parameter
-        and writes the bytes content of the value parameter into a
-        temporary file then sets the subject data attribute as an
-        instance of PremisRecord containing the data in the
-        temporary file
+        This function parses the value parameter and sets the subject
+        data attribute as an instance of PremisRecord containing its data
 
         __Args__
         1. value (LDRPath): the LDR file-like object that points
         to a serialized premis record
         """
-        with TemporaryFile() as tempfile:
-            with value.open('rb') as read_file:
-                while True:
-                    buf = read_file.read(1024 * 1000 * 100)
-                    if buf:
-                        tempfile.write(buf)
-                    else:
-                        break
-                tempfile.seek(0)
-                self._subject = PremisRecord(frompath=tempfile)
+        with ldritem_parser_source(value) as src:
+            self._subject = PremisRecord(frompath=src)
 
     def get_errorpackager(self):
         """returns the errorpackager of the auditor
@@ -6,11 +6,11 @@ from os.path import splitext
 from logging import getLogger
 
 from pypremis.nodes import *
-from pypremis.lib import PremisRecord
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import iso8601_dt
 from uchicagoldrtoolsuite.core.lib.idbuilder import IDBuilder
+from uchicagoldrtoolsuite.core.lib.metrics import inc, timer
 from ...ldritems.ldrpath import LDRPath
 from ...structures.materialsuite import MaterialSuite
 from ...ldritems.ldritemcopier import LDRItemCopier
@@ -47,7 +47,8 @@ class Converter(metaclass=ABCMeta):
 
     # Mime names abiding by https://tools.ietf.org/html/rfc4288#section-4.2 in
     # theory, and matching the output of magic.from_file() or
-    # mimetypes.guess_type() in practice.
+    # mimetypes.guess_type() in practice. A whole family of mimes can be
+    # claimed like 'image/*', and every mime with '*/*'.
     _claimed_mimes = []
 
     # Extension, including a preceeding dot. Anything that can be mapped by
@@ -58,6 +59,20 @@ class Converter(metaclass=ABCMeta):
     # Flipped to true when an instance claims its mimes from provided extensions
     _claimed_list_initd = False
 
+    # The most instances of the converter which may run at once, if the
+    # external process it wraps can't safely run concurrently with itself.
+    # None for no limit beyond the number of workers.
+    max_concurrency = None
+
+    # Converters which share a concurrency_group share their max_concurrency,
+    # eg because they wrap the same external process. None groups a
+    # converter on its own.
+    concurrency_group = None
+
+    # Where more than one converter handles a mime those with higher
+    # priorities are run first, see ConverterRegistry
+    priority = 0
+
     @log_aware(log)
     def __init__(self, input_materialsuite, working_dir, timeout=None):
         """
@@ -82,6 +97,7 @@ class Converter(metaclass=ABCMeta):
         self._working_dir = None
         self._timeout = None
         self._converter_name = "Converter ABC"
+        self._shared_original = None
 
         self.claim_mimes_from_extensions()
         self.set_source_materialsuite(input_materialsuite)
@@ -129,25 +145,27 @@ class Converter(metaclass=ABCMeta):
         log.debug("Converter attempting to determine ability to handle " +
                   "{}".format(mime))
         cls.claim_mimes_from_extensions()
-        if mime in cls._claimed_mimes:
+        if mime in cls._claimed_mimes or \
+                "{}/*".format(mime.split("/")[0]) in cls._claimed_mimes or \
+                "*/*" in cls._claimed_mimes:
             log.debug("Converter can handle {}".format(mime))
             return True
         log.debug("Converter can't handle {}".format(mime))
         return False
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_claimed_mimes(self):
         return self._claimed_mimes
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_source_materialsuite(self):
         return self._source_materialsuite
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_working_dir(self):
         return self._working_dir
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_timeout(self):
         return self._timeout
 
@@ -163,7 +181,7 @@ class Converter(metaclass=ABCMeta):
     def set_timeout(self, x):
         self._timeout = x
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_converter_name(self):
         return self._converter_name
 
@@ -171,6 +189,14 @@ class Converter(metaclass=ABCMeta):
     def set_converter_name(self, x):
         self._converter_name = x
 
+    @log_aware(log, accessor=True)
+    def get_shared_original(self):
+        return self._shared_original
+
+    @log_aware(log)
+    def set_shared_original(self, x):
+        self._shared_original = x
+
     @log_aware(log)
     def instantiate_original(self, premis=None):
         """
@@ -180,6 +206,10 @@ class Converter(metaclass=ABCMeta):
         the originalName field (if it has an extension) or by trying to
         extrapolate the extension from the mimetype.
 
+        If the converter has a shared_original (see SharedOriginal) the
+        file is linked in from there, rather than copied out of the
+        MaterialSuite again.
+
         __KWArgs__
 
         * premis (PremisRecord): The PREMIS which defines the original file
@@ -190,7 +220,7 @@ class Converter(metaclass=ABCMeta):
             now at.
         """
         log.debug("Attempting to instantiate original file from LDRItem")
-        target_path = str(Path(self.working_dir, uuid4().hex))
+        target_ext = ''
         # if we have the PREMIS try to set an extension, just in case the
         # converter requires it
         if premis is not None:
@@ -199,7 +229,7 @@ class Converter(metaclass=ABCMeta):
             try:
                 ext = splitext(premis.get_object_list()[0].get_originalName())[1]
                 if ext is not '':
-                    target_path = target_path + ext
+                    target_ext = ext
                     path_altered = True
                     log.debug("extension extrapolated from originalName: " +
                               "{}".format(ext))
@@ -210,7 +240,7 @@ class Converter(metaclass=ABCMeta):
                 log.debug("attempting to extrapolate extension from mime")
                 try:
                     ext = mimetypes.guess_extension(premis.get_object_list()[0].get_objectCharacteristics()[0].get_format()[0].get_formatName())
-                    target_path = target_path + ext
+                    target_ext = target_ext + ext
                     log.debug("extension extrapolated from mime: {}".format(
                         ext))
                 except:
@@ -219,6 +249,13 @@ class Converter(metaclass=ABCMeta):
         else:
             log.debug("No PREMIS provided - no extension extrapolation.")
 
+        if self.shared_original is not None:
+            target_path = self.shared_original.link_into(self.working_dir,
+                                                         target_ext)
+            log.info("linked shared original file for conversion")
+            return target_path
+
+        target_path = str(Path(self.working_dir, uuid4().hex)) + target_ext
         target_ldritem = LDRPath(target_path)
         log.debug("Attempting to copy original item to {}".format(target_path))
         c = LDRItemCopier(self.source_materialsuite.content, target_ldritem)
@@ -231,22 +268,14 @@ class Converter(metaclass=ABCMeta):
     @log_aware(log)
     def instantiate_and_read_original_premis(self):
         """
-        Dumps the byte data out of an LDRItem and reads it as PREMIS
+        Reads the PREMIS of the source MaterialSuite
 
         __Returns__
 
         (PremisRecord): A PREMIS metadata record object.
         """
-        log.debug("instantiating original PREMIS")
-        target_path = Path(self.working_dir, uuid4().hex)
-        target_ldritem = LDRPath(str(target_path))
-        log.debug("Attempting to copy PREMIS to {}".format(target_path))
-        c = LDRItemCopier(self.source_materialsuite.premis, target_ldritem)
-        r = c.copy()
-        if r['src_eqs_dst'] is not True:
-            raise RuntimeError("Bad Copy!")
-        log.info("instantiated PREMIS of original file")
-        return PremisRecord(frompath=str(target_path))
+        log.debug("Reading PREMIS of original file")
+        return self.source_materialsuite.premis_record
 
     @abstractmethod
     @log_aware(log)
@@ -549,35 +578,75 @@ class Converter(metaclass=ABCMeta):
         * f (MaterialSuite) || (None): The resulting MaterialSuite, or None
             in the event of a failed conversion
         """
+        return self.apply(self.run())
+
+    @log_aware(log)
+    def run(self):
+        """
+        The first half of convert() - instantiates the original, runs the
+        converter and builds the presform's PREMIS record
+
+        This doesn't alter the original's PREMIS, so conversions of different
+        MaterialSuites (or of the same MaterialSuite by different converters)
+        may run concurrently, as long as the original's PREMIS record has
+        already been parsed.
+
+        __Returns__
+
+        * (tuple): The converter results and the presform PREMIS (or None)
+        """
         log.debug("Conversion process started")
-        log.debug("Attempting to instantiate and read original PREMIS")
-        orig_premis = self.instantiate_and_read_original_premis()
-        log.debug("Attempting to instantiate the original file")
-        target = self.instantiate_original(premis=orig_premis)
-        log.debug("Attempting to create presforms of original file")
-        results = self.run_converter(target)
-        log.debug("Searching for results...")
+        converter = type(self).__name__
+        with timer("ldr_converter_seconds", converter=converter):
+            log.debug("Attempting to instantiate and read original PREMIS")
+            orig_premis = self.instantiate_and_read_original_premis()
+            log.debug("Attempting to instantiate the original file")
+            target = self.instantiate_original(premis=orig_premis)
+            log.debug("Attempting to create presforms of original file")
+            with timer("ldr_converter_tool_seconds", converter=converter):
+                results = self.run_converter(target)
+            log.debug("Searching for results...")
+            outpath = results.get('outpath', None)
+            if outpath is not None:
+                log.debug("Converter results found, generating PREMIS")
+                presform_premis = self.generate_presform_premis_record(
+                    outpath)
+            else:
+                log.debug("No conversion results found")
+                presform_premis = None
+        inc("ldr_conversions_total", converter=converter,
+            succeeded=outpath is not None)
+        return results, presform_premis
+
+    @log_aware(log)
+    def apply(self, run_result):
+        """
+        The second half of convert() - links the original's and the
+        presform's PREMIS and packages the presform
+
+        Applications to a single original must happen one at a time.
+
+        __Args__
+
+        1. run_result (tuple): The return value of run()
+
+        __Returns__
+
+        * f (MaterialSuite) || (None): The resulting MaterialSuite, or None
+            in the event of a failed conversion
+        """
+        results, presform_premis = run_result
         outpath = results.get('outpath', None)
-        if outpath is not None:
-            log.debug("Converter results found, generating PREMIS")
-            presform_premis = self.generate_presform_premis_record(outpath)
-        else:
-            log.debug("No conversion results found")
-            presform_premis = None
+        orig_premis = self.instantiate_and_read_original_premis()
         log.debug("Updating/linking PREMIS")
         self.handle_premis(results['cmd_output'], orig_premis, presform_premis, self.converter_name)
-        updated_premis_fp = Path(self.working_dir, uuid4().hex)
-        log.debug("Writing updated PREMIS")
-        orig_premis.write_to_file(str(updated_premis_fp))
-        log.debug("Installing new PREMIS in MaterialSuite")
-        self.source_materialsuite.premis = LDRPath(str(updated_premis_fp))
+        log.debug("Installing updated PREMIS in MaterialSuite")
+        self.source_materialsuite.premis_record = orig_premis
         if outpath is not None:
             log.debug("Packaging presform materialsuite")
-            presform_premis_fp = str(Path(self.working_dir, uuid4().hex))
-            presform_premis.write_to_file(presform_premis_fp)
             f = MaterialSuite(presform_premis.get_object_list()[0].get_objectIdentifier()[0].get_objectIdentifierValue())
             f.content = LDRPath(outpath)
-            f.premis = LDRPath(presform_premis_fp)
+            f.premis_record = presform_premis
             log.info("Converter produced presform materialsuites")
             return f
         log.info("Converter did not produce presform materialsuites.")
@@ -586,4 +655,5 @@ class Converter(metaclass=ABCMeta):
     source_materialsuite = property(get_source_materialsuite, set_source_materialsuite)
     working_dir = property(get_working_dir, set_working_dir)
     timeout = property(get_timeout, set_timeout)
+    shared_original = property(get_shared_original, set_shared_original)
     converter_name = property(get_converter_name, set_converter_name)
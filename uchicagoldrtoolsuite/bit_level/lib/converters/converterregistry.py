@@ -0,0 +1,145 @@
+from threading import Lock
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
+    log_init_success
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+_registries = {}
+_registries_lock = Lock()
+
+
+class ConverterRegistry(object):
+    """
+    An index from mime types to the converters which claim them
+
+    Converters may claim exact mimes (eg 'image/tiff'), whole families
+    (eg 'image/*') or everything ('*/*'). Looking up a MaterialSuite's
+    mimes is then a few dict lookups, rather than a scan of every mime
+    every converter claims.
+
+    Where more than one converter applies they're ordered by their priority
+    (highest first), then by the order they were registered in.
+    """
+    @log_aware(log)
+    def __init__(self, converters=None):
+        """
+        Create a new registry
+
+        __KWArgs__
+
+        * converters ([Converter]): Converter classes to register, in order
+        """
+        log_init_attempt(self, log, locals())
+        self._exact = {}
+        self._families = {}
+        self._converters = []
+        self._cache = {}
+        if converters is not None:
+            for x in converters:
+                self.register(x)
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<ConverterRegistry {}>".format(
+            str([x.__name__ for x in self._converters]))
+
+    @log_aware(log)
+    def __iter__(self):
+        return iter(self._converters)
+
+    @log_aware(log)
+    def __len__(self):
+        return len(self._converters)
+
+    @classmethod
+    @log_aware(log)
+    def for_converters(cls, converters):
+        """
+        Get a registry of some converters, building it only the first time
+        that set of converters is asked for
+
+        __Args__
+
+        1. converters ([Converter] or ConverterRegistry): The converters
+
+        __Returns__
+
+        * (ConverterRegistry): The registry
+        """
+        if isinstance(converters, cls):
+            return converters
+        key = tuple(converters)
+        with _registries_lock:
+            if key not in _registries:
+                _registries[key] = cls(converters)
+            return _registries[key]
+
+    @log_aware(log)
+    def register(self, converter, priority=None):
+        """
+        Add a converter to the registry
+
+        __Args__
+
+        1. converter (Converter): The converter class
+
+        __KWArgs__
+
+        * priority (int): Overrides the converter's own priority
+        """
+        if converter in self._converters:
+            return
+        if priority is None:
+            priority = getattr(converter, 'priority', 0)
+        converter.claim_mimes_from_extensions()
+        entry = (-priority, len(self._converters), converter)
+        self._converters.append(converter)
+        for mime in converter._claimed_mimes:
+            if mime.endswith("/*"):
+                self._families.setdefault(mime[:-2], []).append(entry)
+            else:
+                self._exact.setdefault(mime, []).append(entry)
+        self._cache = {}
+        log.debug("Registered {} for {} mimes".format(
+            converter.__name__, str(len(converter._claimed_mimes))))
+
+    @log_aware(log)
+    def converters_for(self, mimes):
+        """
+        Find the converters which handle any of some mimes
+
+        __Args__
+
+        1. mimes ([str]): The mimes
+
+        __Returns__
+
+        * ([Converter]): The converters, in the order they should run
+        """
+        key = tuple(mimes)
+        result = self._cache.get(key)
+        if result is None:
+            entries = set()
+            for mime in key:
+                if mime is None:
+                    continue
+                entries.update(self._exact.get(mime, ()))
+                entries.update(self._families.get(mime.split("/")[0], ()))
+                entries.update(self._families.get("*", ()))
+            result = [x[2] for x in sorted(entries, key=lambda x: x[:2])]
+            self._cache[key] = result
+        return result
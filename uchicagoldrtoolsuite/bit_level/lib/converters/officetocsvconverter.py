@@ -27,6 +27,12 @@ class OfficeToCSVConverter(Converter):
     A class for converting a variety of "office" file types to CSV
     """
 
+    # Concurrent headless LibreOffice instances trip over each other's
+    # user profile, so only one LibreOffice based converter runs at a time,
+    # unless they're using a LibreOfficePool
+    concurrency_group = "libreoffice"
+    max_concurrency = 1
+
     # Explicitly claimed mimes this converter should be able to handle
     _claimed_mimes = [
         'application/vnd.ms-excel',
@@ -67,7 +73,14 @@ class OfficeToCSVConverter(Converter):
         self.libre_office_path = data_transfer_obj.get(
             'libre_office_path', None
         )
-        if self.libre_office_path is None:
+        self.libre_office_pool = data_transfer_obj.get(
+            'libre_office_pool', None
+        )
+        if self.libre_office_pool is not None:
+            # The pool's instances each have their own profile, and the
+            # pool blocks once they're all busy
+            self.max_concurrency = self.libre_office_pool.size
+        elif self.libre_office_path is None:
             raise ValueError('No libre_office_path specificed in the data' +
                              'transfer object!')
         log_init_success(self, log)
@@ -105,6 +118,13 @@ class OfficeToCSVConverter(Converter):
         # conversion (which it should be)
         outdir = join(self.working_dir, uuid4().hex)
         makedirs(outdir, exist_ok=True)
+        if self.libre_office_pool is not None:
+            log.debug("Converting with {}".format(
+                str(self.libre_office_pool)))
+            where_it_is, cmd_output = self.libre_office_pool.convert(
+                in_path, outdir, 'csv', timeout=self.timeout
+            )
+            return {'outpath': where_it_is, 'cmd_output': cmd_output}
         convert_cmd_args = [self.libre_office_path, '--headless',
                             '--convert-to', 'csv', '--outdir', outdir,
                             in_path]
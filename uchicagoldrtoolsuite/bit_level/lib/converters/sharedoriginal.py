@@ -0,0 +1,105 @@
+from os import makedirs, link
+from os.path import join
+from shutil import copyfile, rmtree
+from threading import Lock
+from uuid import uuid4
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
+    log_init_success
+from ..ldritems.ldrpath import LDRPath
+from ..ldritems.ldritemcopier import LDRItemCopier
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+class SharedOriginal(object):
+    """
+    A single on disk instantiation of a MaterialSuite's content, shared by
+    every converter that is run against it
+
+    The content is copied (and verified) the first time a converter asks
+    for it, after which each converter gets a hardlink to that copy in its
+    own working dir - or, if the working dirs are on a different file
+    system, a plain copy of it. Converters must treat the file they're
+    given as read only.
+    """
+    @log_aware(log)
+    def __init__(self, content, working_dir):
+        """
+        Create a new SharedOriginal
+
+        __Args__
+
+        1. content (LDRItem): The content to instantiate
+        2. working_dir (str): Where to put the shared copy
+        """
+        log_init_attempt(self, log, locals())
+        self.content = content
+        self.working_dir = working_dir
+        # extension -> path of the shared copy
+        self._paths = {}
+        self._lock = Lock()
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<SharedOriginal {}>".format(self.working_dir)
+
+    @log_aware(log)
+    def _instantiate(self, ext):
+        with self._lock:
+            if ext not in self._paths:
+                makedirs(self.working_dir, exist_ok=True)
+                path = join(self.working_dir, uuid4().hex + ext)
+                log.debug("Instantiating shared original at {}".format(path))
+                r = LDRItemCopier(self.content, LDRPath(path)).copy()
+                if r['src_eqs_dst'] is not True:
+                    raise RuntimeError("Bad Copy!")
+                self._paths[ext] = path
+            return self._paths[ext]
+
+    @log_aware(log)
+    def link_into(self, target_dir, ext=''):
+        """
+        Get the content into a dir
+
+        __Args__
+
+        1. target_dir (str): The dir to put the content in
+
+        __KWArgs__
+
+        * ext (str): An extension to give the file
+
+        __Returns__
+
+        * (str): The path of the content in target_dir
+        """
+        src = self._instantiate(ext)
+        target_path = join(target_dir, uuid4().hex + ext)
+        try:
+            link(src, target_path)
+        except OSError:
+            log.debug("Couldn't hardlink the shared original, copying it")
+            copyfile(src, target_path)
+        return target_path
+
+    @log_aware(log)
+    def cleanup(self):
+        """
+        Remove the shared copy. Links already handed out are unaffected.
+        """
+        with self._lock:
+            rmtree(self.working_dir, ignore_errors=True)
+            self._paths = {}
@@ -13,7 +13,8 @@ from pypremis.factories import LinkingObjectIdentifierFactory
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import iso8601_dt
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
-    log_init_success
+    log_init_success, makedirs
+from uchicagoldrtoolsuite.core.lib.metrics import timer
 from ..processors.genericpremiscreator import GenericPREMISCreator
 from ..readers.abc.materialsuiteserializationreader import \
     MaterialSuiteSerializationReader
@@ -50,7 +51,9 @@ class ExternalFileSystemMaterialSuiteReader(MaterialSuiteSerializationReader):
     so really nothing like magic).
     """
     @log_aware(log)
-    def __init__(self, path, root=None, run_name=None):
+    def __init__(self, path, root=None, run_name=None, verify='bytes',
+                 target_identifier=None, content_destination=None,
+                 fixity_algos=None, threaded_hashing=False):
         """
         Instantiate a new packager
 
@@ -66,18 +69,41 @@ class ExternalFileSystemMaterialSuiteReader(MaterialSuiteSerializationReader):
             the ingestion event which refers to a bulk ingest that this
             MaterialSuite was created in. If one isn't provided a uuid4().hex
             will be used instead
+        * verify (str): How to audit the copy of the external file into the
+            working location, see LDRItemCopier for supported schemes.
+        * target_identifier (str): The identifier to give the resulting
+            MaterialSuite, if one isn't provided a uuid4().hex will be used
+        * content_destination (str): Direct ingest mode - rather than copying
+            the external file into a tmp location (to later be copied again
+            by a writer) copy it once, straight to this path, which should be
+            the final location of the content in the serialization being
+            written. The fixity values for the PREMIS are computed from the
+            bytes as they are copied, rather than from a re-read of the file.
+        * fixity_algos ([str]): The fixity algos to record in the PREMIS,
+            defaults to GenericPREMISCreator.fixity_algos
+        * threaded_hashing (bool): Whether or not to run the hashers in a
+            thread pool when computing fixity values
         """
         log_init_attempt(self, log, locals())
         self._str_path = None
         self._bytes_path = None
         self._str_root = None
         self._bytes_root = None
-        super().__init__(root, uuid4().hex)
+        if target_identifier is None:
+            target_identifier = uuid4().hex
+        super().__init__(root, target_identifier)
         self.path = path
         self.working_dir = TemporaryDirectory()
-        self.working_path = join(self.working_dir.name, uuid4().hex)
+        self.content_destination = content_destination
+        if content_destination is not None:
+            self.working_path = content_destination
+        else:
+            self.working_path = join(self.working_dir.name, uuid4().hex)
         self.instantiated_premis = join(self.working_dir.name, uuid4().hex)
         self.run_name = run_name
+        self.verify = verify
+        self.fixity_algos = fixity_algos
+        self.threaded_hashing = threaded_hashing
         log_init_success(self, log)
 
     @log_aware(log)
@@ -137,18 +163,28 @@ class ExternalFileSystemMaterialSuiteReader(MaterialSuiteSerializationReader):
 
             src_item = LDRPath(self.path)
             dst_item = LDRPath(self.working_path)
-            copier = LDRItemCopier(src_item, dst_item)
+            digest_algos = None
+            if self.content_destination is not None:
+                makedirs(str(Path(self.working_path).parent))
+                digest_algos = GenericPREMISCreator.computable_fixity_algos(
+                    self.fixity_algos
+                )
+            copier = LDRItemCopier(src_item, dst_item, verify=self.verify,
+                                   digest_algos=digest_algos)
             cr = copier.copy()
             event = build_ingestion_event(cr)
-            return event
+            return event, copier.src_digests
 
-        def generate_minimal_premis(ingestion_event):
+        def generate_minimal_premis(ingestion_event, known_digests=None):
             if self.root:
                 original_name = str(Path(self.path).relative_to(self.root))
             else:
                 original_name = self.path
             record = GenericPREMISCreator.make_record(
-                self.working_path, original_name
+                self.working_path, original_name,
+                fixity_algos=self.fixity_algos,
+                threaded_hashing=self.threaded_hashing,
+                known_digests=known_digests
             )
             real_identifier = ObjectIdentifier('uuid4', self.target_identifier)
             record.get_object_list()[0].get_objectIdentifier()[0] = real_identifier
@@ -181,13 +217,19 @@ class ExternalFileSystemMaterialSuiteReader(MaterialSuiteSerializationReader):
             event.add_eventDetailInformation(eventDetailInformation)
 
         def write_minimal_premis(minimal_premis_record):
-            minimal_premis_record.write_to_file(self.instantiated_premis)
+            with timer("ldr_premis_serialize_seconds"):
+                minimal_premis_record.write_to_file(self.instantiated_premis)
 
-        log.info("Copying external file to tmp location")
-        ingestion_event = copy_to_working()
+        if self.content_destination is not None:
+            log.info("Copying external file directly to its destination")
+        else:
+            log.info("Copying external file to tmp location")
+        ingestion_event, known_digests = copy_to_working()
         add_eventDetailInformation(ingestion_event)
         log.info("Creating ingest PREMIS")
-        minimal_premis_record = generate_minimal_premis(ingestion_event)
+        minimal_premis_record = generate_minimal_premis(
+            ingestion_event, known_digests=known_digests
+        )
         link_em_all_up(minimal_premis_record)
         log.info("Writing ingest PREMIS")
         write_minimal_premis(minimal_premis_record)
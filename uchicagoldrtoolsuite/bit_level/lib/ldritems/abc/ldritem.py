@@ -24,6 +24,12 @@ class LDRItem(metaclass=ABCMeta):
     Provides generalizable functionality to facilitate "with" syntax when
     properly implemented.
     """
+
+    # Flipped to True by subclasses which, once opened, are backed by a real
+    # file descriptor (see .fileno()). Copiers use this to hand copies
+    # between two such items off to the kernel rather than shuttling the
+    # bytes through python.
+    _kernel_copyable = False
     @abstractmethod
     def read(self):
         pass
@@ -82,6 +88,28 @@ class LDRItem(metaclass=ABCMeta):
         else:
             raise ValueError("is_flo must be either True or False")
 
+    @log_aware(log)
+    def get_kernel_copyable(self):
+        return self._kernel_copyable
+
+    @log_aware(log)
+    def fileno(self):
+        raise OSError(
+            "{} is not backed by a file descriptor".format(self.item_name)
+        )
+
+    @log_aware(log)
+    def get_fspath(self):
+        """
+        __Returns__
+
+        * (str/None): The path of the file on disk backing this item, if
+            there is one. Consumers which can read a path directly (eg
+            parsers) can use this rather than reading the item's bytes
+            into somewhere else first.
+        """
+        return None
+
     @log_aware(log)
     def get_size(self, buffering=1024*1000*100):
         log.debug("Computing size of LDRItem serially")
@@ -99,3 +127,5 @@ class LDRItem(metaclass=ABCMeta):
     # TODO: Potentially phase out item_name?
     item_name = property(get_name, set_name)
     is_flo = property(get_is_flo, set_is_flo)
+    kernel_copyable = property(get_kernel_copyable)
+    fspath = property(get_fspath)
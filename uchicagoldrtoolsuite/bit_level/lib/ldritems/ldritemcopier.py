@@ -1,9 +1,13 @@
 from json import dumps
-from logging import getLogger
+from logging import getLogger, DEBUG
+from errno import EXDEV, ENOSYS, EINVAL, EOPNOTSUPP, EBADF
+from time import monotonic
+import os
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
-    log_init_success
+    log_init_success, new_hasher
+from uchicagoldrtoolsuite.core.lib.metrics import inc, observe
 from .abc.ldritem import LDRItem
 from .ldritemoperations import hash_ldritem
 
@@ -19,13 +23,20 @@ __version__ = "0.0.1dev"
 log = getLogger(__name__)
 
 
+# errnos which indicate the kernel can't perform a given zero-copy operation
+# between two particular descriptors (cross device, unsupported fs, etc),
+# rather than that something has actually gone wrong.
+_KERNEL_COPY_UNSUPPORTED = (EXDEV, ENOSYS, EINVAL, EOPNOTSUPP, EBADF)
+
+
 class LDRItemCopier(object):
     """
     An environment for facilitating qualified copies of LDRItem instances
     """
     @log_aware(log)
     def __init__(self, src, dst, clobber=False, eq_detect='bytes',
-                 max_retries=3, buffering=1024*1000*100):
+                 max_retries=3, buffering=1024*1000*100, verify='bytes',
+                 digest_algos=None):
         """
         Spawn a new copier
 
@@ -41,6 +52,15 @@ class LDRItemCopier(object):
             before giving up
         * buffering (int): How many bytes to load into RAM for copying/
             comparison operations
+        * verify (str): How to audit a copy once it has been made. "bytes"
+            re-reads both the src and the dst and compares them directly.
+            Any hash algo supported by sane_hash computes a digest of the
+            src as it is copied and then compares that against a single
+            read-back of the dst, saving a full read of the src.
+        * digest_algos ([str]): Hash algos to additionally compute digests of
+            the src with while it is being copied. After a copy they are
+            available via .src_digests, so callers who need them don't have
+            to read the src again.
         """
         log_init_attempt(self, log, locals())
         self.src = src
@@ -49,6 +69,10 @@ class LDRItemCopier(object):
         self.eq_detect = eq_detect
         self.max_retries = max_retries
         self.buffering = buffering
+        self.verify = verify
+        self.digest_algos = digest_algos
+        self._src_digests = None
+        self._bytes_copied = 0
         log_init_success(self, log)
 
     @log_aware(log)
@@ -59,11 +83,13 @@ class LDRItemCopier(object):
             'clobber': self.clobber,
             'eq_detect': self.eq_detect,
             'max_retries': self.max_retries,
-            'buffering': self.buffering
+            'buffering': self.buffering,
+            'verify': self.verify,
+            'digest_algos': self.digest_algos
         }
         return "<LDRItemCopier {}".format(dumps(attrib_dict, sort_keys=True))
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_src(self):
         return self._src
 
@@ -73,7 +99,7 @@ class LDRItemCopier(object):
             raise ValueError("src must be LDRItem, not {}".format(type(src)))
         self._src = src
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_dst(self):
         return self._dst
 
@@ -83,7 +109,7 @@ class LDRItemCopier(object):
             raise ValueError("dst must be LDRItem, not {}".format(type(dst)))
         self._dst = dst
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_clobber(self):
         return self._clobber
 
@@ -93,7 +119,7 @@ class LDRItemCopier(object):
             raise ValueError()
         self._clobber = clobber
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_eq_detect(self):
         return self._eq_detect
 
@@ -117,7 +143,7 @@ class LDRItemCopier(object):
             )
         self._eq_detect = eq_detect
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_max_retries(self, max_retries):
         return self._max_retries
 
@@ -127,7 +153,7 @@ class LDRItemCopier(object):
             raise ValueError()
         self._max_retries = max_retries
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_buffering(self):
         return self._buffering
 
@@ -137,7 +163,52 @@ class LDRItemCopier(object):
             raise ValueError()
         self._buffering = buffering
 
+    @log_aware(log, accessor=True)
+    def get_verify(self):
+        return self._verify
+
+    @log_aware(log)
+    def set_verify(self, verify):
+        supported_verifications = [
+            "bytes",
+            "md5",
+            "crc32",
+            "adler32",
+            "sha256"
+        ]
+
+        if not isinstance(verify, str):
+            raise ValueError()
+        if verify not in supported_verifications:
+            raise ValueError(
+                "verify must be in {}".format(str(supported_verifications))
+            )
+        self._verify = verify
+
+    @log_aware(log, accessor=True)
+    def get_digest_algos(self):
+        return self._digest_algos
+
     @log_aware(log)
+    def set_digest_algos(self, digest_algos):
+        if digest_algos is None:
+            digest_algos = []
+        if not isinstance(digest_algos, list):
+            raise ValueError()
+        self._digest_algos = digest_algos
+
+    @log_aware(log, accessor=True)
+    def get_src_digests(self):
+        """
+        __Returns__
+
+        (dict/None): algo -> hexdigest of the src, as computed during the
+            last copy made by this copier. None if no copy has been made, or
+            if no digests were computed while making it.
+        """
+        return self._src_digests
+
+    @log_aware(log, accessor=True)
     def get_confirm(self):
         return self._confirm
 
@@ -216,34 +287,50 @@ class LDRItemCopier(object):
             if not self.clobber:
                 # Not Clobbering
                 r['clobbered_dst'] = False
-                log.debug("{}".format(dumps(r)))
+                if log.isEnabledFor(DEBUG):
+                    log.debug(dumps(r))
                 return r
             elif self.are_the_same():
                 # No copy required
                 r['clobbered_dst'] = False
                 r['src_eqs_dst'] = True
-                log.debug("{}".format(dumps(r)))
+                if log.isEnabledFor(DEBUG):
+                    log.debug(dumps(r))
                 return r
             else:
                 r['clobbered_dst'] = True
         else:
             r['dst_existed'] = False
 
+        hash_algos = list(self.digest_algos)
+        if self.verify != "bytes" and self.verify not in hash_algos:
+            hash_algos.append(self.verify)
+
         complete = False
         i = 0
         ex = None
         while not complete and i < self.max_retries:
             i += 1
             try:
-                with self.src.open('rb') as s1:
-                    with self.dst.open('wb') as s2:
-                        data = s1.read(self.buffering)
-                        while data:
-                            s2.write(data)
-                            data = s1.read(self.buffering)
-                # If we have to take a copy operation don't use any metric
-                # other than a direct bytes comparison to audit the copy
-                complete = self.are_the_same(eq_detect="bytes")
+                start = monotonic()
+                self._src_digests = self._copy_bytes(hash_algos=hash_algos)
+                observe("ldr_copy_seconds", monotonic() - start)
+                inc("ldr_copy_bytes_total", self._bytes_copied)
+                start = monotonic()
+                if self.verify == "bytes":
+                    # If we have to take a copy operation don't use any
+                    # metric other than a direct bytes comparison to audit
+                    # the copy
+                    complete = self.are_the_same(eq_detect="bytes")
+                else:
+                    # Streaming verification, the src is only read once -
+                    # its digest is computed on the way through and the dst
+                    # is read back once to compare against it.
+                    complete = self.ldritem_equal_digest(
+                        self.dst, self.verify, self._src_digests[self.verify]
+                    )
+                observe("ldr_copy_verify_seconds", monotonic() - start,
+                        verify=self.verify)
             except Exception as e:
                 log.warn("An exception occured while the copier was " +
                          "attempting to copy a file: {}.".format(str(e)) +
@@ -252,17 +339,138 @@ class LDRItemCopier(object):
                          "exception will be raised if this was a vital copy.")
                 ex = e
         if complete:
+            inc("ldr_copies_total")
             r['src_eqs_dst'] = True
             r['copied'] = True
-            log.debug("{}".format(dumps(r)))
+            if log.isEnabledFor(DEBUG):
+                log.debug(dumps(r))
             return r
         else:
+            inc("ldr_copy_failures_total")
             if not eat_exceptions:
                 raise OSError("!!! BAD COPY !!! - {} - COPY NOT COMPLETE - {} !=  {} (metric: {})".format(str(ex), self.src.item_name, self.dst.item_name, self.eq_detect))
             else:
                 log.warn("{}".format(dumps(r)))
                 return r
 
+    @log_aware(log)
+    def _copy_bytes(self, hash_algos=None):
+        """
+        Move the bytes from the src to the dst, optionally hashing them on
+        the way through
+
+        __KWArgs__
+
+        * hash_algos ([str]): If provided, the algos to compute digests of
+            the copied bytes with
+
+        __Returns__
+
+        (dict/None): algo -> hexdigest of the bytes copied, if any
+            hash_algos were provided, otherwise None
+        """
+        hashers = None
+        self._bytes_copied = 0
+        if hash_algos:
+            hashers = dict((x, new_hasher(x)) for x in hash_algos)
+        with self.src.open('rb') as s1:
+            with self.dst.open('wb') as s2:
+                # Bytes that have to be hashed have to pass through python,
+                # otherwise let the kernel move them if it can.
+                if hashers is None and self.src.kernel_copyable and \
+                        self.dst.kernel_copyable:
+                    if self._kernel_copy_bytes(s1, s2):
+                        return
+                data = s1.read(self.buffering)
+                while data:
+                    if hashers is not None:
+                        for x in hashers.values():
+                            x.update(data)
+                    s2.write(data)
+                    self._bytes_copied += len(data)
+                    data = s1.read(self.buffering)
+        if hashers is not None:
+            return dict((k, v.hexdigest()) for k, v in hashers.items())
+
+    @log_aware(log)
+    def _kernel_copy_bytes(self, s1, s2):
+        """
+        Move the bytes between two opened, file descriptor backed, items
+        without them ever entering user space. Tries os.copy_file_range
+        first and then os.sendfile.
+
+        __Args__
+
+        1. s1 (LDRItem): The opened src
+        2. s2 (LDRItem): The opened dst
+
+        __Returns__
+
+        (bool): True if the kernel performed the copy, False if neither
+            zero-copy mechanism is available for these descriptors and
+            the caller should fall back to a buffered copy.
+        """
+        in_fd = s1.fileno()
+        out_fd = s2.fileno()
+        strategies = []
+        if hasattr(os, 'copy_file_range'):
+            strategies.append(
+                ('copy_file_range',
+                 lambda: os.copy_file_range(in_fd, out_fd, self.buffering))
+            )
+        if hasattr(os, 'sendfile'):
+            strategies.append(
+                ('sendfile',
+                 lambda: os.sendfile(out_fd, in_fd, None, self.buffering))
+            )
+        for name, strategy in strategies:
+            copied = 0
+            try:
+                n = strategy()
+                while n:
+                    copied += n
+                    n = strategy()
+            except OSError as e:
+                # Only fall through to the next strategy if nothing has
+                # moved yet - a failure midway through is a real failure
+                if copied or e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                    raise
+                log.debug("{} unavailable for {} -> {}: {}".format(
+                    name, self.src.item_name, self.dst.item_name, str(e)))
+                continue
+            log.debug("Copied {} bytes {} -> {} via {}".format(
+                str(copied), self.src.item_name, self.dst.item_name, name))
+            self._bytes_copied = copied
+            return True
+        return False
+
+    @log_aware(log)
+    def ldritem_equal_digest(self, item, algo, digest):
+        """
+        Determines if an item hashes to a known digest
+
+        __Args__
+
+        1. item (LDRItem): The item to hash
+        2. algo (str): The hashing algo the digest was computed with
+        3. digest (str): The known hexdigest
+
+        __Returns__
+
+        (bool): True if equivalent, otherwise False
+        """
+        log.debug("Checking {} of {} against a known digest".format(
+            algo, item.item_name))
+        # This audits bytes we just wrote, so never take a cached digest for
+        # them - a same sized rewrite inside the mtime resolution of some
+        # filesystems would look fresh.
+        if hash_ldritem(item, algo, buffering=self.buffering,
+                        use_cache=False) == digest:
+            log.debug("{} == known digest ({})".format(item.item_name, algo))
+            return True
+        log.debug("{} != known digest ({})".format(item.item_name, algo))
+        return False
+
     @log_aware(log)
     def ldritem_equal_byte_contents(self):
         """
@@ -391,4 +599,7 @@ class LDRItemCopier(object):
     eq_detect = property(get_eq_detect, set_eq_detect)
     max_retires = property(get_max_retries, set_max_retries)
     buffering = property(get_buffering, set_buffering)
+    verify = property(get_verify, set_verify)
+    digest_algos = property(get_digest_algos, set_digest_algos)
+    src_digests = property(get_src_digests)
     confirm = property(get_confirm, set_confirm)
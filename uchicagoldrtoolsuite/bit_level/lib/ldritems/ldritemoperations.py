@@ -1,10 +1,13 @@
+from os import stat
 from os.path import join, split
-from tempfile import TemporaryFile
 from logging import getLogger
+from collections import OrderedDict
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.idbuilder import IDBuilder
-from uchicagoldrtoolsuite.core.lib.convenience import sane_hash
+from uchicagoldrtoolsuite.core.lib.convenience import sane_multi_hash, \
+    ldritem_parser_source
+from uchicagoldrtoolsuite.core.lib.fixitycache import get_fixity_cache
 from .ldrpath import LDRPath
 
 
@@ -39,27 +42,21 @@ def read_metadata_from_file_object(attribute_string,
         raise ValueError(
             "a materialsuite is missing the attribute {}".
             format(attribute_string))
-    with TemporaryFile() as tempfile:
-        with a_file_object.open('rb') as read_file:
-            while True:
-                buf = read_file.read(1024 * 1000 * 100)
-                if buf:
-                    tempfile.write(buf)
-                else:
-                    break
-            tempfile.seek(0)
-            try:
-                if parser_object.__name__ == 'PremisRecord':
-                    output = parser_object(frompath=tempfile)
-                elif parser_object.__name__ == 'HierarhcicalRecord':
-                    output = parser_object(fromfile=tempfile)
-                else:
-                    output = parser_object(tempfile)
-            except Exception as e:
-                raise e(
-                    "something went wrong in read_metadata_from_file_object" +
-                    "and couldn't create an instance of {}".format(
-                        parser_object.__name___))
+    # Only PremisRecord is known to take paths as well as files
+    as_file = parser_object.__name__ != 'PremisRecord'
+    with ldritem_parser_source(a_file_object, as_file=as_file) as src:
+        try:
+            if parser_object.__name__ == 'PremisRecord':
+                output = parser_object(frompath=src)
+            elif parser_object.__name__ == 'HierarhcicalRecord':
+                output = parser_object(fromfile=src)
+            else:
+                output = parser_object(src)
+        except Exception as e:
+            raise e(
+                "something went wrong in read_metadata_from_file_object" +
+                "and couldn't create an instance of {}".format(
+                    parser_object.__name___))
     return output
 
 
@@ -133,7 +130,8 @@ def move(src, dst, clobber=False, eq_detect='bytes'):
 
 
 @log_aware(log)
-def hash_ldritem(ldritem, algo="md5", buffering=1024*1000*100):
+def hash_ldritem(ldritem, algo="md5", buffering=1024*1000*100,
+                 use_cache=True):
     """
     hash any flavor of LDRItem
     see the sane_hash function in uchicagoldrtoolsuite.core.lib.convenience
@@ -147,6 +145,8 @@ def hash_ldritem(ldritem, algo="md5", buffering=1024*1000*100):
 
     * algo (str): The hashing algorithm to use
     * buffering (int): The amount of the file to read at a time
+    * use_cache (bool): Whether or not to consult the fixity cache, if one
+        is active. See hash_ldritem_multi()
 
     __Returns__
 
@@ -157,6 +157,62 @@ def hash_ldritem(ldritem, algo="md5", buffering=1024*1000*100):
         ldritem.item_name, algo, str(buffering))
     )
 
-    with ldritem.open() as f:
-        x = sane_hash(algo, f, buffering)
-    return x
+    return hash_ldritem_multi(
+        ldritem, [algo], buffering=buffering, use_cache=use_cache
+    )[algo]
+
+
+@log_aware(log)
+def hash_ldritem_multi(ldritem, algos, buffering=1024*1000*100,
+                       use_cache=True):
+    """
+    hash any flavor of LDRItem with several algos, reading it at most once
+
+    If a fixity cache is active (see
+    uchicagoldrtoolsuite.core.lib.fixitycache) and the item is an LDRPath,
+    fresh cached digests are used rather than reading the file, and any
+    digests that do have to be computed are added to the cache.
+
+    __Args__
+
+    1. ldritem (LDRItem): The item to compute the hashes of
+    2. algos ([str]): The hashing algorithms to use
+
+    __KWArgs__
+
+    * buffering (int): The amount of the file to read at a time
+    * use_cache (bool): Whether or not to use fresh cached digests. If False
+        the item is always read, though the digests computed are still
+        recorded in the cache.
+
+    __Returns__
+
+    * (dict): algo -> str-ified hash hexdigest, in the order of algos
+    """
+    cache = get_fixity_cache()
+    st = None
+    digests = {}
+    if cache is not None and isinstance(ldritem, LDRPath):
+        try:
+            st = stat(str(ldritem.path))
+        except OSError:
+            st = None
+        if st is not None and use_cache:
+            digests = cache.lookup(st, algos)
+            if digests:
+                log.debug("Fixity cache hit for {} ({})".format(
+                    ldritem.item_name, ", ".join(digests.keys())))
+
+    missing = [x for x in algos if x not in digests]
+    if missing:
+        with ldritem.open() as f:
+            computed = sane_multi_hash(missing, f, buf=buffering)
+        if st is not None:
+            # Only remember what we read if the file wasn't changing
+            # underneath us while we were reading it
+            after = stat(str(ldritem.path))
+            if (after.st_size, after.st_mtime_ns) == \
+                    (st.st_size, st.st_mtime_ns):
+                cache.store(st, computed)
+        digests.update(computed)
+    return OrderedDict((x, digests[x]) for x in algos)
@@ -24,6 +24,9 @@ class LDRPath(LDRItem):
     """
     Allows a file path to a file on the file system to be treated as an LDRItem
     """
+
+    _kernel_copyable = True
+
     @log_aware(log)
     def __init__(self, param1, root=None):
         """
@@ -86,11 +89,7 @@ class LDRPath(LDRItem):
 
         * self (opened)
         """
-        log.debug(
-            "{} opened. Mode: {}. Buffering {}".format(
-                str(self), mode, str(buffering)
-            )
-        )
+        log.debug("%s opened. Mode: %s. Buffering %s", self, mode, buffering)
         if "t" in mode:
             raise OSError('LDR Items do not support text mode')
         if mode == 'r' or \
@@ -106,13 +105,30 @@ class LDRPath(LDRItem):
         """
         Closes the LDRPath
         """
-        log.debug("{} closed".format(str(self)))
+        log.debug("%s closed", self)
         if not self.pipe:
             raise ValueError("file {} is already closed".format(self.item_name))
         else:
             self.pipe.close()
             self.pipe = None
 
+    @log_aware(log)
+    def fileno(self):
+        """
+        Exposes the file descriptor of an opened LDRPath
+
+        __Returns__
+
+        * (int): The file descriptor
+        """
+        if not self.pipe:
+            raise OSError('{} not open'.format(str(self.path)))
+        return self.pipe.fileno()
+
+    @log_aware(log, accessor=True)
+    def get_fspath(self):
+        return str(self.path)
+
     @log_aware(log)
     def exists(self):
         """
@@ -122,7 +138,7 @@ class LDRPath(LDRItem):
 
         * (bool): True if it exists, false if it doesn't
         """
-        log.debug("{} existence checked".format(str(self)))
+        log.debug("%s existence checked", self)
         return self.path.exists()
 
     @log_aware(log)
@@ -142,7 +158,7 @@ class LDRPath(LDRItem):
             explanatory string. True == File Deleted, False == Not deleted.
         """
         if final:
-            log.debug("{} deleted".format(str(self)))
+            log.debug("%s deleted", self)
             if self.exists():
                 remove(str(self.path))
             if not self.exists():
@@ -150,7 +166,7 @@ class LDRPath(LDRItem):
             else:
                 return (False, "{} exists.".format(self.item_name))
         else:
-            log.debug("{} pseudo-deleted".format(str(self)))
+            log.debug("%s pseudo-deleted", self)
             return (False, "{} will be removed.".format(self.item_name))
 
     @log_aware(log)
@@ -186,8 +202,10 @@ class LDRPath(LDRItem):
         * (int): The size of the file at the location, or 0 if nothing exists or
             there is no data written at the location.
         """
-        log.debug("{} size checked".format(str(self)))
+        log.debug("%s size checked", self)
         if self.exists():
             return self.path.stat().st_size
         else:
             return 0
+
+    fspath = property(get_fspath)
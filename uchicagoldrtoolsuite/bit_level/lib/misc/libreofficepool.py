@@ -0,0 +1,317 @@
+from os import makedirs
+from os.path import join, basename, splitext, isfile
+from pathlib import Path
+from queue import Queue
+from socket import socket
+from subprocess import Popen, DEVNULL
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import sleep, monotonic
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
+    log_init_success
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+# target extension -> [(document service, export filter), ...], mirroring the
+# filters soffice --convert-to picks for each kind of document
+_EXPORT_FILTERS = {
+    'pdf': [
+        ('com.sun.star.text.TextDocument', 'writer_pdf_Export'),
+        ('com.sun.star.sheet.SpreadsheetDocument', 'calc_pdf_Export'),
+        ('com.sun.star.presentation.PresentationDocument',
+         'impress_pdf_Export'),
+        ('com.sun.star.drawing.DrawingDocument', 'draw_pdf_Export')
+    ],
+    'csv': [
+        ('com.sun.star.sheet.SpreadsheetDocument',
+         'Text - txt - csv (StarCalc)')
+    ],
+    'txt': [
+        ('com.sun.star.text.TextDocument', 'Text')
+    ]
+}
+
+
+@log_aware(log)
+def _props(**kwargs):
+    from com.sun.star.beans import PropertyValue
+    props = []
+    for k, v in kwargs.items():
+        p = PropertyValue()
+        p.Name = k
+        p.Value = v
+        props.append(p)
+    return tuple(props)
+
+
+@log_aware(log)
+def _free_port():
+    s = socket()
+    try:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+    finally:
+        s.close()
+
+
+class _LibreOfficeInstance(object):
+    """
+    A single headless LibreOffice process, listening for UNO connections
+    on a local socket, with a user profile of its own
+    """
+    @log_aware(log)
+    def __init__(self, libre_office_path, profile_dir, startup_timeout=60):
+        self.libre_office_path = libre_office_path
+        self.profile_dir = profile_dir
+        self.startup_timeout = startup_timeout
+        self.proc = None
+        self.desktop = None
+        self.port = None
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<_LibreOfficeInstance {} port={}>".format(self.profile_dir,
+                                                          str(self.port))
+
+    @log_aware(log)
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None and \
+            self.desktop is not None
+
+    @log_aware(log)
+    def start(self):
+        # Imported here so the suite works without the LibreOffice python
+        # bindings, as long as nobody asks for a pool
+        import uno
+        from com.sun.star.connection import NoConnectException
+        makedirs(self.profile_dir, exist_ok=True)
+        self.port = _free_port()
+        self.proc = Popen(
+            [self.libre_office_path, '--headless', '--invisible',
+             '--nologo', '--norestore', '--nodefault', '--nolockcheck',
+             '-env:UserInstallation={}'.format(
+                 Path(self.profile_dir).as_uri()),
+             '--accept=socket,host=127.0.0.1,port={};urp;'.format(
+                 str(self.port)) + 'StarOffice.ComponentContext'],
+            stdout=DEVNULL, stderr=DEVNULL
+        )
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        give_up = monotonic() + self.startup_timeout
+        while True:
+            try:
+                ctx = resolver.resolve(
+                    "uno:socket,host=127.0.0.1,port={};urp;".format(
+                        str(self.port)) + "StarOffice.ComponentContext"
+                )
+                break
+            except NoConnectException:
+                if self.proc.poll() is not None or monotonic() > give_up:
+                    self.kill()
+                    raise OSError("LibreOffice failed to start listening " +
+                                  "on port {}".format(str(self.port)))
+                sleep(.25)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", ctx
+        )
+        log.debug("Started {}".format(str(self)))
+
+    @log_aware(log)
+    def kill(self):
+        self.desktop = None
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    @log_aware(log)
+    def convert(self, in_path, out_path, fmt):
+        import uno
+        doc = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(in_path), "_blank", 0,
+            _props(Hidden=True, ReadOnly=True)
+        )
+        if doc is None:
+            raise ValueError("LibreOffice couldn't load {}".format(in_path))
+        try:
+            for service, export_filter in _EXPORT_FILTERS[fmt]:
+                if doc.supportsService(service):
+                    break
+            else:
+                raise ValueError("No {} export for {}".format(fmt, in_path))
+            doc.storeToURL(uno.systemPathToFileUrl(out_path),
+                           _props(FilterName=export_filter))
+        finally:
+            doc.close(True)
+        return export_filter
+
+
+class LibreOfficePool(object):
+    """
+    A pool of warm, headless LibreOffice instances which office documents
+    are converted with over UNO
+
+    Starting LibreOffice is most of the cost of converting a typical office
+    document, so rather than running soffice --convert-to per file (and
+    per target format) the instances are started once, on first use, and
+    reused. Each has a user profile of its own, so they can run side by
+    side. Conversions which take too long get their instance killed, and
+    instances which die are restarted before their next conversion.
+
+    Requires the LibreOffice python bindings (the uno module) to be
+    importable.
+    """
+    @log_aware(log)
+    def __init__(self, libre_office_path, size=1, startup_timeout=60):
+        """
+        Create a new pool. No instances are started until they're needed.
+
+        __Args__
+
+        1. libre_office_path (str): The path to the soffice executable
+
+        __KWArgs__
+
+        * size (int): The number of instances in the pool, which is the
+            number of conversions which may run at once
+        * startup_timeout (int): How long to wait for an instance to start
+            listening before giving up on it
+        """
+        log_init_attempt(self, log, locals())
+        # Fail now, rather than on the first conversion, if the bindings
+        # aren't around
+        import uno
+        if size < 1:
+            raise ValueError("A LibreOfficePool needs at least 1 instance")
+        self.libre_office_path = libre_office_path
+        self.size = size
+        self.profiles_dir = TemporaryDirectory()
+        self._instances = [
+            _LibreOfficeInstance(
+                libre_office_path,
+                join(self.profiles_dir.name, "profile{}".format(str(i))),
+                startup_timeout=startup_timeout
+            ) for i in range(size)
+        ]
+        self._idle = Queue()
+        for x in self._instances:
+            self._idle.put(x)
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<LibreOfficePool {} x {}>".format(self.libre_office_path,
+                                                  str(self.size))
+
+    @log_aware(log)
+    def __enter__(self):
+        return self
+
+    @log_aware(log)
+    def __exit__(self, *args):
+        self.shutdown()
+
+    @log_aware(log)
+    def _attempt(self, instance, in_path, out_path, fmt, timeout):
+        # The UNO call is made in a thread of its own so that a hung
+        # conversion can be abandoned - killing the instance breaks the
+        # connection, which the (daemon) thread then dies on
+        outcome = {}
+
+        def target():
+            try:
+                outcome['filter'] = instance.convert(in_path, out_path, fmt)
+            except Exception as e:
+                outcome['error'] = e
+        t = Thread(target=target, daemon=True)
+        t.start()
+        t.join(timeout)
+        if t.is_alive():
+            log.warn("Conversion of {} timed out, killing {}".format(
+                in_path, str(instance)))
+            instance.kill()
+            return False, "timed out after {}s".format(str(timeout))
+        if 'error' in outcome:
+            return False, "failed: {}".format(str(outcome['error']))
+        return True, "exported with {}".format(outcome['filter'])
+
+    @log_aware(log)
+    def convert(self, in_path, outdir, fmt, timeout=None):
+        """
+        Convert a file with one of the pool's instances, blocking until one
+        is free
+
+        If the instance turns out to have died the conversion is retried
+        once on a fresh one.
+
+        __Args__
+
+        1. in_path (str): The file to convert
+        2. outdir (str): The dir to write the result to. The result is named
+            after the input, like soffice --convert-to would name it.
+        3. fmt (str): The target format, one of pdf, csv or txt
+
+        __KWArgs__
+
+        * timeout (int): How many seconds to let the conversion run for
+
+        __Returns__
+
+        * (tuple): The path of the result (or None), and what happened in
+            the same shape as BashCommand.get_data() - whether the
+            conversion was attempted, a description of it and whether it
+            completed - for the PREMIS events
+        """
+        if fmt not in _EXPORT_FILTERS:
+            raise ValueError("Unsupported target format: {}".format(fmt))
+        out_path = join(outdir, splitext(basename(in_path))[0] + "." + fmt)
+        instance = self._idle.get()
+        ran = False
+        try:
+            for attempt in range(2):
+                if not instance.alive():
+                    instance.kill()
+                    try:
+                        instance.start()
+                    except OSError as e:
+                        success, detail = False, str(e)
+                        continue
+                ran = True
+                success, detail = self._attempt(instance, in_path, out_path,
+                                                fmt, timeout)
+                if success or instance.alive() or \
+                        detail.startswith("timed out"):
+                    break
+                log.warn("{} died converting {}, restarting it".format(
+                    str(instance), in_path))
+        finally:
+            self._idle.put(instance)
+        if not success or not isfile(out_path):
+            out_path = None
+        detail = "LibreOffice ({}) {}".format(str(instance), detail)
+        return out_path, (ran, detail, out_path is not None)
+
+    @log_aware(log)
+    def shutdown(self):
+        """
+        Kill every instance and remove their profiles
+        """
+        for x in self._instances:
+            x.kill()
+        self.profiles_dir.cleanup()
@@ -0,0 +1,240 @@
+from collections import OrderedDict
+from json import dumps, loads
+from logging import getLogger
+from os import stat
+from os.path import join, dirname, normpath, isfile
+
+from uchicagoldrtoolsuite import log_aware
+from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
+    log_init_success
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+# The name of the index file, which lives alongside pairtree_root in both
+# stage and archive serializations
+INDEX_NAME = "materialsuite_index.jsonl"
+
+
+@log_aware(log)
+def index_path_for_pairtree_root(pairtree_root):
+    """
+    Compute where the index for a given pairtree_root lives
+
+    __Args__
+
+    1. pairtree_root (str): The path to a pairtree_root dir
+
+    __Returns__
+
+    * (str): The path to the index file
+    """
+    return join(dirname(normpath(str(pairtree_root))), INDEX_NAME)
+
+
+class MaterialSuiteIndex(object):
+    """
+    An append-only index of the MaterialSuites serialized in a pairtree
+
+    Each time a MaterialSuite is written a JSON record (one per line) is
+    appended to the index, containing its identifier, the paths of its
+    PREMIS and content relative to the pairtree_root, and their sizes and
+    the fixity of its content. When the same identifier appears more than
+    once the last record is the current one. Before a writer touches the
+    pairtree it appends a pending record (see begin()), so a write which
+    never finished leaves the index visibly stale rather than silently
+    missing a MaterialSuite.
+
+    Readers can then locate every MaterialSuite with a single sequential
+    read of the index, rather than walking the whole pairtree.
+
+    Because MaterialSuites written into a pairtree before its index existed
+    would be missing from it, an index is only ever created alongside an
+    empty pairtree_root (see create()), and writers only append to indices
+    which already exist.
+    """
+    # The algo used to record the fixity of content
+    fixity_algo = "sha256"
+
+    @log_aware(log)
+    def __init__(self, path):
+        """
+        Create a new MaterialSuiteIndex
+
+        __Args__
+
+        1. path (str): The path to the index file. It need not exist yet.
+        """
+        log_init_attempt(self, log, locals())
+        self.path = str(path)
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<MaterialSuiteIndex {}>".format(self.path)
+
+    @log_aware(log)
+    def exists(self):
+        """
+        __Returns__
+
+        * (bool): Whether or not the index file exists
+        """
+        return isfile(self.path)
+
+    @log_aware(log)
+    def create(self):
+        """
+        Start a new, empty, index - if there isn't one already
+
+        This should only be called when the pairtree_root it describes
+        is being created.
+        """
+        open(self.path, 'a').close()
+
+    @log_aware(log)
+    def _append_line(self, record):
+        # One write() of one line, opened in append mode, so writers in
+        # separate processes don't interleave their records
+        line = dumps(record, sort_keys=True) + "\n"
+        with open(self.path, 'a') as f:
+            f.write(line)
+
+    @log_aware(log)
+    def begin(self, identifier):
+        """
+        Record that a MaterialSuite is about to be written. Until append()
+        records the finished write the index is considered stale.
+
+        __Args__
+
+        1. identifier (str): The MaterialSuite identifier
+        """
+        self._append_line({'identifier': identifier, 'pending': True})
+
+    @log_aware(log)
+    def append(self, identifier, premis, premis_size,
+               content=None, content_size=None, fixity=None):
+        """
+        Add a record to the index
+
+        __Args__
+
+        1. identifier (str): The MaterialSuite identifier
+        2. premis (str): The path to the PREMIS, relative to pairtree_root
+        3. premis_size (int): The size of the PREMIS, in bytes
+
+        __KWArgs__
+
+        * content (str): The path to the content, relative to pairtree_root
+        * content_size (int): The size of the content, in bytes
+        * fixity (dict): algo -> hexdigest of the content
+        """
+        record = {
+            'identifier': identifier,
+            'premis': premis,
+            'premis_size': premis_size,
+            'content': content,
+            'content_size': content_size,
+            'fixity': fixity or {}
+        }
+        self._append_line(record)
+
+    @log_aware(log)
+    def records(self):
+        """
+        Read the current record for each identifier in the index
+
+        __Returns__
+
+        * (OrderedDict): identifier -> record, in the order the identifiers
+            were first written. Empty if there is no index. Raises a
+            ValueError if any line of the index is malformed.
+        """
+        records = OrderedDict()
+        try:
+            f = open(self.path, 'r')
+        except FileNotFoundError:
+            return records
+        with f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = loads(line)
+                    records[record['identifier']] = record
+                except (ValueError, TypeError, KeyError):
+                    # A writer died mid-line - there's no telling which
+                    # MaterialSuite it was recording
+                    raise ValueError("Malformed index line in {}".format(
+                        self.path))
+        return records
+
+    @log_aware(log)
+    def current_identifiers(self, pairtree_root):
+        """
+        Get the identifiers in the index, if the index is still accurate
+
+        The index is considered stale if:
+
+        * any line of it is malformed
+        * any MaterialSuite's write began but never finished
+        * the pairtree_root dir was modified after the index was last
+            written to, eg something other than the FileSystem writers
+            added or removed a MaterialSuite
+        * any MaterialSuite it lists is missing from the pairtree, or its
+            PREMIS or content aren't the size they were when they were
+            recorded
+
+        __Args__
+
+        1. pairtree_root (str): The pairtree_root the index describes
+
+        __Returns__
+
+        * ([str]/None): The identifiers, or None if the index is missing
+            or stale and the pairtree needs to be scanned instead
+        """
+        try:
+            records = self.records()
+        except ValueError as e:
+            log.warn("Index stale: {}".format(str(e)))
+            return None
+        if not records:
+            log.debug("No index @ {}".format(self.path))
+            return None
+        try:
+            if stat(str(pairtree_root)).st_mtime_ns > \
+                    stat(self.path).st_mtime_ns:
+                log.info("Index stale, {} modified since".format(
+                    str(pairtree_root)))
+                return None
+        except FileNotFoundError:
+            return None
+        for identifier, record in records.items():
+            if record.get('pending'):
+                log.info("Index stale, write of {} unfinished".format(
+                    identifier))
+                return None
+            checks = [(record['premis'], record['premis_size'])]
+            if record.get('content') is not None:
+                checks.append((record['content'], record['content_size']))
+            for rel_path, size in checks:
+                try:
+                    if stat(join(str(pairtree_root), rel_path)).st_size != size:
+                        log.info("Index stale @ {}".format(rel_path))
+                        return None
+                except FileNotFoundError:
+                    log.info("Index stale, {} missing".format(rel_path))
+                    return None
+        return list(records.keys())
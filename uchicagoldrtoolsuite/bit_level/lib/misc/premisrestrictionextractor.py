@@ -1,8 +1,8 @@
 
-from tempfile import TemporaryFile
-
 from pypremis.lib import PremisRecord
 
+from uchicagoldrtoolsuite.core.lib.convenience import ldritem_parser_source
+
 __author__ = "Tyler Danstrom"
 __email__ = " tdanstrom@uchicago.edu"
 __company__ = "The University of Chicago Library"
@@ -56,15 +56,7 @@ class PremisRestrictionsExtractor(object):
             raise ValueError("record is already set")
 
         else:
-            with TemporaryFile() as tempfile:
-                with value.open('rb') as read_file:
-                    while True:
-                        buf = read_file.read(1024*1000*100)
-                        if buf:
-                            tempfile.write(buf)
-                        else:
-                            break
-                tempfile.seek(0)
-                self._record = PremisRecord(frompath=tempfile)
+            with ldritem_parser_source(value) as src:
+                self._record = PremisRecord(frompath=src)
 
     record = property(get_record, set_record)
@@ -0,0 +1,161 @@
+from os import getpid
+from threading import local, Lock
+from sqlite3 import connect
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
+    log_init_success
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+# The name of the journal file, which lives in a stage's admin dir
+JOURNAL_NAME = "staging_journal.sqlite"
+
+
+class StagingJournal(object):
+    """
+    A persistent record of which files a staging run has completed
+
+    Each file is recorded, by its run name and originalName (its path
+    relative to the source root), once its MaterialSuite has been written
+    into the stage. Resuming a run is then a keyed lookup per file rather
+    than a parse of every PREMIS record already in the stage.
+
+    Connections are made per process and per thread, so staging workers
+    can all record into the same journal.
+    """
+    @log_aware(log)
+    def __init__(self, path, timeout=60):
+        """
+        Open (or create) a journal
+
+        __Args__
+
+        1. path (str): The path to the SQLite database
+
+        __KWArgs__
+
+        * timeout (int): How many seconds to wait on other writers before
+            giving up on a query
+        """
+        log_init_attempt(self, log, locals())
+        self.path = path
+        self.timeout = timeout
+        self._local = local()
+        self._schema_lock = Lock()
+        self._connection()
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<StagingJournal {}>".format(self.path)
+
+    @log_aware(log)
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == getpid():
+            return conn
+        conn = connect(self.path, timeout=self.timeout)
+        with self._schema_lock:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS staged (" +
+                "run_name TEXT NOT NULL, original_name TEXT NOT NULL, " +
+                "identifier TEXT, " +
+                "PRIMARY KEY (run_name, original_name))"
+            )
+            conn.commit()
+        self._local.conn = conn
+        self._local.pid = getpid()
+        return conn
+
+    @log_aware(log)
+    def record(self, run_name, original_name, identifier=None):
+        """
+        Note that a file has been staged
+
+        __Args__
+
+        1. run_name (str): The name of the run which staged the file
+        2. original_name (str): The file's path relative to the source root
+
+        __KWArgs__
+
+        * identifier (str): The identifier of the MaterialSuite it became
+        """
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO staged VALUES (?, ?, ?)",
+            (run_name, original_name, identifier)
+        )
+        conn.commit()
+
+    @log_aware(log)
+    def is_staged(self, run_name, original_name):
+        """
+        __Args__
+
+        1. run_name (str): The name of the run
+        2. original_name (str): The file's path relative to the source root
+
+        __Returns__
+
+        * (bool): Whether or not the run has staged the file
+        """
+        return self._connection().execute(
+            "SELECT 1 FROM staged WHERE run_name = ? AND original_name = ?",
+            (run_name, original_name)
+        ).fetchone() is not None
+
+    @log_aware(log)
+    def has_run(self, run_name):
+        """
+        __Args__
+
+        1. run_name (str): The name of the run
+
+        __Returns__
+
+        * (bool): Whether or not the journal has any record of the run
+        """
+        return self._connection().execute(
+            "SELECT 1 FROM staged WHERE run_name = ? LIMIT 1",
+            (run_name,)
+        ).fetchone() is not None
+
+
+_journals = {}
+_journals_lock = Lock()
+
+
+def get_staging_journal(path):
+    """
+    Get this process' StagingJournal for a path, opening it the first time
+    it's asked for, so code which records file by file (eg staging workers)
+    doesn't pay for a new connection and its setup every time
+
+    __Args__
+
+    1. path (str): The path to the SQLite database
+
+    __Returns__
+
+    * (StagingJournal): The journal
+    """
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = StagingJournal(path)
+            _journals[path] = journal
+        return journal
@@ -13,10 +13,12 @@ from pypremis.lib import PremisRecord
 from pypremis.nodes import *
 
 from uchicagoldrtoolsuite import log_aware
-from uchicagoldrtoolsuite.core.lib.convenience import sane_hash
+from uchicagoldrtoolsuite.core.lib.convenience import sane_multi_hash, \
+    new_hasher
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success
 from uchicagoldrtoolsuite.core.lib.idbuilder import IDBuilder
+from uchicagoldrtoolsuite.core.lib.metrics import timer
 from ..ldritems.ldritemcopier import LDRItemCopier
 from ..ldritems.abc.ldritem import LDRItem
 from ..ldritems.ldrpath import LDRPath
@@ -42,6 +44,21 @@ class GenericPREMISCreator(object):
     class methods, which are employed fairly often themselves in other
     processors at the MaterialSuite level
     """
+
+    # The fixity algos computed for every file by default, in the order
+    # their fixity nodes are added to the record.
+    fixity_algos = ['md5', 'sha256', 'crc32', 'adler32']
+
+    # What gets recorded as the messageDigestOriginator for each algo
+    _fixity_originators = {
+        'md5': 'python3 hashlib.md5',
+        'sha256': 'python3 hashlib.sha256',
+        'crc32': 'python3 zlib.crc32',
+        'adler32': 'python3 zlib.adler32'
+    }
+
+    # How many bytes to feed the hashers at a time
+    _fixity_buffering = 1024*1000
     @log_aware(log)
     def __init__(self, stage):
         """
@@ -74,7 +91,8 @@ class GenericPREMISCreator(object):
             dumps(attr_dict, sort_keys=True))
 
     @log_aware(log)
-    def process(self, skip_existing=False, set_originalName=True):
+    def process(self, skip_existing=False, set_originalName=True,
+                materialsuites=None):
         """
         make the premis records for everything
 
@@ -82,11 +100,18 @@ class GenericPREMISCreator(object):
 
         * skip_existing (bool): If True: Skip all materialsuites which claim
             to already have PREMIS records as a part of them.
+        * materialsuites (iterable): The MaterialSuites to process, rather
+            than those in the stage. Consumed lazily, so this can be a
+            generator such as FileSystemStageReader.iter_materialsuites()
         """
         log.debug("Beginning PREMIS processing")
+        if materialsuites is None:
+            materialsuites = self.stage.materialsuite_list
         ms_num = 0
-        ms_tot = len(self.stage.materialsuite_list)
-        for materialsuite in self.stage.materialsuite_list:
+        # Generators don't know how long they are
+        ms_tot = len(materialsuites) if hasattr(materialsuites, '__len__') \
+            else "?"
+        for materialsuite in materialsuites:
             ms_num += 1
             log.debug(
                 "Processing MaterialSuite {}/{}".format(
@@ -144,12 +169,14 @@ class GenericPREMISCreator(object):
         log.debug("Creating PREMIS")
         premis = make_record(tmp_file_path.path, original_name=originalName)
         log.debug("Writing created PREMIS to tmp file.")
-        premis.write_to_file(new_premis_path.path)
+        with timer("ldr_premis_serialize_seconds"):
+            premis.write_to_file(new_premis_path.path)
         materialsuite.premis = LDRPath(new_premis_path.path)
 
     @classmethod
     @log_aware(log)
-    def make_record(cls, file_path, original_name=None):
+    def make_record(cls, file_path, original_name=None, fixity_algos=None,
+                    threaded_hashing=False, known_digests=None):
         """
         build a PremisNode.Object from a file and use it to instantiate a record
 
@@ -158,19 +185,34 @@ class GenericPREMISCreator(object):
         1. file_path (str): The full path to a file
         2. item (LDRItem): The LDRItem representative of the file contents
 
+        __KWArgs__
+
+        * fixity_algos ([str]): The fixity algos to compute, defaults to
+            cls.fixity_algos
+        * threaded_hashing (bool): Whether or not to run the hashers in a
+            thread pool
+        * known_digests (dict): algo -> hexdigest pairs already computed
+            for the file (eg, while it was being copied into place), which
+            are used rather than re-reading the file
+
         __Returns__
 
         1. (PremisRecord): The populated record instance
         """
         log.debug("Generating PREMIS from supplied file path")
-        obj = cls._make_object(file_path, original_name)
-        rec = PremisRecord(objects=[obj])
+        with timer("ldr_premis_create_seconds"):
+            obj = cls._make_object(file_path, original_name,
+                                   fixity_algos=fixity_algos,
+                                   threaded_hashing=threaded_hashing,
+                                   known_digests=known_digests)
+            rec = PremisRecord(objects=[obj])
         log.debug("PremisRecord generated")
         return rec
 
     @classmethod
     @log_aware(log)
-    def _make_object(cls, file_path, original_name=None):
+    def _make_object(cls, file_path, original_name=None, fixity_algos=None,
+                     threaded_hashing=False, known_digests=None):
         """
         make an object entry auto-populated with the required information
 
@@ -186,7 +228,8 @@ class GenericPREMISCreator(object):
         objectIdentifier = cls._make_objectIdentifier()
         objectCategory = 'file'
         objectCharacteristics = cls._make_objectCharacteristics(
-            file_path, original_name
+            file_path, original_name, fixity_algos=fixity_algos,
+            threaded_hashing=threaded_hashing, known_digests=known_digests
         )
         storage = cls._make_Storage(file_path)
         obj = Object(objectIdentifier, objectCategory, objectCharacteristics)
@@ -215,7 +258,9 @@ class GenericPREMISCreator(object):
 
     @classmethod
     @log_aware(log)
-    def _make_objectCharacteristics(cls, file_path, original_name):
+    def _make_objectCharacteristics(cls, file_path, original_name,
+                                    fixity_algos=None, threaded_hashing=False,
+                                    known_digests=None):
         """
         make a new objectCharacteristics node for a file
 
@@ -229,7 +274,9 @@ class GenericPREMISCreator(object):
         1. (PremisNode.ObjectCharacteristics): a populated ObjectCharacteristics
         node
         """
-        fixitys = cls._make_fixity(file_path)
+        fixitys = cls._make_fixity(file_path, algos=fixity_algos,
+                                   threaded=threaded_hashing,
+                                   known_digests=known_digests)
         size = str(getsize(file_path))
         formats = cls._make_format(file_path, original_name)
         objChar = ObjectCharacteristics(formats[0])
@@ -263,57 +310,103 @@ class GenericPREMISCreator(object):
 
     @classmethod
     @log_aware(log)
-    def _make_fixity(cls, file_path):
+    def _make_fixity(cls, file_path, algos=None, threaded=False,
+                     known_digests=None):
         """
-        make a fixity node for md5 and one for sha256 for a file
+        make a fixity node for each requested algo for a file
+
+        All of the digests are computed from a single read of the file. If
+        that fails each algo is retried on its own, so one failing algo
+        doesn't cost the record the rest of its fixity values.
 
         __Args__
 
         1. file_path (str): The path to a file to generate info for
 
+        __KWArgs__
+
+        * algos ([str]): The algos to compute fixity values with, defaults
+            to cls.fixity_algos
+        * threaded (bool): Whether or not to run the hashers in a thread pool
+        * known_digests (dict): algo -> hexdigest pairs already computed for
+            the file. The file is only read if an algo is missing from it.
+
         __Returns__
 
         1. fixitys ([PremisNode.Fixity]): fixity nodes including computed
             values
         """
+        if algos is None:
+            algos = cls.fixity_algos
+        if known_digests is None:
+            known_digests = {}
         fixitys = []
-        with open(file_path, 'rb') as f:
-            try:
-                md5_fixity = Fixity('md5', sane_hash('md5', f))
-                md5_fixity.set_messageDigestOriginator(
-                    'python3 hashlib.md5'
-                )
-                fixitys.append(md5_fixity)
-            except:
-                pass
-        with open(file_path, 'rb') as f:
-            try:
-                sha256_fixity = Fixity('sha256', sane_hash('sha256', f))
-                sha256_fixity.set_messageDigestOriginator(
-                    'python3 hashlib.sha256'
-                )
-                fixitys.append(sha256_fixity)
-            except:
-                pass
-        with open(file_path, 'rb') as f:
+        computable_algos = cls.computable_fixity_algos(
+            [x for x in algos if x not in known_digests]
+        )
+        usable_algos = [x for x in algos if x in known_digests or
+                        x in computable_algos]
+        digests = dict(
+            (x, known_digests[x]) for x in usable_algos if x in known_digests
+        )
+        missing_algos = [x for x in usable_algos if x not in digests]
+        if missing_algos:
             try:
-                crc32_fixity = Fixity('crc32', sane_hash('crc32', f))
-                crc32_fixity.set_messageDigestOriginator(
-                    'python3 zlib.crc32'
-                )
-                fixitys.append(crc32_fixity)
-            except:
-                pass
+                digests.update(cls._hash_file(file_path, missing_algos,
+                                              threaded=threaded))
+            except Exception as e:
+                log.warn("Fixity computation failed, computing each algo " +
+                         "separately: {}".format(str(e)))
+                for algo in missing_algos:
+                    try:
+                        digests.update(cls._hash_file(file_path, [algo]))
+                    except Exception as e:
+                        log.warn("{} fixity computation failed: {}".format(
+                            algo, str(e)))
+        for algo in usable_algos:
+            digest = digests.get(algo)
+            if digest is None:
+                continue
+            fixity = Fixity(algo, digest)
+            originator = cls._fixity_originators.get(algo)
+            if originator is not None:
+                fixity.set_messageDigestOriginator(originator)
+            fixitys.append(fixity)
+        return fixitys
+
+    @classmethod
+    @log_aware(log)
+    def _hash_file(cls, file_path, algos, threaded=False):
         with open(file_path, 'rb') as f:
+            return sane_multi_hash(algos, f, buf=cls._fixity_buffering,
+                                   threaded=threaded)
+
+    @classmethod
+    @log_aware(log)
+    def computable_fixity_algos(cls, algos=None):
+        """
+        filter a list of fixity algos down to those which can be computed
+        in this environment, so one missing hashing implementation doesn't
+        fail a whole record
+
+        __KWArgs__
+
+        * algos ([str]): The algos to check, defaults to cls.fixity_algos
+
+        __Returns__
+
+        1. ([str]): The algos which can be computed, in the order given
+        """
+        if algos is None:
+            algos = cls.fixity_algos
+        computable = []
+        for x in algos:
             try:
-                adler32_fixity = Fixity('adler32', sane_hash('adler32', f))
-                adler32_fixity.set_messageDigestOriginator(
-                    'python3 zlib.adler32'
-                )
-                fixitys.append(adler32_fixity)
-            except:
-                pass
-        return fixitys
+                new_hasher(x)
+                computable.append(x)
+            except Exception as e:
+                log.warn("Can't compute {} fixity: {}".format(x, str(e)))
+        return computable
 
     @classmethod
     @log_aware(log)
@@ -4,18 +4,19 @@ from os import makedirs
 from os.path import join
 from json import dumps
 from logging import getLogger
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from pypremis.lib import PremisRecord
 from pypremis.nodes import *
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import \
-    is_presform_materialsuite, ldritem_to_premisrecord
+    is_presform_materialsuite
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success
-from ..ldritems.ldrpath import LDRPath
-from ..ldritems.ldritemcopier import LDRItemCopier
 from ..ldritems.abc.ldritem import LDRItem
+from ..converters.sharedoriginal import SharedOriginal
+from ..converters.converterregistry import ConverterRegistry
 
 
 __author__ = "Brian Balsamo"
@@ -42,7 +43,8 @@ class GenericPresformCreator(object):
         __Args__
 
         1. stage (Stage): the Stage to operate on
-        2. converters ([Converter]): an array of the converters to use
+        2. converters ([Converter] or ConverterRegistry): the converters to
+            use
         """
         log_init_attempt(self, log, locals())
         self.stage = stage
@@ -65,10 +67,18 @@ class GenericPresformCreator(object):
 
     @log_aware(log)
     def process(self, skip_existing=False, presform_presforms=False,
-                data_transfer_obj={}):
+                data_transfer_obj={}, materialsuites=None, workers=1,
+                concurrency_limits=None, callback=None):
         """
         Iterate over all the MaterialSuites in the stage, creating presforms
 
+        With more than one worker conversions run concurrently in a thread
+        pool, subject to each converter's max_concurrency (see the Converter
+        ABC). The PREMIS linking for each conversion is still done in this
+        thread, in the order the MaterialSuites were provided and the
+        converters were given, so the records come out the same no matter
+        what order the conversions finish in.
+
         __KWArgs__
 
         * skip_existing (bool): If True and a presform already exists (as
@@ -77,73 +87,154 @@ class GenericPresformCreator(object):
             that contain presform data, otherwise skip them
         * data_trans_obj (dict): A dictionary containing converter specific
             configuration values
+        * materialsuites (iterable): The MaterialSuites to process, rather
+            than those in the stage. Consumed lazily, so this can be a
+            generator such as FileSystemStageReader.iter_materialsuites().
+            Any presforms created are still added to the stage.
+        * workers (int): How many conversions to run at once
+        * concurrency_limits (dict): Overrides for the converters'
+            max_concurrency, keyed by concurrency_group or converter class
+        * callback (callable): Called with each MaterialSuite and a list of
+            its new presforms once it has been completely processed
+            (or skipped)
         """
         log.debug("Beginning stage level processing")
-        ms_len = len(self.stage.materialsuite_list)
-        ms_num = 0
-        for materialsuite in self.stage.materialsuite_list:
-            ms_num = ms_num + 1
-            log.debug(
-                "Processing MaterialSuite {}/{} ".format(ms_num, ms_len)
-            )
-            if not isinstance(materialsuite.get_premis(), LDRItem):
-                raise ValueError("All material suites must have a PREMIS " +
-                                 "record in order to generate presforms.")
-            if is_presform_materialsuite(materialsuite) and not \
-                    presform_presforms:
-                log.debug("Materialsuite contains a presform and " +
-                          "presform_presforms == False. Skipping.")
-                continue
-            if skip_existing:
-                has_presforms = False
-                premis = ldritem_to_premisrecord(materialsuite.premis)
-                try:
-                    for relation in premis.get_object_list()[0].get_relationship():
-                        if relation.get_relationshipType() == 'derivation' \
-                                and relation.get_relationshipSubType() == 'is Source of':
-                            has_presforms = True
-                            break
-                except KeyError:
-                    pass
-                if has_presforms:
-                    log.debug("MaterialSuite already has at least one " +
-                              "presform and skip_existing == True. " +
-                              "Skipping.")
-                    continue
-            for x in self.instantiate_and_make_presforms(materialsuite,
-                                                         self.working_dir_path,
-                                                         self.converters,
-                                                         data_transfer_obj=data_transfer_obj):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if concurrency_limits and min(concurrency_limits.values()) < 1:
+            raise ValueError("concurrency limits must be at least 1")
+        if materialsuites is None:
+            materialsuites = self.stage.materialsuite_list
+        ms_len = len(materialsuites) if hasattr(materialsuites, '__len__') \
+            else "?"
+        scheduler = None
+        if workers > 1:
+            scheduler = _ConversionScheduler(workers, concurrency_limits)
+        # (materialsuite, [job, ...]) in input order
+        in_flight = deque()
+
+        def finish_oldest():
+            materialsuite, jobs = in_flight.popleft()
+            # Every conversion of the MaterialSuite has to be finished before
+            # any are applied, as they all read the record being linked
+            try:
+                results = [scheduler.result(job) for job in jobs]
+            finally:
+                self.cleanup_converters([job.converter for job in jobs])
+            presforms = []
+            for job, result in zip(jobs, results):
+                presform = job.converter.apply(result)
+                if presform is not None:
+                    presforms.append(presform)
+            for x in presforms:
                 self.stage.add_materialsuite(x)
+            if callback is not None:
+                callback(materialsuite, presforms)
+
+        try:
+            ms_num = 0
+            for materialsuite in materialsuites:
+                ms_num = ms_num + 1
+                log.debug(
+                    "Processing MaterialSuite {}/{} ".format(ms_num, ms_len)
+                )
+                if not isinstance(materialsuite.get_premis(), LDRItem):
+                    raise ValueError("All material suites must have a " +
+                                     "PREMIS record in order to generate " +
+                                     "presforms.")
+                if not self._should_process(materialsuite, skip_existing,
+                                            presform_presforms):
+                    if scheduler is None and callback is not None:
+                        callback(materialsuite, [])
+                    elif scheduler is not None:
+                        in_flight.append((materialsuite, []))
+                    continue
+                if scheduler is None:
+                    presforms = self.instantiate_and_make_presforms(
+                        materialsuite, self.working_dir_path,
+                        self.converters, data_transfer_obj=data_transfer_obj
+                    )
+                    for x in presforms:
+                        self.stage.add_materialsuite(x)
+                    if callback is not None:
+                        callback(materialsuite, presforms)
+                    continue
+                jobs = [
+                    scheduler.submit(c) for c in
+                    self.instantiate_converters(materialsuite,
+                                                self.working_dir_path,
+                                                self.converters,
+                                                data_transfer_obj)
+                ]
+                in_flight.append((materialsuite, jobs))
+                # Bound how many MaterialSuites are held in memory, waiting
+                # on their turn to be linked
+                while len(in_flight) > workers * 2:
+                    finish_oldest()
+            while in_flight:
+                finish_oldest()
+        finally:
+            if scheduler is not None:
+                scheduler.shutdown()
+
+    @log_aware(log)
+    def _should_process(self, materialsuite, skip_existing,
+                        presform_presforms):
+        if is_presform_materialsuite(materialsuite) and not \
+                presform_presforms:
+            log.debug("Materialsuite contains a presform and " +
+                      "presform_presforms == False. Skipping.")
+            return False
+        if skip_existing:
+            has_presforms = False
+            premis = materialsuite.premis_record
+            try:
+                for relation in premis.get_object_list()[0].get_relationship():
+                    if relation.get_relationshipType() == 'derivation' \
+                            and relation.get_relationshipSubType() == 'is Source of':
+                        has_presforms = True
+                        break
+            except KeyError:
+                pass
+            if has_presforms:
+                log.debug("MaterialSuite already has at least one " +
+                          "presform and skip_existing == True. " +
+                          "Skipping.")
+                return False
+        return True
 
     @staticmethod
     @log_aware(log)
-    def instantiate_and_make_presforms(ms, working_dir_path, converters,
-                                       data_transfer_obj={}):
+    def instantiate_converters(ms, working_dir_path, converters,
+                               data_transfer_obj={}):
         """
-        write the file to disk an examine it, update its PREMIS
+        Create an instance of each converter which handles the content of a
+        MaterialSuite, each with its own working dir
+
+        When more than one converter applies they share a single
+        instantiation of the content, which should be cleaned up with
+        cleanup_converters() once they've all run.
 
         __Args__
 
         1. ms (MaterialSuite): The MaterialSuite of the item in question
+        2. working_dir_path (str): Where to make the converters' working dirs
+        3. converters ([Converter]): The converter classes to consider
+
+        __KWArgs__
+
+        * data_transfer_obj (dict): Converter specific configuration values
 
         __Returns__
 
-        * presforms (list[MaterialSuite]): a list of materialsuites,
-            which represent the preservation stable copies of the original file
-            as well as their associated PREMIS
+        * ([Converter]): The converter instances, in the order the classes
+            were given
         """
         if not ms.content:
             log.debug("MaterialSuite has no content, no presforms created.")
             return []
-        log.debug("Instantiating original PREMIS")
-        premis_path = join(working_dir_path, str(uuid1()))
-        premis_item = LDRPath(premis_path)
-        c = LDRItemCopier(ms.premis, premis_item, clobber=True)
-        c.copy()
-
         log.debug("Reading PREMIS...")
-        premis_rec = PremisRecord(frompath=premis_path)
+        premis_rec = ms.premis_record
 
         rec_obj = premis_rec.get_object_list()[0]
 
@@ -155,27 +246,143 @@ class GenericPresformCreator(object):
                 if fmt_dsg:
                     mimes.append(fmt_dsg.get_formatName())
         log.debug("Detected mime types: {}".format(str(mimes)))
-        converters_to_run = []
         log.debug("Getting converters to run")
-        for converter in converters:
-            for x in mimes:
-                if converter.handles_mime(x):
-                    converters_to_run.append(converter)
-                    break
+        converters_to_run = ConverterRegistry.for_converters(
+            converters).converters_for(mimes)
         log.debug("Converters to be run: {}".format(str(converters_to_run)))
 
-        presforms = []
-        for converter in set(converters_to_run):
-            log.debug("Attempting to run converter: {}".format(str(converter)))
+        instances = []
+        for converter in converters_to_run:
             c_working_dir = join(working_dir_path, str(uuid1()))
             makedirs(c_working_dir, exist_ok=True)
-            c = converter(ms, c_working_dir,
-                          data_transfer_obj=data_transfer_obj)
-            presform = c.convert()
-            if presform is not None:
-                presforms.append(presform)
-                log.debug("Presform generated")
-            else:
-                log.debug("No presform generated")
+            instances.append(converter(ms, c_working_dir,
+                                       data_transfer_obj=data_transfer_obj))
+        if len(instances) > 1:
+            shared = SharedOriginal(ms.content,
+                                    join(working_dir_path, str(uuid1())))
+            for x in instances:
+                x.shared_original = shared
+        return instances
+
+    @staticmethod
+    @log_aware(log)
+    def cleanup_converters(converters):
+        """
+        Remove anything the converters were sharing
+
+        __Args__
+
+        1. converters ([Converter]): Converters from instantiate_converters()
+        """
+        for x in converters:
+            if x.shared_original is not None:
+                x.shared_original.cleanup()
+
+    @staticmethod
+    @log_aware(log)
+    def instantiate_and_make_presforms(ms, working_dir_path, converters,
+                                       data_transfer_obj={}):
+        """
+        write the file to disk an examine it, update its PREMIS
+
+        __Args__
+
+        1. ms (MaterialSuite): The MaterialSuite of the item in question
+
+        __Returns__
+
+        * presforms (list[MaterialSuite]): a list of materialsuites,
+            which represent the preservation stable copies of the original file
+            as well as their associated PREMIS
+        """
+        presforms = []
+        instances = GenericPresformCreator.instantiate_converters(
+            ms, working_dir_path, converters, data_transfer_obj
+        )
+        try:
+            for c in instances:
+                log.debug("Attempting to run converter: {}".format(str(c)))
+                presform = c.convert()
+                if presform is not None:
+                    presforms.append(presform)
+                    log.debug("Presform generated")
+                else:
+                    log.debug("No presform generated")
+        finally:
+            GenericPresformCreator.cleanup_converters(instances)
         log.debug("All converters run")
         return presforms
+
+
+class _ConversionScheduler(object):
+    """
+    Runs Converter.run()s in a thread pool, never running more of any one
+    concurrency group at once than its limit allows
+
+    Jobs which can't start yet wait in a queue (rather than occupying a
+    worker thread) until a worker and a slot in their group free up.
+    """
+    def __init__(self, workers, limits=None):
+        self.workers = workers
+        self.limits = limits or {}
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.waiting = deque()
+        self.running = {}
+        self.group_counts = Counter()
+
+    def _group(self, converter):
+        cls = type(converter)
+        return cls.concurrency_group or cls
+
+    def _limit(self, group, converter):
+        if group in self.limits:
+            return self.limits[group]
+        if type(converter) in self.limits:
+            return self.limits[type(converter)]
+        return converter.max_concurrency
+
+    def _pump(self):
+        for job in list(self.waiting):
+            if len(self.running) >= self.workers:
+                return
+            group = self._group(job.converter)
+            limit = self._limit(group, job.converter)
+            if limit is not None and self.group_counts[group] >= limit:
+                continue
+            self.waiting.remove(job)
+            job.future = self.pool.submit(job.converter.run)
+            self.running[job.future] = group
+            self.group_counts[group] += 1
+
+    def _reap(self, block):
+        if not self.running:
+            return
+        done, _ = wait(list(self.running), timeout=None if block else 0,
+                       return_when=FIRST_COMPLETED)
+        for f in done:
+            self.group_counts[self.running.pop(f)] -= 1
+
+    def submit(self, converter):
+        job = _ConversionJob(converter)
+        self.waiting.append(job)
+        self._reap(False)
+        self._pump()
+        return job
+
+    def result(self, job):
+        while job.future is None or not job.future.done():
+            self._pump()
+            self._reap(True)
+        self._reap(False)
+        self._pump()
+        return job.future.result()
+
+    def shutdown(self):
+        self.waiting.clear()
+        self.pool.shutdown()
+
+
+class _ConversionJob(object):
+    def __init__(self, converter):
+        self.converter = converter
+        self.future = None
@@ -5,12 +5,10 @@ from pypremis.factories import LinkingObjectIdentifierFactory
 from pypremis.nodes import *
 
 from uchicagoldrtoolsuite import log_aware
-from uchicagoldrtoolsuite.core.lib.convenience import ldritem_to_premisrecord
 from uchicagoldrtoolsuite.core.lib.convenience import iso8601_dt
-from uchicagoldrtoolsuite.core.lib.convenience import TemporaryFilePath
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success
-from ..ldritems.ldrpath import LDRPath
+from uchicagoldrtoolsuite.core.lib.patternset import PatternSet
 
 
 __author__ = "Brian Balsamo"
@@ -34,11 +32,12 @@ def default_callback(premis, patterns, exclude_patterns=None):
 
     1. premis (PremisRecord): The PREMIS record that contains the object
         whose originalName we want to test again
-    2. patterns ([re.regex]): A list of regular expressions to check
+    2. patterns (PatternSet || [re.regex]): The regular expressions to
+        check. Passing a PatternSet avoids recompiling them on every call.
 
     __KWArgs__
 
-    * exclude_patterns ([re.regex] || None): An array of patterns which
+    * exclude_patterns (PatternSet || [re.regex] || None): Patterns which
         "excuse" an originalName from a match against a pattern, or None
     """
     try:
@@ -53,19 +52,23 @@ def default_callback(premis, patterns, exclude_patterns=None):
         # (this probably means its a presform)
         return
 
-    matched = False
-    for patt in patterns:
-        if patt.fullmatch(originalName):
-            matched = True
-            break
-    if matched:
-        if exclude_patterns:
-            for ex_patt in exclude_patterns:
-                if ex_patt.fullmatch(originalName):
-                    matched = False
-                    break
-    if matched:
-        return True
+    if not isinstance(patterns, PatternSet):
+        patterns = PatternSet(patterns)
+    if exclude_patterns is not None and \
+            not isinstance(exclude_patterns, PatternSet):
+        exclude_patterns = PatternSet(exclude_patterns)
+
+    matched = patterns.match(originalName)
+    if matched is None:
+        return
+    log.debug("{} matched selection pattern {}".format(originalName, matched))
+    if exclude_patterns:
+        excused = exclude_patterns.match(originalName)
+        if excused is not None:
+            log.debug("{} excused by exclusion pattern {}".format(
+                originalName, excused))
+            return
+    return True
 
 
 class GenericPruner(object):
@@ -109,7 +112,7 @@ class GenericPruner(object):
 
     @log_aware(log)
     def prune(self, callback=None, callback_args=None, callback_kwargs=None,
-              final=None, in_place_delete=None):
+              final=None, in_place_delete=None, materialsuites=None):
         """
         Prunes the provided stage. All arguments default to values provided
             to the instance on init
@@ -126,6 +129,9 @@ class GenericPruner(object):
             mock actions recorded in the PREMIS
         * in_place_delete (bool): If True && final --> fire the LDRItem.delete()
             method on the content of MaterialSuites matched by the callback
+        * materialsuites (iterable): The MaterialSuites to prune, rather
+            than those in the stage. Consumed lazily, so this can be a
+            generator such as FileSystemStageReader.iter_materialsuites()
 
         __Returns__
 
@@ -134,10 +140,7 @@ class GenericPruner(object):
         """
         def write_premis_deletion_event(ms):
             log.debug("Writing PREMIS deletion event")
-            premis_location = TemporaryFilePath()
-            ms._tmp_premis_loc = premis_location
-
-            premis = ldritem_to_premisrecord(ms.premis)
+            premis = ms.premis_record
             obj = premis.get_object_list()[0]
             eventIdentifier = EventIdentifier("uuid", uuid4().hex)
             event = Event(eventIdentifier, "deletion", iso8601_dt())
@@ -147,14 +150,11 @@ class GenericPruner(object):
                 )
             )
             premis.add_event(event)
-            premis.write_to_file(premis_location.path)
-            ms.premis = LDRPath(premis_location.path)
+            ms.premis_record = premis
 
         def write_premis_mock_deletion_event(ms):
             log.debug("Writing PREMIS mock-deletion event")
-            premis_location = TemporaryFilePath()
-            ms._tmp_premis_loc = premis_location
-            premis = ldritem_to_premisrecord(ms.premis)
+            premis = ms.premis_record
             obj = premis.get_object_list()[0]
             eventIdentifier = EventIdentifier("uuid", uuid4().hex)
             event = Event(eventIdentifier, "mock deletion", iso8601_dt())
@@ -164,8 +164,7 @@ class GenericPruner(object):
                 )
             )
             premis.add_event(event)
-            premis.write_to_file(premis_location.path)
-            ms.premis = LDRPath(premis_location.path)
+            ms.premis_record = premis
 
         if callback is None:
             callback = self.callback
@@ -177,10 +176,12 @@ class GenericPruner(object):
             final = self.final
         if in_place_delete is None:
             in_place_delete = self.in_place_delete
+        if materialsuites is None:
+            materialsuites = self.stage.materialsuite_list
 
         matched_identifiers = []
-        for ms in self.stage.materialsuite_list:
-            premis = ldritem_to_premisrecord(ms.premis)
+        for ms in materialsuites:
+            premis = ms.premis_record
             identifier = premis.get_object_list()[0].\
                 get_objectIdentifier()[0].get_objectIdentifierValue()
             if callback(premis, *callback_args, **callback_kwargs) is True:
@@ -1,6 +1,8 @@
 from tempfile import TemporaryDirectory
 from json import dumps
 from logging import getLogger
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
@@ -60,42 +62,143 @@ class GenericTechnicalMetadataCreator(object):
         )
 
     @log_aware(log)
-    def process(self, skip_existing=False, data_transfer_obj={}):
+    def process(self, skip_existing=False, data_transfer_obj={},
+                materialsuites=None, workers=1, timeout=None, callback=None,
+                batch_size=1):
         """
         create technical metadata for the provided stage
 
+        With more than one worker the techmd creators' run() methods (eg,
+        launching FITS) execute concurrently in a thread pool, while their
+        results are applied to the MaterialSuites' PREMIS in the main
+        thread, in the order the MaterialSuites were provided - so the
+        resulting PREMIS is the same as that of a serial run.
+
+        With a batch_size over 1, creators which provide a run_batch()
+        classmethod (eg, FITsCreator) are run in batches of that many
+        MaterialSuites at a time, amortizing their start up costs.
+
         __KWArgs__
 
         * skip_existing (bool): if True and the MaterialSuite has >0 technical
             metadata records then skip it
         * data_transfer_obj (dict): A dictionary for techmd creator specific
             configuration options
+        * materialsuites (iterable): The MaterialSuites to process, rather
+            than those in the stage. Consumed lazily, so this can be a
+            generator such as FileSystemStageReader.iter_materialsuites()
+        * workers (int): How many techmd creators to run at once
+        * timeout (int): A timeout (in seconds) for each techmd creator run,
+            if None the creators' own defaults are used
+        * callback (callable): Called with each MaterialSuite once it
+            has been completely processed (or skipped), eg to write it
+            back out before the next is read
+        * batch_size (int): How many MaterialSuites to hand to each
+            run_batch() call, for the creators which support it
         """
         log.debug("Beginning TECHMD Processing")
-        ms_num = 0
-        for materialsuite in self.stage.materialsuite_list:
-            ms_num += 1
-            log.debug(
-                "Processing MaterialSuite {}/{}".format(
-                    str(ms_num),
-                    str(len(self.stage.materialsuite_list))
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if materialsuites is None:
+            materialsuites = self.stage.materialsuite_list
+        ms_tot = len(materialsuites) if hasattr(materialsuites, '__len__') \
+            else "?"
+        creator_kwargs = {'data_transfer_obj': data_transfer_obj}
+        if timeout is not None:
+            creator_kwargs['timeout'] = timeout
+
+        pool = None
+        if workers > 1:
+            pool = ThreadPoolExecutor(max_workers=workers)
+            max_in_flight = workers * batch_size * 2
+        else:
+            max_in_flight = batch_size - 1
+        # (materialsuite, [(creator, slot), ...]) in input order, where a
+        # slot is [future, index into the future's result or None]
+        in_flight = deque()
+        # creator class -> [(creator, slot), ...] not yet dispatched
+        batches = {}
+
+        def submit(fn, *args):
+            if pool is not None:
+                return pool.submit(fn, *args)
+            f = Future()
+            f.set_result(fn(*args))
+            return f
+
+        def dispatch(cls):
+            batch = batches.pop(cls, [])
+            if not batch:
+                return
+            f = submit(cls.run_batch, [c for c, _ in batch])
+            for i, (_, slot) in enumerate(batch):
+                slot[0] = f
+                slot[1] = i
+
+        def finish_oldest():
+            materialsuite, jobs = in_flight.popleft()
+            for c, slot in jobs:
+                if slot[0] is None:
+                    dispatch(type(c))
+                result = slot[0].result()
+                if slot[1] is not None:
+                    result = result[slot[1]]
+                c.apply(result)
+            if callback is not None:
+                callback(materialsuite)
+
+        try:
+            ms_num = 0
+            for materialsuite in materialsuites:
+                ms_num += 1
+                log.debug(
+                    "Processing MaterialSuite {}/{}".format(
+                        str(ms_num),
+                        str(ms_tot)
+                    )
                 )
-            )
-            if not isinstance(materialsuite.get_premis(), LDRItem):
-                raise ValueError("All material suites must have a PREMIS " +
-                                 "record in order to generated technical " +
-                                 "metadata records.")
-                continue
-            if not materialsuite.content:
-                continue
-            if skip_existing:
-                if materialsuite.get_technicalmetadata_list():
-                    if isinstance(materialsuite.get_technicalmetadata(0),
-                                  LDRItem):
-                        log.debug("Detected TECHMD: Skipping")
-                        continue
-            log.debug("No TECHMD detected: Creating")
-            for techmd_creator in self.techmd_creators:
-                c = techmd_creator(materialsuite, self.working_dir_path,
-                                   data_transfer_obj=data_transfer_obj)
-                c.process()
+                if not isinstance(materialsuite.get_premis(), LDRItem):
+                    raise ValueError("All material suites must have a " +
+                                     "PREMIS record in order to generated " +
+                                     "technical metadata records.")
+                jobs = []
+                if self._needs_techmd(materialsuite, skip_existing):
+                    log.debug("No TECHMD detected: Creating")
+                    for techmd_creator in self.techmd_creators:
+                        c = techmd_creator(materialsuite,
+                                           self.working_dir_path,
+                                           **creator_kwargs)
+                        if batch_size > 1 and hasattr(techmd_creator,
+                                                      'run_batch'):
+                            slot = [None, None]
+                            batches.setdefault(techmd_creator, []).append(
+                                (c, slot))
+                            if len(batches[techmd_creator]) >= batch_size:
+                                dispatch(techmd_creator)
+                        else:
+                            slot = [submit(c.run), None]
+                        jobs.append((c, slot))
+                in_flight.append((materialsuite, jobs))
+                # Bound how many MaterialSuites are held in memory, waiting
+                # on their turn to be applied
+                while len(in_flight) > max_in_flight:
+                    finish_oldest()
+            while in_flight:
+                finish_oldest()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    @log_aware(log)
+    def _needs_techmd(self, materialsuite, skip_existing):
+        if not materialsuite.content:
+            return False
+        if skip_existing:
+            if materialsuite.get_technicalmetadata_list():
+                if isinstance(materialsuite.get_technicalmetadata(0),
+                              LDRItem):
+                    log.debug("Detected TECHMD: Skipping")
+                    return False
+        return True
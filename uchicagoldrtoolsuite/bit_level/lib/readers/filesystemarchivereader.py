@@ -1,5 +1,5 @@
 from os import scandir
-from os.path import join, isdir, relpath
+from os.path import join, isdir, isfile, relpath
 from logging import getLogger
 from pathlib import Path
 
@@ -7,10 +7,12 @@ from pypairtree.utils import identifier_to_path, path_to_identifier
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
-    log_init_success, recursive_scandir
+    log_init_success, iter_pairtree_encapsulations
 from .filesystemmaterialsuitereader import FileSystemMaterialSuiteReader
 from .abc.archiveserializationreader import ArchiveSerializationReader
 from ..ldritems.ldrpath import LDRPath
+from ..misc.materialsuiteindex import MaterialSuiteIndex, \
+    index_path_for_pairtree_root
 
 
 __author__ = "Brian Balsamo"
@@ -36,7 +38,7 @@ class FileSystemArchiveReader(ArchiveSerializationReader):
     def __init__(
         self, root, target_identifier, encapsulation="arf",
         materialsuite_deserializer=FileSystemMaterialSuiteReader,
-        materialsuite_deserializer_kwargs={}
+        materialsuite_deserializer_kwargs={}, walk_workers=1
     ):
         """
         Create a new FileSystemArchiveReader
@@ -57,11 +59,14 @@ class FileSystemArchiveReader(ArchiveSerializationReader):
         * materialsuite_deserializer_kwargs (dict): Any kwargs to be forwarded
             to the materialsuite deserializing class. Encapsulation is inherited
             automatically, unless otherwise specified
+        * walk_workers (int): How many directories to list at once when the
+            pairtree has to be walked to find the MaterialSuites
         """
         log_init_attempt(self, log, locals())
         super().__init__(root, target_identifier, materialsuite_deserializer,
                          materialsuite_deserializer_kwargs)
         self.encapsulation = encapsulation
+        self.walk_workers = walk_workers
         # If the ms deserializer needs encapsulation inherit it if none is
         # provided
         if 'encapsulation' not in self.materialsuite_deserializer_kwargs.keys():
@@ -105,18 +110,49 @@ class FileSystemArchiveReader(ArchiveSerializationReader):
             accrec_dir_path, adminnotes_path, \
             legalnotes_path
 
+    @log_aware(log)
+    def _iter_identifiers(self, pairtree_root):
+        identifiers = MaterialSuiteIndex(
+            index_path_for_pairtree_root(pairtree_root)
+        ).current_identifiers(pairtree_root)
+        if identifiers is not None:
+            yield from identifiers
+            return
+        log.debug("Scanning the pairtree for MaterialSuites")
+        for x in iter_pairtree_encapsulations(pairtree_root,
+                                              self.encapsulation,
+                                              workers=self.walk_workers):
+            if not isfile(join(x, "premis.xml")):
+                continue
+            yield path_to_identifier(Path(x).parent, root=Path(pairtree_root))
+
+    @log_aware(log)
+    def _iter_data(self, pairtree_root):
+        for identifier in self._iter_identifiers(pairtree_root):
+            yield self.materialsuite_deserializer(
+                pairtree_root, identifier,
+                **self.materialsuite_deserializer_kwargs
+            ).read()
+
     @log_aware(log)
     def _read_data(self, pairtree_root):
-        for x in (x for x in recursive_scandir(pairtree_root) if
-                  x.name == "premis.xml"):
-            identifier = path_to_identifier(Path(x.path).parent.parent,
-                                            root=Path(pairtree_root))
-            self.struct.add_materialsuite(
-                self.materialsuite_deserializer(
-                    pairtree_root, identifier,
-                    **self.materialsuite_deserializer_kwargs
-                ).read()
-            )
+        for x in self._iter_data(pairtree_root):
+            self.struct.add_materialsuite(x)
+
+    @log_aware(log)
+    def iter_materialsuites(self):
+        """
+        Lazily read the MaterialSuites in the archive, one at a time, without
+        adding them to self.struct
+
+        __Returns__
+
+        * (generator): The MaterialSuites
+        """
+        arch_root, pairtree_root, admin_root, \
+            accrec_dir_path, adminnotes_path, \
+            legalnotes_path = self._read_skeleton()
+        yield from self._iter_data(pairtree_root)
 
     @log_aware(log)
     def _read_admin(self, accrec_dir_path, adminnotes_path,
@@ -6,10 +6,12 @@ from pypairtree.utils import path_to_identifier
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
-    log_init_success, recursive_scandir
+    log_init_success, iter_pairtree_encapsulations
 from .filesystemmaterialsuitereader import FileSystemMaterialSuiteReader
 from .abc.stageserializationreader import StageSerializationReader
 from ..ldritems.ldrpath import LDRPath
+from ..misc.materialsuiteindex import MaterialSuiteIndex, \
+    index_path_for_pairtree_root
 
 
 __author__ = "Brian Balsamo"
@@ -36,7 +38,7 @@ class FileSystemStageReader(StageSerializationReader):
     def __init__(
         self, root, target_identifier, encapsulation='srf',
         materialsuite_deserializer=FileSystemMaterialSuiteReader,
-        materialsuite_deserializer_kwargs={}
+        materialsuite_deserializer_kwargs={}, walk_workers=1
     ):
         """
         Create a new FileSystemStageReader
@@ -57,12 +59,15 @@ class FileSystemStageReader(StageSerializationReader):
             A class to delegate reading the MaterialSuites to
         * materialsuite_deserializer_kwargs (dict): kwargs to pass to the class
             that is delegated to.
+        * walk_workers (int): How many directories to list at once when the
+            pairtree has to be walked to find the MaterialSuites
         """
         log_init_attempt(self, log, locals())
         super().__init__(root, target_identifier, materialsuite_deserializer,
                          materialsuite_deserializer_kwargs)
         self.path = str(Path(self.root, self.target_identifier))
         self.encapsulation = encapsulation
+        self.walk_workers = walk_workers
         # If the ms deserializer needs encapsulation inherit it if none is
         # provided
         if 'encapsulation' not in self.materialsuite_deserializer_kwargs.keys():
@@ -103,7 +108,6 @@ class FileSystemStageReader(StageSerializationReader):
         accessionrecords_dir = Path(self.path, 'admin', 'accessionrecords')
         legalnotes_dir = Path(self.path, 'admin', 'legalnotes')
         adminnotes_dir = Path(self.path, 'admin', 'adminnotes')
-        materialsuites_dir = Path(self.path, 'pairtree_root')
 
         log.debug("Adding accession records")
         for x in [x.path for x in scandir(str(accessionrecords_dir))]:
@@ -116,17 +120,46 @@ class FileSystemStageReader(StageSerializationReader):
             self.struct.add_adminnote(LDRPath(x))
         log.debug("Adding MaterialSuites resulting from delegation to the " +
                   "FileSystemMaterialSuite")
-        # This isn't particularly pretty, and might be able to be optimized to
-        # be more general (and potentially auto-detect the encapsulation) but it
-        # works for now.
-        for x in (x.path for x in recursive_scandir(str(materialsuites_dir)) if
-                  x.name == self.encapsulation):
-            self.struct.add_materialsuite(
-                self.materialsuite_deserializer(
-                    materialsuites_dir,
-                    path_to_identifier(Path(x).parent, root=materialsuites_dir),
-                    **self.materialsuite_deserializer_kwargs
-                ).read()
-            )
+        for x in self.iter_materialsuites():
+            self.struct.add_materialsuite(x)
         log.info("Stage read")
         return self.struct
+
+    @log_aware(log)
+    def iter_materialsuites(self):
+        """
+        Lazily read the MaterialSuites in the stage, one at a time, without
+        adding them to self.struct
+
+        Large stages can be processed this way without ever holding every
+        MaterialSuite in memory, or waiting for the whole stage to be
+        read before work starts.
+
+        __Returns__
+
+        * (generator): The MaterialSuites
+        """
+        if not self.assert_skeleton():
+            log.warn("No stage detected - assuming a blank stage")
+            return
+        materialsuites_dir = Path(self.path, 'pairtree_root')
+        identifiers = MaterialSuiteIndex(
+            index_path_for_pairtree_root(str(materialsuites_dir))
+        ).current_identifiers(str(materialsuites_dir))
+        if identifiers is None:
+            log.debug("Scanning the pairtree for MaterialSuites")
+            # This isn't particularly pretty, and might be able to be
+            # optimized to be more general (and potentially auto-detect the
+            # encapsulation) but it works for now.
+            identifiers = (
+                path_to_identifier(Path(x).parent, root=materialsuites_dir)
+                for x in iter_pairtree_encapsulations(
+                    str(materialsuites_dir), self.encapsulation,
+                    workers=self.walk_workers
+                )
+            )
+        for identifier in identifiers:
+            yield self.materialsuite_deserializer(
+                materialsuites_dir, identifier,
+                **self.materialsuite_deserializer_kwargs
+            ).read()
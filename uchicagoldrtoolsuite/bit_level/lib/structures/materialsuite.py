@@ -3,8 +3,10 @@ from logging import getLogger
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
-    log_init_success
+    log_init_success, ldritem_to_premisrecord, TemporaryFilePath
+from uchicagoldrtoolsuite.core.lib.metrics import timer
 from ..ldritems.abc.ldritem import LDRItem
+from ..ldritems.ldrpath import LDRPath
 
 
 __author__ = "Brian Balsamo, Tyler Danstrom"
@@ -22,6 +24,13 @@ class MaterialSuite(object):
     """
     A structure which holds all LDR Items pertaining to a piece of content
     and the content itself
+
+    The PREMIS is available both as an LDRItem (.premis) and as a parsed
+    PremisRecord (.premis_record). The record is parsed the first time it is
+    asked for and then kept, until a new .premis is set. Setting
+    .premis_record (for instance, after editing it) marks it dirty - it is
+    only serialized again when someone asks for the bytes via .premis, or
+    when a writer serializes the MaterialSuite.
     """
     @log_aware(log)
     def __init__(self, identifier):
@@ -31,6 +40,9 @@ class MaterialSuite(object):
         log_init_attempt(self, log, locals())
         self._content = None
         self._premis = None
+        self._premis_record = None
+        self._premis_record_dirty = False
+        self._premis_record_tmp = None
         self._identifier = None
         self.identifier = identifier
         log_init_success(self, log)
@@ -40,11 +52,13 @@ class MaterialSuite(object):
         attr_dict = {
             'identifier': self.identifier,
             'content': str(self.get_content()),
-            'premis': str(self.get_premis())
+            # Not .get_premis(), which would flush a dirty record
+            'premis': str(self._premis),
+            'premis_record_dirty': self._premis_record_dirty
         }
         return "<MaterialSuite {}>".format(dumps(attr_dict, sort_keys=True))
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_identifier(self):
         return self._identifier
 
@@ -60,31 +74,113 @@ class MaterialSuite(object):
 
     @log_aware(log)
     def set_content(self, content):
-        log.debug("Setting content in {} to {}".format(str(self), str(content)))
+        log.debug("Setting content in %s to %s", self, content)
         self._content = content
 
-    @log_aware(log)
+    @log_aware(log, accessor=True)
     def get_content(self):
         return self._content
 
     @log_aware(log)
     def del_content(self):
-        log.debug("Deleting content from MaterialSuite: {}".format(str(self)))
+        log.debug("Deleting content from MaterialSuite: %s", self)
         self._content = None
 
     @log_aware(log)
     def set_premis(self, premis):
-        log.debug("Setting PREMIS in {} to {}".format(str(self), str(premis)))
+        log.debug("Setting PREMIS in %s to %s", self, premis)
         self._premis = premis
+        # Whatever we had parsed was from the old bytes
+        self._premis_record = None
+        self._premis_record_dirty = False
 
     @log_aware(log)
     def get_premis(self):
+        if self._premis_record_dirty:
+            self.flush_premis_record()
         return self._premis
 
     @log_aware(log)
     def del_premis(self):
-        log.debug("Deleting PREMIS from MaterialSuite: {}".format(str(self)))
+        log.debug("Deleting PREMIS from MaterialSuite: %s", self)
         self._premis = None
+        self._premis_record = None
+        self._premis_record_dirty = False
+
+    @log_aware(log)
+    def get_premis_record(self):
+        """
+        __Returns__
+
+        * (PremisRecord/None): The parsed PREMIS, or None if the
+            MaterialSuite has no PREMIS
+        """
+        if self._premis_record is None and self._premis is not None:
+            log.debug("Parsing PREMIS of MaterialSuite %s", self.identifier)
+            self._premis_record = ldritem_to_premisrecord(self._premis)
+        return self._premis_record
+
+    @log_aware(log)
+    def set_premis_record(self, record):
+        """
+        Install a (possibly edited) PremisRecord as the PREMIS of this
+        MaterialSuite. Records which are edited in place should be set again
+        once they have been edited, so the changes are written back.
+
+        __Args__
+
+        1. record (PremisRecord): The record
+        """
+        log.debug("Setting PREMIS record in MaterialSuite {}".format(
+            self.identifier))
+        self._premis_record = record
+        self._premis_record_dirty = True
+
+    @log_aware(log)
+    def del_premis_record(self):
+        """
+        Drop the parsed PREMIS, including any changes which have not been
+        written back
+        """
+        self._premis_record = None
+        self._premis_record_dirty = False
+
+    @log_aware(log, accessor=True)
+    def get_premis_record_dirty(self):
+        return self._premis_record_dirty
+
+    @log_aware(log)
+    def flush_premis_record(self, path=None):
+        """
+        Serialize the parsed PREMIS and make the result the .premis of this
+        MaterialSuite. The record stays cached.
+
+        __KWArgs__
+
+        * path (str): Where to write the record. If not provided it is
+            written to a tmp location which lives as long as this
+            MaterialSuite does.
+
+        __Returns__
+
+        * (LDRPath): The serialized PREMIS
+        """
+        record = self.get_premis_record()
+        if record is None:
+            raise ValueError(
+                "MaterialSuite {} has no PREMIS to flush".format(
+                    self.identifier)
+            )
+        if path is None:
+            self._premis_record_tmp = TemporaryFilePath()
+            path = self._premis_record_tmp.path
+        log.debug("Writing PREMIS record of MaterialSuite {} to {}".format(
+            self.identifier, path))
+        with timer("ldr_premis_serialize_seconds"):
+            record.write_to_file(path)
+        self._premis = LDRPath(path)
+        self._premis_record_dirty = False
+        return self._premis
 
     @log_aware(log)
     def validate(self):
@@ -113,3 +209,11 @@ class MaterialSuite(object):
         set_premis,
         del_premis
     )
+
+    premis_record = property(
+        get_premis_record,
+        set_premis_record,
+        del_premis_record
+    )
+
+    premis_record_dirty = property(get_premis_record_dirty)
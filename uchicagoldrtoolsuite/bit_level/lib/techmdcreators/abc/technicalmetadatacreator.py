@@ -1,16 +1,12 @@
-from os.path import join
 from logging import getLogger
 from abc import ABCMeta, abstractmethod
-from uuid import uuid1
 
-from pypremis.lib import PremisRecord
 from pypremis.nodes import *
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import iso8601_dt
 from uchicagoldrtoolsuite.core.lib.idbuilder import IDBuilder
-from ...ldritems.ldrpath import LDRPath
-from ...ldritems.ldritemcopier import LDRItemCopier
+from uchicagoldrtoolsuite.core.lib.metrics import inc
 
 
 __author__ = "Brian Balsamo"
@@ -86,6 +82,37 @@ class TechnicalMetadataCreator(metaclass=ABCMeta):
     def process(self):
         pass
 
+    @log_aware(log)
+    def run(self):
+        """
+        Do the expensive part of the technical metadata creation, without
+        touching the MaterialSuite's PREMIS
+
+        Creators which can split their work this way override this and
+        apply(), which lets GenericTechnicalMetadataCreator run many of them
+        at once in worker threads and then apply their results one at a
+        time, in order. By default there is nothing to run concurrently.
+
+        __Returns__
+
+        * Whatever apply() needs to finish the job
+        """
+        return None
+
+    @log_aware(log)
+    def apply(self, run_result):
+        """
+        Record the result of run() in the MaterialSuite
+
+        By default this just calls process(), for creators which don't split
+        their work up.
+
+        __Args__
+
+        1. run_result: The return value of run()
+        """
+        self.process()
+
     @log_aware(log)
     def handle_premis(self, cmd_output, material_suite, techmdcreator_name,
                       success, record_entry_name, record_path):
@@ -105,9 +132,9 @@ class TechnicalMetadataCreator(metaclass=ABCMeta):
         4. success (bool): If true records the event outcome as successful,
             otherwise records the event outcome as a failure.
         """
-        premis_path = join(self.working_dir, str(uuid1()))
-        LDRItemCopier(material_suite.get_premis(), LDRPath(premis_path)).copy()
-        orig_premis = PremisRecord(frompath=premis_path)
+        inc("ldr_techmd_total", creator=type(self).__name__,
+            succeeded=bool(success))
+        orig_premis = material_suite.premis_record
         event = self._build_Event(cmd_output, techmdcreator_name, success,
                                   orig_premis.get_object_list()[0])
         orig_premis.add_event(event)
@@ -126,12 +153,7 @@ class TechnicalMetadataCreator(metaclass=ABCMeta):
                     objectCharacteristicsExtension
                 )
 
-        updated_premis_path = join(self.working_dir, str(uuid1()))
-        orig_premis.write_to_file(updated_premis_path)
-
-        material_suite.set_premis(
-            LDRPath(updated_premis_path)
-        )
+        material_suite.premis_record = orig_premis
 
     @log_aware(log)
     def _build_Event(self, cmd_output, techmdcreator_name, success, link_obj):
@@ -1,21 +1,21 @@
-from os import makedirs
-from os.path import join, dirname, isfile
-from uuid import uuid1
-from requests import post
+from os.path import join, basename
+from uuid import uuid1, uuid4
+from time import sleep
+from threading import Lock
 from xml.etree.ElementTree import fromstring
 from json import dumps
 from logging import getLogger
 
-from pypremis.lib import PremisRecord
-from pypremis.nodes import *
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout, HTTPError
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success
+from uchicagoldrtoolsuite.core.lib.metrics import inc, timer
 from .abc.technicalmetadatacreator import TechnicalMetadataCreator
-from ..ldritems.ldrpath import LDRPath
 from ..ldritems.abc.ldritem import LDRItem
-from ..ldritems.ldritemcopier import LDRItemCopier
 
 
 __author__ = "Brian Balsamo"
@@ -29,9 +29,136 @@ __version__ = "0.0.1dev"
 log = getLogger(__name__)
 
 
+# (connect, read) timeouts used when the creator isn't given one
+DEFAULT_TIMEOUT = (10, 600)
+
+_session = None
+_session_lock = Lock()
+
+
+@log_aware(log)
+def get_fits_api_session(pool_size=10):
+    """
+    Get the Session shared by every APIFITsCreator in this process
+
+    Sharing the Session means connections to the servlet are kept alive
+    and reused, rather than each file paying for a fresh connection.
+
+    __KWArgs__
+
+    * pool_size (int): The maximum number of connections to keep open to
+        each host. Only takes effect when the Session is first created, and
+        should be at least the number of creators running at once.
+
+    __Returns__
+
+    * (requests.Session): The session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = Session()
+            adapter = HTTPAdapter(pool_connections=pool_size,
+                                  pool_maxsize=pool_size)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
+
+
+@log_aware(log)
+def _multipart_body(item, field_name, file_name, boundary,
+                    blocksize=1024*1000):
+    # A multipart/form-data body, generated as the item is read, so the
+    # content never has to be held in memory or instantiated on disk
+    yield ("--{}\r\n".format(boundary) +
+           'Content-Disposition: form-data; name="{}"; '.format(field_name) +
+           'filename="{}"\r\n'.format(file_name.replace('"', '')) +
+           "Content-Type: application/octet-stream\r\n\r\n").encode("utf-8")
+    with item.open('rb') as f:
+        data = f.read(blocksize)
+        while data:
+            yield data
+            data = f.read(blocksize)
+    yield "\r\n--{}--\r\n".format(boundary).encode("utf-8")
+
+
+@log_aware(log)
+def post_to_fits_api(url, item, file_name, session=None,
+                     timeout=DEFAULT_TIMEOUT, retries=3, backoff=1):
+    """
+    Stream an LDRItem to a FITS servlet and return the FITS record
+
+    Connection problems, timeouts and 5xx responses are retried, after
+    backing off for backoff * 2^n seconds. The item is re-read from the
+    start for every attempt. If the last attempt fails its exception is
+    raised, and a ValueError is raised if the servlet responds with an
+    error document.
+
+    __Args__
+
+    1. url (str): The servlet's examine endpoint
+    2. item (LDRItem): The content to examine
+    3. file_name (str): The file name to present the content as, FITS uses
+        its extension as a hint
+
+    __KWArgs__
+
+    * session (requests.Session): The session to use, defaults to the
+        shared one
+    * timeout (float or (float, float)): The requests timeout, per attempt
+    * retries (int): How many times to retry a failed attempt
+    * backoff (float): The base of the delay between attempts
+
+    __Returns__
+
+    * (str): The FITS xml
+    """
+    if session is None:
+        session = get_fits_api_session()
+    attempt = 0
+    while True:
+        boundary = uuid4().hex
+        body = _multipart_body(item, 'datafile', file_name, boundary)
+        try:
+            r = session.post(
+                url,
+                data=body,
+                headers={'Content-Type':
+                         'multipart/form-data; boundary={}'.format(boundary)},
+                timeout=timeout
+            )
+            if r.status_code >= 500:
+                r.raise_for_status()
+            break
+        except (ConnectionError, Timeout, HTTPError) as e:
+            err = e
+        finally:
+            # An attempt which failed partway through the upload leaves the
+            # body suspended with the item open. Close it now, rather than
+            # whenever it's collected, which could be after the next attempt
+            # has re-opened the item.
+            body.close()
+        if attempt >= retries:
+            raise err
+        delay = backoff * (2 ** attempt)
+        attempt += 1
+        log.warn("FITS API request failed ({}), retry {}/{} in {}s".format(
+            str(err), str(attempt), str(retries), str(delay)))
+        sleep(delay)
+    if fromstring(r.text).tag == "error":
+        raise ValueError(r.text)
+    return r.text
+
+
 class APIFITsCreator(TechnicalMetadataCreator):
     """
     Utilizes a remove server FITs servlet to create technical metadata records
+
+    Requests share a pooled, keep-alive Session, and stream the content
+    straight out of the MaterialSuite. Run under a
+    GenericTechnicalMetadataCreator with several workers to keep a servlet
+    farm busy.
     """
     @log_aware(log)
     def __init__(self, materialsuite, working_dir, timeout=None,
@@ -48,10 +175,12 @@ class APIFITsCreator(TechnicalMetadataCreator):
 
         __KWArgs__
 
-        * timeout (int): A timeout for the techmd creation process, after
-            which the creator will fail out.
+        * timeout (int): A timeout for each request to the servlet, after
+            which it is retried or the creator fails out.
         * data_transfer_obj (dict): A dictionary for passing converter
-            specific information into the class from a wrapper.
+            specific information into the class from a wrapper. Looks for
+            fits_api_url, and optionally fits_api_retries and
+            fits_api_pool_size.
         """
         log_init_attempt(self, log, locals())
         super().__init__(materialsuite, working_dir, timeout)
@@ -59,6 +188,16 @@ class APIFITsCreator(TechnicalMetadataCreator):
         if self.fits_api_url is None:
             raise ValueError('No fits_api_url specified in the data ' +
                              'transfer object!')
+        self.retries = data_transfer_obj.get('fits_api_retries', 3)
+        self.pool_size = data_transfer_obj.get('fits_api_pool_size', 10)
+        # Dig the name out of the PREMIS now, rather than in run(), which
+        # may be in a worker thread
+        self.file_name = None
+        if isinstance(materialsuite.get_premis(), LDRItem):
+            self.file_name = basename(
+                materialsuite.premis_record.get_object_list()[0].
+                get_originalName()
+            )
         log_init_success(self, log)
 
     @log_aware(log)
@@ -78,71 +217,70 @@ class APIFITsCreator(TechnicalMetadataCreator):
 
         Alters the MaterialSuite in place.
         """
+        self.apply(self.run())
+
+    @log_aware(log)
+    def run(self):
+        """
+        POST the content to the servlet, and store the resulting FITS
+
+        Doesn't alter the MaterialSuite, so it is safe to call concurrently
+        for different MaterialSuites.
+
+        __Returns__
+
+        * (tuple): A description of the outcome, whether or not FITS
+            creation succeeded, and the path of the FITS record
+        """
         log.debug(
             "Attempting to create FITS for {}".format(
                 self.get_source_materialsuite().get_content().item_name
             )
         )
-        log.debug(
-            "Building FITsCreator environment."
-        )
         if not isinstance(self.get_source_materialsuite().get_premis(),
                           LDRItem):
             raise ValueError("All material suites must have a PREMIS record " +
                              "in order to generate technical metadata.")
-        premis_file_path = join(self.working_dir, str(uuid1()))
-        LDRItemCopier(
-            self.get_source_materialsuite().get_premis(),
-            LDRPath(premis_file_path)
-        ).copy()
-        premis_record = PremisRecord(frompath=premis_file_path)
-        original_name = premis_record.get_object_list()[0].get_originalName()
-
-        content_file_path = dirname(
-            join(
-                self.working_dir,
-                str(uuid1()),
-                original_name
-            )
-        )
-        content_file_containing_dir_path = dirname(content_file_path)
-        makedirs(content_file_containing_dir_path, exist_ok=True)
-        original_holder = LDRPath(content_file_path)
-        LDRItemCopier(
-            self.get_source_materialsuite().get_content(),
-            original_holder
-        ).copy()
 
         fits_file_path = join(self.working_dir, str(uuid1()))
-        if self.get_timeout() is not None:
-            log.debug("The API FITS generator doesn't support timeouts.")
+        timeout = self.get_timeout()
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
 
         log.debug("POSTing file to endpoint.")
         try:
-            r = post(
-                self.fits_api_url,
-                files={'datafile': original_holder.open()}
-            )
-
-            if fromstring(r.text).tag == "error":
-                raise ValueError(r.text)
-            else:
-                with open(fits_file_path, 'w') as f:
-                    f.write(r.text)
+            inc("ldr_fits_files_total", mode="api")
+            with timer("ldr_fits_seconds", mode="api"):
+                fits = post_to_fits_api(
+                    self.fits_api_url,
+                    self.get_source_materialsuite().get_content(),
+                    self.file_name,
+                    session=get_fits_api_session(self.pool_size),
+                    timeout=timeout, retries=self.retries
+                )
+            with open(fits_file_path, 'w') as f:
+                f.write(fits)
+            outcome = "FITS servlet @ {} responded".format(self.fits_api_url)
             log.debug("FITS creation successful")
         except Exception as e:
-            log.warn("FITS creation failed: {}".format(str(e)))
-        log.debug("Updating PREMIS")
-
-        if isfile(fits_file_path):
-            success = True
-            log.debug("FITS successfully created")
-        else:
-            success = False
-            log.warn("FITS creation failed on {}".format(
-                self.get_source_materialsuite().identifier)
+            outcome = "FITS servlet @ {} failed: {}".format(self.fits_api_url,
+                                                            str(e))
+            log.warn("FITS creation failed on {}: {}".format(
+                self.get_source_materialsuite().identifier, str(e))
             )
-        self.handle_premis(cmd_data, self.get_source_materialsuite(),
+            return outcome, False, fits_file_path
+        return outcome, True, fits_file_path
+
+    @log_aware(log)
+    def apply(self, run_result):
+        """
+        Record the outcome of run() in the MaterialSuite's PREMIS
+
+        __Args__
+
+        1. run_result (tuple): The return value of run()
+        """
+        outcome, success, fits_file_path = run_result
+        log.debug("Updating PREMIS")
+        self.handle_premis(outcome, self.get_source_materialsuite(),
                            "FITs", success, "fitsRecord", fits_file_path)
-        log.debug("Deleting temporary holder file")
-        original_holder.delete(final=True)
@@ -8,6 +8,7 @@ from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.bash_cmd import BashCommand
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success
+from uchicagoldrtoolsuite.core.lib.metrics import inc, timer
 from ..ldritems.ldrpath import LDRPath
 from ..ldritems.abc.ldritem import LDRItem
 from ..ldritems.ldritemcopier import LDRItemCopier
@@ -74,6 +75,21 @@ class FITsCreator(TechnicalMetadataCreator):
         """
         runs a local FITs installation against the MaterialSuite's content
         """
+        self.apply(self.run())
+
+    @log_aware(log)
+    def run(self):
+        """
+        Instantiate the content and run FITS against it
+
+        Doesn't alter the MaterialSuite, so it is safe to call concurrently
+        for different MaterialSuites.
+
+        __Returns__
+
+        * (tuple): The command data, whether or not FITS succeeded, the
+            path of the FITS record, and the instantiated content
+        """
         if not isinstance(self.get_source_materialsuite().get_premis(),
                           LDRItem):
             raise ValueError("All material suites must have a PREMIS record " +
@@ -114,7 +130,9 @@ class FITsCreator(TechnicalMetadataCreator):
         log.debug(
             "Running FITS on file. Timeout: {}".format(str(self.get_timeout()))
         )
-        cmd.run_command()
+        with timer("ldr_fits_seconds", mode="single"):
+            cmd.run_command()
+        inc("ldr_fits_files_total", mode="single")
 
         cmd_data = cmd.get_data()
 
@@ -126,6 +144,94 @@ class FITsCreator(TechnicalMetadataCreator):
             log.warn("FITS creation failed on {}".format(
                 self.get_source_materialsuite().identifier)
             )
+        return cmd_data, success, fits_file_path, original_holder
+
+    @classmethod
+    @log_aware(log)
+    def run_batch(cls, creators):
+        """
+        Do the work of run() for several FITsCreators with a single
+        FITS invocation
+
+        Every content is instantiated into one directory, which FITS is
+        run against recursively, so JVM startup and tool initialization
+        are paid once per batch rather than once per file.
+
+        The fits_path and working_dir of the first creator are used, and
+        the timeout (if any) is scaled by the size of the batch.
+
+        __Args__
+
+        1. creators ([FITsCreator]): The creators to run
+
+        __Returns__
+
+        * ([tuple]): The run() style result of each creator, in order
+        """
+        if not creators:
+            return []
+        first = creators[0]
+        batch_dir = join(first.working_dir, uuid4().hex)
+        out_dir = join(first.working_dir, uuid4().hex)
+        makedirs(batch_dir)
+        makedirs(out_dir)
+        log.debug("Building batch FITS-ing environment")
+        holders = []
+        for c in creators:
+            if not isinstance(c.get_source_materialsuite().get_premis(),
+                              LDRItem):
+                raise ValueError("All material suites must have a PREMIS " +
+                                 "record in order to generate technical " +
+                                 "metadata.")
+            # See run() re: not using the originalName
+            name = uuid4().hex
+            original_holder = LDRPath(join(batch_dir, name))
+            LDRItemCopier(
+                c.get_source_materialsuite().get_content(),
+                original_holder
+            ).copy()
+            holders.append((name, original_holder))
+
+        cmd = BashCommand([first.fits_path, '-r', '-i', batch_dir,
+                           '-o', out_dir])
+        if first.get_timeout() is not None:
+            cmd.set_timeout(first.get_timeout() * len(creators))
+
+        log.debug(
+            "Running FITS on a batch of {} files. Timeout: {}".format(
+                str(len(creators)), str(cmd.get_timeout()))
+        )
+        with timer("ldr_fits_seconds", mode="batch"):
+            cmd.run_command()
+        inc("ldr_fits_files_total", len(creators), mode="batch")
+
+        cmd_data = cmd.get_data()
+
+        results = []
+        for c, (name, original_holder) in zip(creators, holders):
+            # FITS names its output after the input file
+            fits_file_path = join(out_dir, name + ".fits.xml")
+            if isfile(fits_file_path):
+                success = True
+            else:
+                success = False
+                log.warn("FITS creation failed on {}".format(
+                    c.get_source_materialsuite().identifier)
+                )
+            results.append((cmd_data, success, fits_file_path,
+                            original_holder))
+        return results
+
+    @log_aware(log)
+    def apply(self, run_result):
+        """
+        Record the outcome of run() in the MaterialSuite's PREMIS
+
+        __Args__
+
+        1. run_result (tuple): The return value of run()
+        """
+        cmd_data, success, fits_file_path, original_holder = run_result
         self.handle_premis(cmd_data, self.get_source_materialsuite(),
                            "FITs", success, "fitsRecord", fits_file_path)
         log.debug("Cleaning up temporary file instantiation")
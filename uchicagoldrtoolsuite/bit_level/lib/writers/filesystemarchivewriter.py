@@ -1,6 +1,7 @@
 from json import dump
 from os import makedirs
 from os.path import exists, join
+from time import monotonic
 from logging import getLogger
 
 from pypairtree.utils import identifier_to_path
@@ -11,10 +12,13 @@ from uchicagoldrtoolsuite.core.lib.convenience import iso8601_dt
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success
 from uchicagoldrtoolsuite.core.lib.doi import DOI
+from uchicagoldrtoolsuite.core.lib.metrics import observe
 from .filesystemmaterialsuitewriter import FileSystemMaterialSuiteWriter
 from ..ldritems.ldrpath import LDRPath
 from ..ldritems.ldritemcopier import LDRItemCopier
-from ..ldritems.ldritemoperations import hash_ldritem
+from ..ldritems.ldritemoperations import hash_ldritem_multi
+from ..misc.materialsuiteindex import MaterialSuiteIndex, \
+    index_path_for_pairtree_root
 from .abc.archiveserializationwriter import ArchiveSerializationWriter
 
 
@@ -118,8 +122,14 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
         log.info("Writing required subdirs for an Archive serialization.")
         admin_dir_path = join(ark_path, "admin")
         pairtree_root = join(ark_path, "pairtree_root")
+        new_pairtree = not exists(pairtree_root)
         makedirs(pairtree_root, exist_ok=True)
         self._write_pairtree_namaste_tag(pairtree_root)
+        if new_pairtree:
+            log.debug("Starting MaterialSuite index")
+            MaterialSuiteIndex(
+                index_path_for_pairtree_root(pairtree_root)
+            ).create()
         accession_records_dir_path = join(admin_dir_path, "accession_records")
         adminnotes_dir_path = join(admin_dir_path, "adminnotes")
         legalnotes_dir_path = join(admin_dir_path, "legalnotes")
@@ -154,7 +164,10 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
         log.info("Writing adminnotes")
         if self.get_struct().adminnote_list:
             for x in self.get_struct().adminnote_list:
-                dst_path = join(adminnotes_dir_path, hash_ldritem(x, algo="crc32"))
+                # One read gets the name and the manifest digests - the copy
+                # is audited byte for byte, so these hold for the dst too
+                digests = hash_ldritem_multi(x, ['crc32', 'md5', 'sha256'])
+                dst_path = join(adminnotes_dir_path, digests['crc32'])
                 manifest_dict = {
                     'origin': x.item_name,
                     'acc_id': self.get_struct().identifier,
@@ -166,8 +179,8 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
                 if not cr['src_eqs_dst']:
                     raise ValueError("Bad admin note write!")
                 manifest_dict['copy_report'] = cr
-                manifest_dict['md5'] = hash_ldritem(dst_item, algo='md5')
-                manifest_dict['sha256'] = hash_ldritem(dst_item, algo='sha256')
+                manifest_dict['md5'] = digests['md5']
+                manifest_dict['sha256'] = digests['sha256']
                 admin_manifest.append(manifest_dict)
 
     @log_aware(log)
@@ -175,7 +188,8 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
         log.info("Writing legalnotes")
         if self.get_struct().legalnote_list:
             for x in self.get_struct().legalnote_list:
-                dst_path = join(legalnotes_dir_path, hash_ldritem(x, algo="crc32"))
+                digests = hash_ldritem_multi(x, ['crc32', 'md5', 'sha256'])
+                dst_path = join(legalnotes_dir_path, digests['crc32'])
                 manifest_dict = {
                     'origin': x.item_name,
                     'acc_id': self.get_struct().identifier,
@@ -187,8 +201,8 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
                 if not cr['src_eqs_dst']:
                     raise ValueError("Bad legal note write!")
                 manifest_dict['copy_report'] = cr
-                manifest_dict['md5'] = hash_ldritem(dst_item, algo='md5')
-                manifest_dict['sha256'] = hash_ldritem(dst_item, algo='sha256')
+                manifest_dict['md5'] = digests['md5']
+                manifest_dict['sha256'] = digests['sha256']
                 admin_manifest.append(manifest_dict)
 
     @log_aware(log)
@@ -196,7 +210,8 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
                                 admin_manifest):
         log.info("Writing accession records")
         for x in self.get_struct().accessionrecord_list:
-            dst_path = join(accessionrecords_dir_path, hash_ldritem(x, algo="crc32"))
+            digests = hash_ldritem_multi(x, ['crc32', 'md5', 'sha256'])
+            dst_path = join(accessionrecords_dir_path, digests['crc32'])
             manifest_dict = {
                 'origin': x.item_name,
                 'acc_id': self.get_struct().identifier,
@@ -208,8 +223,8 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
             if not cr['src_eqs_dst']:
                 raise ValueError("Bad accession record write!")
             manifest_dict['copy_report'] = cr
-            manifest_dict['md5'] = hash_ldritem(dst_item, algo='md5')
-            manifest_dict['sha256'] = hash_ldritem(dst_item, algo='sha256')
+            manifest_dict['md5'] = digests['md5']
+            manifest_dict['sha256'] = digests['sha256']
             admin_manifest.append(manifest_dict)
 
     @log_aware(log)
@@ -234,6 +249,7 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
         write the archive to disk at the specified location
         """
         log.info("Writing Archive")
+        start = monotonic()
 
         ark_path = self._write_ark_dir()
         admin_dir_path, pairtree_root, accession_records_dir_path, \
@@ -248,6 +264,7 @@ class FileSystemArchiveWriter(ArchiveSerializationWriter):
         self._write_accessionrecords(accession_records_dir_path, admin_manifest)
         self._write_admin_manifest(admin_manifest, admin_dir_path)
         self._write_WRITE_FINISHED(admin_dir_path)
+        observe("ldr_archive_write_seconds", monotonic() - start)
         log.info("Archive written")
 
     @log_aware(log)
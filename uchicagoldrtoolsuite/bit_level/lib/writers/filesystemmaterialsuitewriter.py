@@ -1,16 +1,21 @@
 from logging import getLogger
+from os import stat
 from pathlib import Path
+from time import monotonic
 
-from pypremis.lib import PremisRecord
 from pypairtree.utils import identifier_to_path
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success, makedirs
+from uchicagoldrtoolsuite.core.lib.metrics import inc, observe
 from .abc.materialsuiteserializationwriter import \
     MaterialSuiteSerializationWriter
 from ..ldritems.ldrpath import LDRPath
 from ..ldritems.ldritemcopier import LDRItemCopier
+from ..ldritems.ldritemoperations import hash_ldritem_multi
+from ..misc.materialsuiteindex import MaterialSuiteIndex, \
+    index_path_for_pairtree_root
 
 
 __author__ = "Brian Balsamo"
@@ -49,6 +54,11 @@ class FileSystemMaterialSuiteWriter(MaterialSuiteSerializationWriter):
         * update_content_location (bool): Whether or not to update the content
             location in the PREMIS record
         * clobber (bool): Whether or not be willing to clobber on writes.
+        * verify (str): How the copiers should audit the bytestreams they
+            write, see LDRItemCopier for supported schemes.
+        * index_path (str): The MaterialSuiteIndex to record the write in.
+            Defaults to the index alongside aRoot. Writes are only recorded
+            if the index already exists, see MaterialSuiteIndex.
         """
         log_init_attempt(self, log, locals())
         encapsulation = kwargs.get('encapsulation')
@@ -62,18 +72,65 @@ class FileSystemMaterialSuiteWriter(MaterialSuiteSerializationWriter):
         premis_event = kwargs.get('premis_event')
         update_content_location = kwargs.get('update_content_location', False)
         clobber = kwargs.get('clobber', True)
+        verify = kwargs.get('verify', 'bytes')
+        index_path = kwargs.get('index_path')
         super().__init__(
             aStructure, aRoot, update_content_location=update_content_location,
             premis_event=premis_event, eq_detect=eq_detect
         )
-        self.materialsuite_root = Path(
-            identifier_to_path(self.struct.identifier, root=self.root),
-            encapsulation
+        self.materialsuite_root = self.compute_materialsuite_root(
+            self.struct.identifier, self.root, encapsulation
         )
         self.set_implementation("filesystem (pairtree)")
         self.clobber = clobber
+        self.verify = verify
+        if index_path is None:
+            index_path = index_path_for_pairtree_root(self.root)
+        self.index = MaterialSuiteIndex(index_path)
         log_init_success(self, log)
 
+    @staticmethod
+    @log_aware(log)
+    def compute_materialsuite_root(identifier, root, encapsulation):
+        """
+        Compute where a MaterialSuite will be serialized, without having
+        to have the MaterialSuite in hand
+
+        __Args__
+
+        1. identifier (str): The MaterialSuite identifier
+        2. root (str): The path to the materialsuite root dir
+        3. encapsulation (str): The pairtree encapsulation
+
+        __Returns__
+
+        * (pathlib.Path): The path to the MaterialSuite's directory. Its
+            content will be written to content.file and its PREMIS to
+            premis.xml in this directory.
+        """
+        return Path(identifier_to_path(identifier, root=root), encapsulation)
+
+    @log_aware(log)
+    def _content_in_place(self, target_content_path):
+        """
+        Determine if the content of the structure already lives at its target
+        location (eg, it was copied there directly on ingest)
+
+        __Args__
+
+        1. target_content_path (pathlib.Path): Where the content goes
+
+        __Returns__
+
+        * (bool): True if the content is already in place
+        """
+        if not isinstance(self.struct.content, LDRPath):
+            return False
+        if not target_content_path.exists():
+            return False
+        return Path(self.struct.content.path).resolve() == \
+            target_content_path.resolve()
+
     @log_aware(log)
     def _write_skeleton(self):
         log.info("Writing required dirs/subdirs for a "
@@ -91,6 +148,11 @@ class FileSystemMaterialSuiteWriter(MaterialSuiteSerializationWriter):
         Serialize the material suite to the provided location
         """
         log.info("Writing MaterialSuite")
+        start = monotonic()
+        indexing = self.index.exists()
+        if indexing:
+            # Marks the index stale until the write is recorded as finished
+            self.index.begin(self.struct.identifier)
         self._write_skeleton()
         log.debug("Constructing target paths")
         target_content_path = Path(self.materialsuite_root, 'content.file')
@@ -98,18 +160,43 @@ class FileSystemMaterialSuiteWriter(MaterialSuiteSerializationWriter):
         target_premis_path = Path(self.materialsuite_root, 'premis.xml')
         target_premis_item = LDRPath(str(target_premis_path))
 
-        premis_copier = LDRItemCopier(self.struct.premis, target_premis_item,
-                                      clobber=self.clobber,
-                                      eq_detect=self.eq_detect)
+        # If the PREMIS has to be edited, or the MaterialSuite is holding
+        # edits to it that haven't been written back yet, the parsed record
+        # gets serialized straight to its destination. Otherwise the bytes
+        # are just copied.
+        serialize_premis = bool(self.premis_event or
+                                self.update_content_location or
+                                self.struct.premis_record_dirty)
+        premis_copier = None
+        if not serialize_premis:
+            premis_copier = LDRItemCopier(self.struct.premis,
+                                          target_premis_item,
+                                          clobber=self.clobber,
+                                          eq_detect=self.eq_detect,
+                                          verify=self.verify)
         content_copier = None
-        if self.struct.content is not None:
-            content_copier = LDRItemCopier(self.struct.content,
-                                           target_content_item,
-                                           clobber=self.clobber,
-                                           eq_detect=self.eq_detect)
+        content_cr = None
+        if self.struct.content is not None and \
+                self._content_in_place(target_content_path):
+            # Copying a file onto itself is at best a very expensive no-op
+            log.debug("Content already in place, not copying it")
+            content_cr = LDRItemCopier(
+                self.struct.content, target_content_item,
+                clobber=self.clobber, eq_detect=self.eq_detect,
+                verify=self.verify
+            ).build_report_dict(copied=False, dst_existed=True,
+                                clobbered_dst=False, src_eqs_dst=True)
+        elif self.struct.content is not None:
+            # No digest_algos, even when indexing - hashing on the way
+            # through would rule out a kernel copy, and the index can
+            # usually get its digest from the PREMIS instead
+            content_copier = LDRItemCopier(
+                self.struct.content, target_content_item,
+                clobber=self.clobber, eq_detect=self.eq_detect,
+                verify=self.verify
+            )
 
         log.debug("Copying MaterialSuite bytestreams to disk")
-        content_cr = None
         for x in [premis_copier, content_copier]:
             if x is not None:
                 cr = x.copy()
@@ -118,9 +205,14 @@ class FileSystemMaterialSuiteWriter(MaterialSuiteSerializationWriter):
                 if x == content_copier:
                     content_cr = cr
 
-        if self.premis_event or self.update_content_location:
+        if serialize_premis:
+            if target_premis_path.exists() and not self.clobber:
+                raise ValueError(
+                    "Won't clobber existing PREMIS @ {}".format(
+                        str(target_premis_path))
+                )
             log.debug("Editing PREMIS")
-            premis = PremisRecord(frompath=str(target_premis_path))
+            premis = self.struct.premis_record
             if self.update_content_location:
                 self.content_location_update(premis, str(target_content_path))
             if self.premis_event:
@@ -128,6 +220,76 @@ class FileSystemMaterialSuiteWriter(MaterialSuiteSerializationWriter):
                     premis, self.premis_event,
                     eventOutcomeDetailNote=content_cr
                 )
-            premis.write_to_file(str(target_premis_path))
+            # This also points the MaterialSuite at the written PREMIS, so it
+            # and its parsed record stay in agreement
+            self.struct.flush_premis_record(str(target_premis_path))
 
+        if indexing:
+            self._write_index_record(target_premis_path, target_content_path,
+                                     content_copier)
+
+        observe("ldr_materialsuite_write_seconds", monotonic() - start)
+        inc("ldr_materialsuites_written_total")
         log.info("MaterialSuite written")
+
+    @log_aware(log)
+    def _known_content_digest(self, algo, content_copier):
+        """
+        Find a digest of the content which has already been computed, so it
+        needn't be read again
+
+        The copier's digests come first (eg, if it verified with algo). Then
+        the PREMIS fixity, which describes the src that the written content
+        was audited against.
+
+        __Args__
+
+        1. algo (str): The algo of the digest
+        2. content_copier (LDRItemCopier): The copier which wrote the
+            content, or None if it was already in place
+
+        __Returns__
+
+        * (str/None): The hexdigest, or None if there isn't one
+        """
+        if content_copier is not None and \
+                content_copier.src_digests is not None and \
+                algo in content_copier.src_digests:
+            return content_copier.src_digests[algo]
+        if self.struct.premis is None:
+            return None
+        try:
+            obj = self.struct.premis_record.get_object_list()[0]
+            for characteristics in obj.get_objectCharacteristics():
+                for fixity in characteristics.get_fixity():
+                    if fixity.get_messageDigestAlgorithm() == algo:
+                        return fixity.get_messageDigest()
+        except Exception as e:
+            log.warn("Couldn't read the content's fixity from the " +
+                     "PREMIS of {}: {}".format(self.struct.identifier, str(e)))
+        return None
+
+    @log_aware(log)
+    def _write_index_record(self, target_premis_path, target_content_path,
+                            content_copier):
+        log.debug("Recording MaterialSuite in the index")
+        content = None
+        content_size = None
+        fixity = None
+        if self.struct.content is not None:
+            algo = self.index.fixity_algo
+            fixity = {algo: self._known_content_digest(algo, content_copier)}
+            if fixity[algo] is None:
+                log.debug("No known {} of the content, hashing it".format(
+                    algo))
+                fixity = hash_ldritem_multi(
+                    LDRPath(str(target_content_path)), [algo]
+                )
+            content = str(target_content_path.relative_to(self.root))
+            content_size = stat(str(target_content_path)).st_size
+        self.index.append(
+            self.struct.identifier,
+            str(target_premis_path.relative_to(self.root)),
+            stat(str(target_premis_path)).st_size,
+            content=content, content_size=content_size, fixity=fixity
+        )
@@ -1,14 +1,18 @@
 from logging import getLogger
 from pathlib import Path
 from uuid import uuid4
+from time import monotonic
 
 from uchicagoldrtoolsuite import log_aware
 from uchicagoldrtoolsuite.core.lib.convenience import log_init_attempt, \
     log_init_success, makedirs
+from uchicagoldrtoolsuite.core.lib.metrics import observe
 from .abc.stageserializationwriter import StageSerializationWriter
 from .filesystemmaterialsuitewriter import FileSystemMaterialSuiteWriter
 from ..ldritems.ldrpath import LDRPath
 from ..ldritems.ldritemcopier import LDRItemCopier
+from ..misc.materialsuiteindex import MaterialSuiteIndex, \
+    index_path_for_pairtree_root
 
 
 __author__ = "Brian Balsamo"
@@ -80,6 +84,9 @@ class FileSystemStageWriter(StageSerializationWriter):
         for x in ['accessionrecords', 'adminnotes', 'legalnotes']:
             required_dirs.append(Path(self.stage_root, 'admin', x))
 
+        pairtree_root = Path(self.stage_root, 'pairtree_root')
+        new_pairtree = not pairtree_root.exists()
+
         for x in required_dirs:
             if x.exists() and not x.is_dir():
                 raise RuntimeError("Stage writer can't clobber a file " +
@@ -87,6 +94,14 @@ class FileSystemStageWriter(StageSerializationWriter):
                                    "{}".format(str(x)))
             makedirs(str(x))
 
+        # A stage which predates its index can't have one, it would be
+        # missing whatever was already in the pairtree
+        if new_pairtree:
+            log.debug("Starting MaterialSuite index")
+            MaterialSuiteIndex(
+                index_path_for_pairtree_root(str(pairtree_root))
+            ).create()
+
     @log_aware(log)
     def _write_accessionrecords(self):
         log.info("Writing accession records")
@@ -147,6 +162,7 @@ class FileSystemStageWriter(StageSerializationWriter):
         Serialize the stage to the provided location
         """
         log.info("Writing stage")
+        start = monotonic()
         self._build_skeleton()
         self._write_accessionrecords()
         self._write_adminnotes()
@@ -157,6 +173,7 @@ class FileSystemStageWriter(StageSerializationWriter):
                 x, str(Path(self.stage_root, 'pairtree_root')),
                 **self.materialsuite_serializer_kwargs)
             materialsuite_serializer.write()
+        observe("ldr_stage_write_seconds", monotonic() - start)
         log.info("Stage written")
 
     @log_aware(log)
@@ -4,10 +4,14 @@ from os.path import isabs, join, isdir, isfile, exists, split, expanduser, \
     expandvars
 from os import makedirs
 from abc import ABCMeta
+from atexit import register
+from json import dumps
 from logging import getLogger
 
 from uchicagoldrtoolsuite import activate_master_log_file, \
     activate_job_log_file, activate_stdout_log, log_aware
+from uchicagoldrtoolsuite.core.lib.fixitycache import activate_fixity_cache
+from uchicagoldrtoolsuite.core.lib.metrics import get_metrics_registry
 from .abc.app import App
 
 
@@ -101,6 +105,28 @@ class CLIApp(App, metaclass=ABCMeta):
             help="Specify the maximum number of backups logs. Default: 4",
             default=4
         )
+        parser.add_argument(
+            '--fixity_cache',
+            help="Specify the path to a fixity cache database. If provided " +
+            "digests of files which haven't changed since they were last " +
+            "hashed are read from the cache rather than recomputed.",
+            default=None
+        )
+        parser.add_argument(
+            '--metrics_json',
+            help="Specify a path to write a JSON summary of the run's " +
+            "metrics (bytes copied, hash throughput, PREMIS, converter " +
+            "and FITS timings, etc) to when the run finishes. The summary " +
+            "is always logged at INFO.",
+            default=None
+        )
+        parser.add_argument(
+            '--metrics_textfile',
+            help="Specify a path to write the run's metrics to, in the " +
+            "Prometheus text format, when the run finishes. Point it into " +
+            "node_exporter's textfile collector directory.",
+            default=None
+        )
         self.parser = parser
 
     @log_aware(log)
@@ -132,6 +158,39 @@ class CLIApp(App, metaclass=ABCMeta):
                                   verbosity=args.disk_log_verbosity)
         if args.stdout_log_verbosity is not "DISABLE":
             activate_stdout_log(verbosity=args.stdout_log_verbosity)
+        if args.fixity_cache:
+            activate_fixity_cache(self.expand_path(args.fixity_cache))
+        # Registered after the logs are activated, so it runs before they
+        # are shut down
+        register(
+            self.export_metrics,
+            json_path=self.expand_path(args.metrics_json)
+            if args.metrics_json else None,
+            textfile_path=self.expand_path(args.metrics_textfile)
+            if args.metrics_textfile else None
+        )
+
+    @log_aware(log)
+    def export_metrics(self, json_path=None, textfile_path=None):
+        """
+        Log the summary of this process' metrics, and optionally write them
+        out. Called at exit by apps which process_universal_args().
+
+        __KWArgs__
+
+        * json_path (str): Where to write the JSON summary
+        * textfile_path (str): Where to write the Prometheus textfile
+        """
+        registry = get_metrics_registry()
+        try:
+            log.info("Run metrics: {}".format(
+                dumps(registry.summary(), sort_keys=True)))
+            if json_path is not None:
+                registry.write_json(json_path)
+            if textfile_path is not None:
+                registry.write_prometheus_textfile(textfile_path)
+        except OSError as e:
+            log.warn("Couldn't export the run's metrics: {}".format(str(e)))
 
     @staticmethod
     def expand_path(p):
@@ -3,7 +3,7 @@ from shutil import copyfile
 
 from xdg import BaseDirectory
 
-from ..lib.convenience import retrieve_resource_filepath
+from uchicagoldrtoolsuite import retrieve_resource_filepath
 from .abc.cliapp import CLIApp
 
 
@@ -77,7 +77,7 @@ class PostInstall(CLIApp):
             self.stderrp('Invalid conf file location specified')
             exit()
         assert(self.create_path('file', conf_file))
-        copyfile(retrieve_resource_filepath('configs/ldr.ini', conf_file))
+        copyfile(retrieve_resource_filepath('configs/ldr.ini'), conf_file)
         print('For ease of editability we can provide you with user editable ' +
               'copies of the controlled vocabularies used by the ldr ' +
               'tool suite.')
@@ -2,11 +2,17 @@ from sys import stderr
 from codecs import encode
 from tempfile import TemporaryDirectory
 from os.path import join
-from os import scandir
+from os import scandir, stat
 from os import makedirs as _makedirs
-from logging import getLogger
+from logging import getLogger, DEBUG
 from pathlib import Path
 from uuid import uuid4
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import monotonic
+
+from .metrics import inc, observe, timer
 
 
 __author__ = "Brian Balsamo, Tyler Danstrom"
@@ -38,11 +44,139 @@ def makedirs(path):
     _makedirs(str(p), exist_ok=True)
 
 
-def recursive_scandir(path="."):
-    for x in scandir(path):
+def _walk_serial(path, should_descend):
+    # List the whole directory before recursing, so a deep tree doesn't hold
+    # a file descriptor open per level
+    with scandir(path) as it:
+        entries = list(it)
+    for x in entries:
         yield x
-        if x.is_dir():
-            yield from recursive_scandir(x.path)
+        if should_descend(x):
+            yield from _walk_serial(x.path, should_descend)
+
+
+def _list_dir(path):
+    with scandir(path) as it:
+        return list(it)
+
+
+def walk_scandir(path=".", descend=None, follow_symlinks=False, workers=1):
+    """
+    Walk a directory tree, yielding a DirEntry for everything in it
+
+    DirEntry objects cache what the OS told us when the directory was
+    listed (and their stat() results once called) so consumers should
+    prefer their is_dir()/is_file()/stat() to re-stat'ing the paths.
+
+    With more than one worker, directories are listed concurrently by a
+    pool of threads, which hides the per-directory round trip latency of
+    network file systems. In that case entries are yielded in the order
+    their directory listings complete - a directory is always yielded before
+    anything in it, but the walk is not depth first.
+
+    __KWArgs__
+
+    * path (str): The directory to walk
+    * descend (callable): If provided, called with each directory's DirEntry,
+        only directories for which it returns True are descended into.
+        Directories are yielded regardless.
+    * follow_symlinks (bool): Whether or not to descend into symlinks to
+        directories. If True, directories already walked are skipped, so
+        symlink loops terminate.
+    * workers (int): How many directories to list at once
+
+    __Returns__
+
+    * (generator): DirEntry objects for everything in the tree
+    """
+    seen = set()
+    if follow_symlinks:
+        st = stat(path)
+        seen.add((st.st_dev, st.st_ino))
+
+    def should_descend(x):
+        if not x.is_dir(follow_symlinks=follow_symlinks):
+            return False
+        if descend is not None and not descend(x):
+            return False
+        if follow_symlinks:
+            st = x.stat()
+            if (st.st_dev, st.st_ino) in seen:
+                log.warn("Not re-walking {}, already seen".format(x.path))
+                return False
+            seen.add((st.st_dev, st.st_ino))
+        return True
+
+    if workers <= 1:
+        yield from _walk_serial(path, should_descend)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = set()
+    try:
+        pending.add(pool.submit(_list_dir, path))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                for x in f.result():
+                    # Queue the listing before handing the entry back, so
+                    # the pool keeps working while the consumer does
+                    if should_descend(x):
+                        pending.add(pool.submit(_list_dir, x.path))
+                    yield x
+    finally:
+        for f in pending:
+            f.cancel()
+        pool.shutdown(wait=False)
+
+
+def recursive_scandir(path=".", descend=None):
+    """
+    Recursively scandir a directory, depth first, following symlinks
+
+    See walk_scandir() for a version with more options.
+
+    __KWArgs__
+
+    * path (str): The directory to scan
+    * descend (callable): If provided, called with each directory's DirEntry,
+        only directories for which it returns True are descended into.
+        Directories are yielded regardless.
+
+    __Returns__
+
+    * (generator): DirEntry objects for everything in the tree
+    """
+    yield from walk_scandir(path, descend=descend, follow_symlinks=True)
+
+
+def iter_pairtree_encapsulations(path, encapsulation, workers=1):
+    """
+    Lazily find the object encapsulation directories in a pairtree
+
+    Unlike filtering recursive_scandir() this never descends into an
+    encapsulation directory, and never stats regular files, so the cost of
+    a walk scales with the number of objects rather than the number of
+    files in the tree.
+
+    __Args__
+
+    1. path (str): The path to the pairtree_root
+    2. encapsulation (str): The name of the encapsulation directories
+
+    __KWArgs__
+
+    * workers (int): How many directories to list at once, see
+        walk_scandir()
+
+    __Returns__
+
+    * (generator): The paths of the encapsulation directories
+    """
+    for x in walk_scandir(path, descend=lambda x: x.name != encapsulation,
+                          workers=workers):
+        if x.name == encapsulation and x.is_dir(follow_symlinks=False):
+            yield x.path
 
 
 class TemporaryFilePath:
@@ -82,19 +216,56 @@ class TemporaryFilePath:
         del self.containing_dir
 
 
+@contextmanager
+def ldritem_parser_source(item, as_file=False):
+    """
+    Present an LDRItem in a form that parsers which accept either a path or
+    a file like object (ElementTree, PremisRecord, etc) can consume directly,
+    without copying it anywhere first
+
+    eg:
+
+    with ldritem_parser_source(item) as src:
+        tree = ElementTree.parse(src)
+
+    __Args__
+
+    1. item (LDRItem): The item to parse
+
+    __KWArgs__
+
+    * as_file (bool): For parsers which only take file like objects - if
+        the item is backed by a file open that directly rather than
+        providing its path
+
+    __Returns__
+
+    * (str/file/LDRItem): The path of the file backing the item if it has
+        one (or that file, opened, if as_file is True), otherwise the item
+        itself, opened for reading
+    """
+    fspath = item.fspath
+    if fspath is not None and not as_file:
+        yield fspath
+    elif fspath is not None:
+        with open(fspath, 'rb') as src:
+            yield src
+    else:
+        with item.open('rb') as src:
+            yield src
+
+
 def ldritem_to_premisrecord(item):
     from pypremis.lib import PremisRecord
-    with TemporaryFilePath() as dst_path:
-        with item.open() as src:
-            with open(dst_path, 'wb') as dst:
-                dst.write(src.read())
-        r = PremisRecord(frompath=dst_path)
+    with timer("ldr_premis_parse_seconds"):
+        with ldritem_parser_source(item) as src:
+            r = PremisRecord(frompath=src)
     return r
 
 
 def is_presform_materialsuite(ms):
     try:
-        p = ldritem_to_premisrecord(ms.premis)
+        p = ms.premis_record
         obj = p.get_object_list()[0]
         relations = obj.get_relationship()
         for relation in relations:
@@ -248,6 +419,45 @@ def iso8601_dt(dt=None, tz=None):
     return dt.isoformat()
 
 
+def new_hasher(hash_algo):
+    """
+    spawn a fresh hasher instance for a supported algo
+
+    __Args__
+
+    1. hash_algo (str): an algo with an implementation hooked
+        - md5
+        - sha256
+        - crc32
+        - adler32
+
+    __Returns__
+
+    * (hasher): An object exposing .update() and .hexdigest()
+    """
+    # Map each algo to the module that implements it, so we only pay for
+    # importing the modules we actually need
+    supported_algos = {
+        'md5': 'hashlib',
+        'sha256': 'hashlib',
+        'crc32': 'nothashes',
+        'adler32': 'nothashes'
+    }
+
+    module_name = supported_algos.get(hash_algo, None)
+
+    if module_name is None:
+        raise NotImplementedError(
+            'Unsupported hashing algo ({}) passed to sane_hash! '.format(
+                hash_algo) +
+            'Hashing algos supported are: {}'.format(
+                str(list(supported_algos.keys())))
+        )
+
+    from importlib import import_module
+    return getattr(import_module(module_name), hash_algo)()
+
+
 def sane_hash(hash_algo, flo, buf=65536):
     """
     compute a hash hexdigest without loading giant things into RAM
@@ -267,26 +477,9 @@ def sane_hash(hash_algo, flo, buf=65536):
 
     * (str): The hexdigest of the specified hashing algo on the file
     """
-    from hashlib import md5, sha256
-    from nothashes import crc32, adler32
-
-    supported_algos = {
-        'md5': md5,
-        'sha256': sha256,
-        'crc32': crc32,
-        'adler32': adler32
-    }
-
-    hash_cls = supported_algos.get(hash_algo, None)
-
-    if hash_cls is None:
-        raise NotImplemented(
-            'Unsupported hashing algo ({}) passed to sane_hash!'.format(
-                hash_algo) +
-            'Hashing algos supported are: '.format(str(supported_algos.keys()))
-        )
-
-    hasher = hash_cls()
+    hasher = new_hasher(hash_algo)
+    start = monotonic()
+    hashed = 0
     while True:
         try:
             data = flo.read(buf)
@@ -297,10 +490,72 @@ def sane_hash(hash_algo, flo, buf=65536):
         if not data:
             break
         hasher.update(data)
+        hashed += len(data)
+    observe("ldr_hash_seconds", monotonic() - start, algo=hash_algo)
+    inc("ldr_hash_bytes_total", hashed, algo=hash_algo)
     return hasher.hexdigest()
 
 
+def sane_multi_hash(hash_algos, flo, buf=65536, threaded=False):
+    """
+    compute several hash hexdigests from a single pass over a file like object
+
+    Every block read from the flo is fed to every requested hasher, so the
+    underlying stream is only read once no matter how many algos are asked
+    for.
+
+    __Args__
+
+    1. hash_algos ([str]): algos with implementations hooked, see new_hasher()
+    2. flo (bytes io): a file like object to draw bytes from
+
+    __KWArgs__
+
+    * buf (int): How many bytes to load into RAM at once
+    * threaded (bool): If True feed each block to the hashers in a thread
+        pool (one thread per algo), reading the next block while the current
+        one is being hashed. hashlib and zlib release the GIL while working
+        on large blocks, so this can keep more than one core busy.
+
+    __Returns__
+
+    * (dict): A dictionary mapping each algo to its hexdigest of the stream
+    """
+    hashers = OrderedDict((x, new_hasher(x)) for x in hash_algos)
+    start = monotonic()
+    hashed = 0
+    if threaded and len(hashers) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(hashers)) as pool:
+            data = flo.read(buf)
+            while data:
+                hashed += len(data)
+                futures = [pool.submit(x.update, data) for x in
+                           hashers.values()]
+                data = flo.read(buf)
+                for x in futures:
+                    x.result()
+    else:
+        data = flo.read(buf)
+        while data:
+            hashed += len(data)
+            for x in hashers.values():
+                x.update(data)
+            data = flo.read(buf)
+    # The algos share a single pass over the stream, so they're credited
+    # with its full duration - their throughputs aren't independent
+    elapsed = monotonic() - start
+    for x in hashers:
+        observe("ldr_hash_seconds", elapsed, algo=x)
+        inc("ldr_hash_bytes_total", hashed, algo=x)
+    return OrderedDict((k, v.hexdigest()) for k, v in hashers.items())
+
+
 def log_init_attempt(inst, log, _locals=None):
+    # Nothing to do if the messages would never be emitted - and stringifying
+    # the locals can be expensive
+    if not log.isEnabledFor(DEBUG):
+        return
 
     def log_with_locals(inst, log, loc):
         if "self" in _locals:
@@ -337,6 +592,8 @@ def log_init_attempt(inst, log, _locals=None):
 
 
 def log_init_success(inst, log, log_repr=True):
+    if not log.isEnabledFor(DEBUG):
+        return
 
     def _log_repr(inst, log):
         log.debug(
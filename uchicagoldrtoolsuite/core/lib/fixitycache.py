@@ -0,0 +1,193 @@
+from os import getpid
+from threading import local, Lock
+from sqlite3 import connect
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+from .convenience import log_init_attempt, log_init_success
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+# The cache which is currently in use, if any. Caching is opt-in, nothing is
+# cached until activate_fixity_cache() is called.
+_active_cache = None
+
+
+@log_aware(log)
+def activate_fixity_cache(path):
+    """
+    Start consulting (and populating) an on disk fixity cache
+
+    __Args__
+
+    1. path (str): The path to the cache's SQLite database, which is
+        created if it doesn't exist
+
+    __Returns__
+
+    * (FixityCache): The activated cache
+    """
+    global _active_cache
+    _active_cache = FixityCache(path)
+    log.debug("Fixity cache activated @ {}".format(path))
+    return _active_cache
+
+
+@log_aware(log)
+def deactivate_fixity_cache():
+    """
+    Stop consulting the fixity cache, if one is active
+    """
+    global _active_cache
+    _active_cache = None
+
+
+@log_aware(log)
+def get_fixity_cache():
+    """
+    __Returns__
+
+    * (FixityCache/None): The active cache, or None if caching is off
+    """
+    return _active_cache
+
+
+class FixityCache(object):
+    """
+    A persistent store of digests keyed by file identity
+
+    Entries are keyed by (device, inode, algo) and record the size and
+    mtime_ns of the file when it was hashed. A lookup only hits if the
+    file still has that same size and mtime_ns - any other entry for the
+    file is stale, and is dropped. Re-running hashing heavy operations
+    over files which haven't changed then costs a stat() and a query
+    rather than a read of the file.
+
+    Connections are made per process and per thread, so a single instance
+    can be shared by thread pools and inherited by forked workers.
+    """
+    @log_aware(log)
+    def __init__(self, path, timeout=60):
+        """
+        Spawn a new cache
+
+        __Args__
+
+        1. path (str): The path to the SQLite database
+
+        __KWArgs__
+
+        * timeout (int): How many seconds to wait on other writers before
+            giving up on a query
+        """
+        log_init_attempt(self, log, locals())
+        self.path = path
+        self.timeout = timeout
+        self._local = local()
+        self._schema_lock = Lock()
+        # Connect up front, so a bad path fails here rather than mid-run
+        self._connection()
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<FixityCache {}>".format(self.path)
+
+    @log_aware(log)
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == getpid():
+            return conn
+        # Either this thread hasn't connected yet or this is a fresh process
+        # which inherited the connection of its parent, which isn't safe to
+        # use, so connect anew.
+        conn = connect(self.path, timeout=self.timeout)
+        with self._schema_lock:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fixity (" +
+                "dev INTEGER, ino INTEGER, size INTEGER, " +
+                "mtime_ns INTEGER, algo TEXT, digest TEXT, " +
+                "PRIMARY KEY (dev, ino, algo))"
+            )
+            conn.commit()
+        self._local.conn = conn
+        self._local.pid = getpid()
+        return conn
+
+    @log_aware(log)
+    def lookup(self, st, algos):
+        """
+        Retrieve the cached digests of a file
+
+        __Args__
+
+        1. st (os.stat_result): The stat of the file, taken now
+        2. algos ([str]): The algos to retrieve digests for
+
+        __Returns__
+
+        * (dict): algo -> hexdigest, for each algo with a fresh entry
+        """
+        conn = self._connection()
+        hits = {}
+        stale = []
+        for algo in algos:
+            row = conn.execute(
+                "SELECT size, mtime_ns, digest FROM fixity " +
+                "WHERE dev = ? AND ino = ? AND algo = ?",
+                (st.st_dev, st.st_ino, algo)
+            ).fetchone()
+            if row is None:
+                continue
+            if row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                hits[algo] = row[2]
+            else:
+                stale.append(algo)
+        if stale:
+            log.debug("Dropping stale fixity cache entries for {}/{}".format(
+                str(st.st_dev), str(st.st_ino)))
+            conn.executemany(
+                "DELETE FROM fixity WHERE dev = ? AND ino = ? AND algo = ?",
+                [(st.st_dev, st.st_ino, x) for x in stale]
+            )
+            conn.commit()
+        return hits
+
+    @log_aware(log)
+    def store(self, st, digests):
+        """
+        Record the digests of a file
+
+        __Args__
+
+        1. st (os.stat_result): The stat of the file, taken before it was
+            hashed
+        2. digests (dict): algo -> hexdigest
+        """
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO fixity VALUES (?, ?, ?, ?, ?, ?)",
+            [(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, k, v)
+             for k, v in digests.items()]
+        )
+        conn.commit()
+
+    @log_aware(log)
+    def clear(self):
+        """
+        Drop every entry in the cache
+        """
+        conn = self._connection()
+        conn.execute("DELETE FROM fixity")
+        conn.commit()
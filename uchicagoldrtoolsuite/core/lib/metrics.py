@@ -0,0 +1,393 @@
+from os import replace, getpid, makedirs, register_at_fork
+from os.path import dirname, abspath
+from threading import Lock
+from time import monotonic, time
+from contextlib import contextmanager
+from bisect import bisect_left
+from json import dumps
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+# Note: this module is imported by .convenience, so mustn't import from it
+
+# Upper bounds (in seconds) of the histogram buckets, from a quick hash of
+# a small file up to a FITS run or an office conversion on a large one
+DEFAULT_BUCKETS = (.001, .005, .01, .05, .1, .5, 1, 5, 10, 30, 60, 300)
+
+# (name of the rate, counter of bytes, histogram of the seconds spent
+# moving them) - reported per label set in summaries
+THROUGHPUTS = (
+    ("copy_bytes_per_second", "ldr_copy_bytes_total", "ldr_copy_seconds"),
+    ("hash_bytes_per_second", "ldr_hash_bytes_total", "ldr_hash_seconds")
+)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prometheus_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    ) + "}"
+
+
+class MetricsRegistry(object):
+    """
+    Counters and histograms describing where a run's time goes
+
+    Every metric is identified by a name and a (possibly empty) set of
+    labels, eg ldr_hash_seconds{algo="md5"}. Histograms track the count,
+    sum, min and max of what they've observed, as well as how many
+    observations fell into each of a fixed set of buckets.
+
+    A registry only sees what happens in its own process. Work done in
+    worker processes should be drain()ed there, shipped back with the
+    work's result and merge()d into the parent's registry.
+    """
+    @log_aware(log)
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Create a new, empty, registry
+
+        __KWArgs__
+
+        * buckets (tuple): The upper bounds of the histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started = monotonic()
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<MetricsRegistry {} counters, {} histograms>".format(
+            str(len(self._counters)), str(len(self._histograms)))
+
+    def inc(self, name, value=1, **labels):
+        """
+        Add to a counter
+
+        __Args__
+
+        1. name (str): The counter's name
+
+        __KWArgs__
+
+        * value (int/float): How much to add
+        * labels: The counter's labels
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Record an observation in a histogram
+
+        __Args__
+
+        1. name (str): The histogram's name
+        2. value (int/float): The observation
+
+        __KWArgs__
+
+        * labels: The histogram's labels
+        """
+        key = (name, _label_key(labels))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = [0, 0, value, value, [0] * (len(self.buckets) + 1)]
+                self._histograms[key] = h
+            h[0] += 1
+            h[1] += value
+            if value < h[2]:
+                h[2] = value
+            if value > h[3]:
+                h[3] = value
+            h[4][i] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observe how many seconds the body of a with statement takes,
+        whether or not it raises
+
+        __Args__
+
+        1. name (str): The histogram's name
+
+        __KWArgs__
+
+        * labels: The histogram's labels
+        """
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, monotonic() - start, **labels)
+
+    @log_aware(log)
+    def snapshot(self):
+        """
+        Get the registry's contents, in a form which can be pickled and
+        handed to merge()
+
+        __Returns__
+
+        * (dict): The counters and histograms
+        """
+        with self._lock:
+            return {
+                'buckets': self.buckets,
+                'counters': dict(self._counters),
+                'histograms': dict(
+                    (k, v[:4] + [list(v[4])])
+                    for k, v in self._histograms.items()
+                )
+            }
+
+    def _reset_after_fork(self):
+        # The lock may have been held by a thread which didn't survive the
+        # fork, so the child gets a fresh one
+        self._lock = Lock()
+        self.reset()
+
+    @log_aware(log)
+    def reset(self):
+        """
+        Empty the registry and restart its clock
+        """
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self.started = monotonic()
+
+    @log_aware(log)
+    def drain(self):
+        """
+        Get a snapshot() and empty the registry
+
+        __Returns__
+
+        * (dict): The counters and histograms
+        """
+        with self._lock:
+            s = {
+                'buckets': self.buckets,
+                'counters': self._counters,
+                'histograms': self._histograms
+            }
+            self._counters = {}
+            self._histograms = {}
+        return s
+
+    @log_aware(log)
+    def merge(self, snapshot):
+        """
+        Add the contents of a snapshot to the registry
+
+        __Args__
+
+        1. snapshot (dict): The return value of another registry's
+            snapshot() or drain()
+        """
+        if tuple(snapshot['buckets']) != self.buckets:
+            raise ValueError("Can't merge metrics with different buckets")
+        with self._lock:
+            for k, v in snapshot['counters'].items():
+                self._counters[k] = self._counters.get(k, 0) + v
+            for k, v in snapshot['histograms'].items():
+                h = self._histograms.get(k)
+                if h is None:
+                    self._histograms[k] = v[:4] + [list(v[4])]
+                    continue
+                h[0] += v[0]
+                h[1] += v[1]
+                h[2] = min(h[2], v[2])
+                h[3] = max(h[3], v[3])
+                h[4] = [x + y for x, y in zip(h[4], v[4])]
+
+    @log_aware(log)
+    def summary(self):
+        """
+        Summarize the registry for humans (and jq)
+
+        Counters are reported along with their rate over the registry's
+        lifetime (eg, files written per second), histograms with their mean,
+        and the byte counters with a matching timing histogram with the
+        throughput achieved while the bytes were actually being moved.
+
+        __Returns__
+
+        * (dict): A JSON serializable summary
+        """
+        s = self.snapshot()
+        elapsed = monotonic() - self.started
+        counters = []
+        for (name, key), value in sorted(s['counters'].items()):
+            counters.append({
+                'name': name,
+                'labels': dict(key),
+                'value': value,
+                'per_second': value / elapsed if elapsed else None
+            })
+        histograms = []
+        for (name, key), h in sorted(s['histograms'].items()):
+            histograms.append({
+                'name': name,
+                'labels': dict(key),
+                'count': h[0],
+                'sum': h[1],
+                'min': h[2],
+                'max': h[3],
+                'mean': h[1] / h[0]
+            })
+        throughputs = []
+        for rate, counter, histogram in THROUGHPUTS:
+            for (name, key), value in sorted(s['counters'].items()):
+                if name != counter:
+                    continue
+                h = s['histograms'].get((histogram, key))
+                if h is None or not h[1]:
+                    continue
+                throughputs.append({
+                    'name': rate,
+                    'labels': dict(key),
+                    'value': value / h[1]
+                })
+        return {
+            'pid': getpid(),
+            'timestamp': time(),
+            'elapsed_seconds': elapsed,
+            'counters': counters,
+            'histograms': histograms,
+            'throughputs': throughputs
+        }
+
+    @log_aware(log)
+    def prometheus_text(self):
+        """
+        Render the registry in the Prometheus text exposition format
+
+        __Returns__
+
+        * (str): The metrics
+        """
+        s = self.snapshot()
+        lines = []
+        seen = set()
+        for (name, key), value in sorted(s['counters'].items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append("# TYPE {} counter".format(name))
+            lines.append("{}{} {}".format(name, _prometheus_labels(key),
+                                          repr(value)))
+        for (name, key), h in sorted(s['histograms'].items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append("# TYPE {} histogram".format(name))
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), h[4]):
+                cumulative += n
+                lines.append("{}_bucket{} {}".format(
+                    name, _prometheus_labels(key, (("le", str(bound)),)),
+                    str(cumulative)))
+            lines.append("{}_sum{} {}".format(name, _prometheus_labels(key),
+                                              repr(h[1])))
+            lines.append("{}_count{} {}".format(name, _prometheus_labels(key),
+                                                str(h[0])))
+        return "\n".join(lines) + "\n"
+
+    @log_aware(log)
+    def write_json(self, path):
+        """
+        Write the summary() to a file
+
+        __Args__
+
+        1. path (str): Where to write the summary
+        """
+        _atomic_write(path, dumps(self.summary(), indent=4, sort_keys=True))
+
+    @log_aware(log)
+    def write_prometheus_textfile(self, path):
+        """
+        Write the registry to a file for node_exporter's textfile collector
+
+        The file is written beside its final location and then moved into
+        place, so the collector never reads a partial file.
+
+        __Args__
+
+        1. path (str): Where to write the metrics, should end in .prom
+        """
+        _atomic_write(path, self.prometheus_text())
+
+
+def _atomic_write(path, text):
+    path = abspath(path)
+    makedirs(dirname(path), exist_ok=True)
+    tmp_path = "{}.{}.tmp".format(path, str(getpid()))
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    replace(tmp_path, path)
+
+
+_registry = MetricsRegistry()
+# Forked workers start out with a copy of whatever their parent had recorded,
+# which would be counted twice once they drain() back to it
+register_at_fork(after_in_child=_registry._reset_after_fork)
+
+
+def get_metrics_registry():
+    """
+    Get this process' registry, which the rest of the suite records to
+
+    __Returns__
+
+    * (MetricsRegistry): The registry
+    """
+    return _registry
+
+
+def inc(name, value=1, **labels):
+    """
+    Add to a counter in this process' registry, see MetricsRegistry.inc()
+    """
+    _registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """
+    Record an observation in this process' registry, see
+    MetricsRegistry.observe()
+    """
+    _registry.observe(name, value, **labels)
+
+
+def timer(name, **labels):
+    """
+    Time a with statement into this process' registry, see
+    MetricsRegistry.timer()
+    """
+    return _registry.timer(name, **labels)
@@ -0,0 +1,172 @@
+from re import compile as re_compile, error as re_error, VERBOSE
+from logging import getLogger
+
+from uchicagoldrtoolsuite import log_aware
+from .convenience import log_init_attempt, log_init_success
+
+
+__author__ = "Brian Balsamo"
+__email__ = "balsamo@uchicago.edu"
+__company__ = "The University of Chicago Library"
+__copyright__ = "Copyright University of Chicago, 2016"
+__publication__ = ""
+__version__ = "0.0.1dev"
+
+
+log = getLogger(__name__)
+
+
+def _combinable(patt):
+    # Patterns with their own flags, or which refer back to their own groups
+    # (whose numbers shift once they're embedded in a larger pattern) have to
+    # be checked on their own
+    if patt.flags != re_compile("").flags:
+        return False
+    if "(?P=" in patt.pattern:
+        return False
+    for i, c in enumerate(patt.pattern[:-1]):
+        if c == "\\" and patt.pattern[i+1].isdigit():
+            return False
+    return True
+
+
+def _literal(src):
+    # True if src only matches itself: no anchors, lookarounds, groups,
+    # alternations, classes, quantifiers or escapes like \\b/\\Z which match
+    # something other than the escaped character
+    i = 0
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            if i + 1 >= len(src) or src[i+1].isalnum() or src[i+1] == "_":
+                return False
+            i += 2
+            continue
+        if c in ".^$*+?{}[]|()":
+            return False
+        i += 1
+    return True
+
+
+def _subtree_prefix(patt):
+    # If a pattern is "<prefix>.*" then any path under a dir that fullmatches
+    # <prefix> is matched by the pattern. Only plain literal prefixes are
+    # considered, anything else (eg, "docs/(?!keep)" or "tmp$") might not
+    # bind the way we'd like, and those patterns are left to match files
+    # one at a time.
+    src = patt.pattern
+    if not src.endswith(".*") or src.endswith("\\.*"):
+        return None
+    if patt.flags & VERBOSE:
+        return None
+    prefix = src[:-2]
+    if not prefix or not _literal(prefix):
+        return None
+    try:
+        return re_compile(prefix, patt.flags)
+    except re_error:
+        return None
+
+
+class PatternSet(object):
+    """
+    A set of regexes which are matched against strings (typically relative
+    paths) all at once
+
+    Rather than running each regex over every string, the patterns are
+    compiled into a single alternation, so a string which doesn't match
+    anything costs one regex evaluation. Only when something does match
+    are the patterns examined individually to report which one it was.
+
+    Patterns of the form "<prefix>.*" can additionally be used to prune
+    whole directories, see matches_subtree().
+    """
+    @log_aware(log)
+    def __init__(self, patterns=None):
+        """
+        Create a new PatternSet
+
+        __KWArgs__
+
+        * patterns ([str or re.regex]): The patterns in the set
+        """
+        log_init_attempt(self, log, locals())
+        self.patterns = []
+        if patterns is not None:
+            for x in patterns:
+                if isinstance(x, str):
+                    x = re_compile(x)
+                self.patterns.append(x)
+        combinable = [x for x in self.patterns if _combinable(x)]
+        self._solo = [x for x in self.patterns if not _combinable(x)]
+        self._combined = None
+        if combinable:
+            try:
+                self._combined = re_compile(
+                    "|".join("(?:{})".format(x.pattern) for x in combinable)
+                )
+            except re_error:
+                self._solo = self.patterns
+        self._subtree = [(x, _subtree_prefix(x)) for x in self.patterns
+                         if _subtree_prefix(x) is not None]
+        log_init_success(self, log)
+
+    @log_aware(log)
+    def __repr__(self):
+        return "<PatternSet {}>".format(
+            str([x.pattern for x in self.patterns]))
+
+    @log_aware(log)
+    def __bool__(self):
+        return bool(self.patterns)
+
+    @log_aware(log)
+    def __len__(self):
+        return len(self.patterns)
+
+    @log_aware(log)
+    def match(self, x):
+        """
+        Find which pattern, if any, fully matches a string
+
+        __Args__
+
+        1. x (str): The string to test
+
+        __Returns__
+
+        * (str/None): The first pattern (in the order the patterns were
+            given) which fullmatches the string, or None
+        """
+        if self._combined is not None and self._combined.fullmatch(x):
+            for patt in self.patterns:
+                if patt.fullmatch(x):
+                    return patt.pattern
+        for patt in self._solo:
+            if patt.fullmatch(x):
+                return patt.pattern
+        return None
+
+    @log_aware(log)
+    def matches_subtree(self, x):
+        """
+        Find a pattern which matches every path beneath a directory
+
+        A walker can skip descending into a directory entirely when this
+        finds something, as every path in it would just be filtered out
+        anyway.
+
+        __Args__
+
+        1. x (str): The directory path, in the same form (eg, relative to
+            the same root) as the paths the patterns are matched against
+
+        __Returns__
+
+        * (str/None): The pattern which matches everything under the
+            directory, or None if it isn't safe to prune it
+        """
+        for patt, prefix in self._subtree:
+            if prefix.fullmatch(x) or prefix.fullmatch(x + "/"):
+                return patt.pattern
+        return None